@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Running solves without blocking an asyncio event loop.
+
+`PyCGE.solve_async` and `PyCGE.as_completed` are built on two helpers:
+
+* `run_command` runs the command line of a shell solver (Ipopt, CONOPT, ...),
+  as written by `pycge.solverpool.write_problem`, as an asyncio subprocess. On a
+  timeout or cancellation the solver process is killed.
+* `in_thread` runs a blocking call (writing or reading a problem file, or the
+  in-process Newton engine) in a worker thread. A call cannot be interrupted
+  from outside its thread, so on cancellation it is told to `stop` (when it
+  accepts that) and awaited before the cancellation goes on. Until then it may
+  still be changing the shared instance.
+"""
+import asyncio
+import functools
+import time
+
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+
+
+async def run_command(command, timeout=None):
+    """Run a Pyomo solver command line and return its return code and output."""
+
+    script = command.script if 'script' in command else None
+    process = await asyncio.create_subprocess_exec(
+        *command.cmd, env=command.env, cwd=command.cwd if 'cwd' in command else None,
+        stdin=asyncio.subprocess.PIPE if script is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(script.encode() if script is not None else None), timeout)
+    except BaseException: #timed out or cancelled
+        if process.returncode is None:
+            process.kill()
+            await asyncio.shield(process.wait())
+        raise
+    return process.returncode, output.decode(errors='replace')
+
+
+async def in_thread(function, *args, stop=None, cleanup=None, **kwargs):
+    """Await `function(*args, **kwargs)` run in a worker thread.
+
+    When the awaiting task is cancelled, `stop` (a `threading.Event`, also
+    passed to `function`) is set and the call is awaited anyway. If it still
+    returns, `cleanup` is applied to what it returned.
+    """
+    if stop is not None:
+        kwargs['stop'] = stop
+    future = asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if stop is not None:
+            stop.set()
+        await asyncio.wait([future])
+        if cleanup is not None and not future.cancelled() and future.exception() is None:
+            cleanup(future.result())
+        raise
+
+
+def timed_out(solver, timeout, start):
+    #results of a solve that was stopped at its time limit
+
+    results = SolverResults()
+    results.solver.name = solver
+    results.solver.status = SolverStatus.aborted
+    results.solver.termination_condition = TerminationCondition.maxTimeLimit
+    results.solver.message = "%s was stopped after %g seconds" % (solver, timeout)
+    results.solver.time = time.time() - start
+    return results
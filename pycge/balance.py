@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Balancing of social accounting matrices.
+
+A SAM is balanced when the row total (receipts) of every account equals its
+column total (expenditures). `imbalance` measures how far a SAM is from that,
+and `balance` adjusts its flows until it is, keeping every zero a zero:
+
+* ``'cross_entropy'`` finds the balanced SAM closest to the original in the
+  cross-entropy sense. Its flows are ``a[i, j] * exp(u[i] - u[j])``, so only
+  one number per account is sought. It is found with Newton steps on a convex
+  function, each a conjugate gradient solve with the Laplacian of the SAM's
+  graph.
+* ``'ras'`` scales the rows and then the columns in turn (biproportional
+  scaling) towards given account totals. Without them, the targets are the
+  mean of each account's row and column total, recomputed after every sweep.
+
+Both work on NumPy arrays, DataFrames and `scipy.sparse` matrices and return
+the same type. A SAM with a few thousand accounts is balanced in well under a
+second.
+
+`imbalance` needs only NumPy, so checking a SAM (as `PyCGE.model_data` does for
+every SAM it loads) imports neither SciPy nor pandas; balancing one imports SciPy.
+"""
+import sys
+
+import numpy as np
+from pyomo.common.dependencies import attempt_import
+
+pd, _ = attempt_import('pandas') #only used for SAMs given as DataFrames, when pandas is already loaded
+#imported when a SAM is balanced
+sp, _ = attempt_import('scipy.sparse')
+spla, _ = attempt_import('scipy.sparse.linalg')
+
+
+METHODS = ('cross_entropy', 'ras')
+TOL = 1e-9 #largest |row total - column total| of a balanced SAM, relative to its largest total
+MAX_ITER = {'cross_entropy': 100, 'ras': 10000}
+
+
+def is_frame(sam):
+    #whether `sam` is a DataFrame; it cannot be one if pandas was never imported
+    return 'pandas' in sys.modules and isinstance(sam, pd.DataFrame)
+
+
+def as_sparse(sam):
+    #CSR copy of a SAM given as an array, DataFrame or sparse matrix
+    if is_frame(sam):
+        sam = sam.to_numpy(dtype=float)
+    return sp.csr_matrix(sam, dtype=float)
+
+
+def like(sam, matrix):
+    #`matrix` in the type (and with the labels) of `sam`
+    if is_frame(sam):
+        return pd.DataFrame(matrix.toarray(), index=sam.index, columns=sam.columns)
+    if sp.issparse(sam):
+        return matrix.asformat(sam.format)
+    return matrix.toarray()
+
+
+def totals(matrix):
+    return np.asarray(matrix.sum(axis=1)).ravel(), np.asarray(matrix.sum(axis=0)).ravel()
+
+
+def imbalance(sam):
+    """Largest |row total - column total| relative to the largest total, and the position of that account."""
+
+    if is_frame(sam):
+        sam = sam.to_numpy(dtype=float)
+    rows, cols = totals(sam) #row and column sums of a dense array or a sparse matrix alike
+    gaps = np.abs(rows - cols)
+    k = int(np.argmax(gaps)) if len(gaps) else 0
+    scale = max(np.max(np.maximum(rows, cols), initial=0.0), 1e-300)
+    return float(gaps[k] / scale) if len(gaps) else 0.0, k
+
+
+def check_flows(matrix):
+    #balancing by scaling needs nonnegative flows, and an account that receives must also spend (and vice versa)
+
+    if matrix.nnz and matrix.data.min() < 0:
+        raise ValueError("the SAM has negative flows; record each as a positive flow in the opposite direction first")
+    off_diagonal = matrix - sp.diags(matrix.diagonal())
+    rows, cols = totals(off_diagonal)
+    one_sided = np.flatnonzero((rows > 0) != (cols > 0))
+    if len(one_sided):
+        raise ValueError("accounts %s have only receipts or only expenditures, so the SAM cannot be balanced"
+                         % one_sided.tolist())
+
+
+def balance(sam, method='cross_entropy', tol=TOL, max_iter=None, targets=None):
+    """Balanced copy of `sam` and a dict describing the run.
+
+    `targets` (``'ras'`` only) are the account totals to scale towards; by
+    default the mean of each account's row and column total, updated as the
+    SAM changes.
+    """
+
+    if method not in METHODS:
+        raise ValueError("method must be one of %s, not %r" % (METHODS, method))
+    if max_iter is None:
+        max_iter = MAX_ITER[method]
+    matrix = as_sparse(sam)
+    if matrix.shape[0] != matrix.shape[1]:
+        raise ValueError("a SAM must be square, not %d x %d" % matrix.shape)
+    matrix.eliminate_zeros()
+    check_flows(matrix)
+
+    before, _ = imbalance(matrix)
+    if method == 'cross_entropy':
+        balanced, iterations = cross_entropy(matrix, tol, max_iter)
+    else:
+        balanced, iterations = ras(matrix, tol, max_iter, targets)
+    after, worst = imbalance(balanced)
+    info = {'method': method, 'iterations': iterations, 'converged': after <= tol,
+            'imbalance_before': before, 'imbalance_after': after, 'worst_account': worst}
+    return like(sam, balanced), info
+
+
+def cross_entropy(matrix, tol, max_iter):
+    #minimize f(u) = sum a_ij exp(u_i - u_j); its gradient is (row totals - column totals) of the scaled SAM
+
+    n = matrix.shape[0]
+    A = matrix.tocoo()
+    i, j, a = A.row, A.col, A.data
+    u = np.zeros(n)
+
+    def scaled(u):
+        return sp.csr_matrix((a * np.exp(u[i] - u[j]), (i, j)), shape=(n, n))
+
+    X = scaled(u)
+    scale = max(np.max(np.maximum(*totals(X)), initial=0.0), 1e-300)
+    for iteration in range(max_iter + 1):
+        rows, cols = totals(X)
+        gradient = rows - cols
+        if np.max(np.abs(gradient), initial=0.0) <= tol * scale or iteration == max_iter:
+            return X, iteration
+        #the Hessian is the Laplacian of X + X^T; it is singular along u + constant, hence the small ridge
+        hessian = sp.diags(rows + cols) - X - X.T
+        ridge = 1e-12 * max(np.max(rows + cols), 1e-300)
+        hessian = (hessian + ridge * sp.identity(n)).tocsr()
+        preconditioner = sp.diags(1 / hessian.diagonal())
+        du, _ = spla.cg(hessian, -gradient, M=preconditioner, rtol=1e-10, atol=0.0, maxiter=10 * n)
+        total = X.sum()
+        slope = gradient @ du
+        step = 1.0
+        while step > 1e-10: #backtracking line search on f, the total of the scaled SAM
+            trial = scaled(u + step * du)
+            if trial.sum() <= total + 1e-4 * step * slope:
+                break
+            step /= 2
+        u = u + step * du
+        X = trial
+
+
+def ras(matrix, tol, max_iter, targets=None):
+    #scale rows to the targets, then columns, until both are within `tol`
+
+    fixed = targets is not None
+    if fixed:
+        targets = np.asarray(targets, dtype=float)
+    X = matrix.copy()
+    for iteration in range(max_iter + 1):
+        rows, cols = totals(X)
+        if fixed:
+            gap = max(np.max(np.abs(rows - targets), initial=0.0), np.max(np.abs(cols - targets), initial=0.0))
+        else: #fixed mean totals are rarely reachable with the zeros of a SAM, so they follow it
+            targets = (rows + cols) / 2
+            gap = np.max(np.abs(rows - cols), initial=0.0)
+        if gap <= tol * max(np.max(targets, initial=0.0), 1e-300) or iteration == max_iter:
+            return X, iteration
+        X = sp.diags(np.divide(targets, rows, out=np.zeros_like(targets), where=rows > 0)) @ X
+        cols = np.asarray(X.sum(axis=0)).ravel()
+        X = X @ sp.diags(np.divide(targets, cols, out=np.zeros_like(targets), where=cols > 0))
+        X = X.tocsr()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed on-disk cache of constructed (and calibrated) BASE instances.
+
+Entries are keyed by a hash of the data directory contents, the `ModelDef`
+source and the numeraire, so an edited SAM or model definition never hits a
+stale entry. The Pyomo and dill versions are part of every key, since a pickle
+written by another version may not load; an entry that fails to load anyway
+is treated as missing. The cache directory is capped in size; the least recently used
+entries are evicted first.
+
+`SolutionCache` memoizes solved SIM states the same way. Its key covers every
+input that determines the solution (see `solution_key`), so a hit can be
+loaded into the SIM without calling a solver.
+"""
+import collections
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from pyomo.common.dependencies import attempt_import
+from pyomo.version import version as pyomo_version
+
+dill, _ = attempt_import('dill') #imported on the first read or write
+
+
+DEFAULT_DIR = os.environ.get('PYCGE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pycge', 'instances'))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 256 #solutions kept in memory
+
+
+def cache_key(*parts):
+    parts = ('pyomo ' + pyomo_version, 'dill ' + dill.__version__) + parts
+    return hashlib.sha256('\0'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+class InstanceCache:
+    """Directory of dill files, one per key, evicted least recently used first."""
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.dill')
+
+    def get(self, key):
+
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                entry = dill.load(cache_file)
+        except Exception: #missing, half-written, or pickled by incompatible code
+            return None
+        os.utime(path) #mark as recently used
+        return entry
+
+    def put(self, key, entry):
+
+        handle, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as cache_file:
+            dill.dump(entry, cache_file)
+        os.replace(tmp, self.path(key)) #readers never see a partial file
+        self.evict()
+
+    def entries(self):
+        #(last use, size, path) of every entry, oldest first
+        found = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.dill'):
+                path = os.path.join(self.directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError: #removed by another process
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+        return sorted(found)
+
+    def evict(self):
+
+        found = self.entries()
+        total = sum(size for _, size, _ in found)
+        for _, size, path in found[:-1]: #never evict the newest entry
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def solution_key(model_def_id, data_fingerprint, state, solver, options=None):
+    """Hash of everything that determines the solution of an instance in the state `state` (a `Changeset`).
+
+    That is the model definition, the data, every mutable Param value, which
+    Vars are fixed and at what values, and the solver with its options. The
+    values of the free Vars are only where the solver starts, so they are left
+    out.
+    """
+    digest = hashlib.sha256(cache_key(model_def_id, data_fingerprint, solver, sorted((options or {}).items())).encode())
+    fixed_values = np.where(state.var_fixed, state.var_values, 0.0)
+    for array in (state.param_values, state.var_fixed, fixed_values):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class SolutionCache:
+    """Solved states by `solution_key`: the most recently used in memory and, with a `directory`, all of them on disk."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+
+        self.max_entries = max_entries
+        self.memory = collections.OrderedDict() #key: Changeset, least recently used first
+        self.disk = InstanceCache(directory, max_bytes) if directory else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+        elif self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.remember(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+
+        self.remember(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+
+    def remember(self, key, entry):
+
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def clear(self):
+
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Name-to-component index of an instance, for bulk modifications.
+
+`ComponentIndex` is built once per instance and maps the name of every Var
+and mutable Param to the component and its ordered list of indices. A change
+set such as ``{('taum', '*'): 0, ('tauz', 'BRD'): 0.01}`` is then resolved to
+element objects without `getattr` calls or scans over the instance.
+
+A `Changeset` is a saved state of the instance: the mutable Param values, Var
+values and fixed flags as flat arrays. Restoring one is a single pass over the
+elements, so an instance can be switched between many policy states without
+being rebuilt.
+"""
+import numpy as np
+
+from pyomo.core import Var, Param
+
+
+WILDCARD = '*'
+
+
+def matches(pattern, index):
+    #`pattern` is an index, '*' for every index, or a tuple with '*' in some positions
+    if pattern == WILDCARD:
+        return True
+    if isinstance(pattern, tuple) and isinstance(index, tuple) and len(pattern) == len(index):
+        return all(p == WILDCARD or p == i for p, i in zip(pattern, index))
+    return pattern == index
+
+
+def same(a, b):
+    #elementwise equality that treats nan (an unset value) as equal to nan
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+class ComponentIndex:
+    """Vars and mutable Params of an instance, looked up by name."""
+
+    def __init__(self, instance):
+
+        self.instance = instance
+        self.components = {} #name -> component
+        for c in instance.component_objects(Var, active=True):
+            self.components[c.name] = c
+        for c in instance.component_objects(Param, active=True):
+            if c.mutable:
+                self.components[c.name] = c
+        self.indices = {} #name -> ordered list of indices, filled on first use
+        self.params = None #every mutable Param element, filled on first use
+        self.vars = None #every Var element, filled on first use
+
+    def component(self, NAME):
+
+        try:
+            return self.components[NAME]
+        except KeyError:
+            raise KeyError("%s is not a Var or mutable Param of this instance" % NAME)
+
+    def index_list(self, NAME):
+
+        if NAME not in self.indices:
+            self.indices[NAME] = list(self.component(NAME).keys())
+        return self.indices[NAME]
+
+    def resolve(self, NAME, INDEX, VALUE):
+        #list of (element, value) pairs; an array VALUE is aligned with the matched indices in set order
+
+        _object = self.component(NAME)
+        if INDEX == WILDCARD or (isinstance(INDEX, tuple) and WILDCARD in INDEX):
+            found = [index for index in self.index_list(NAME) if matches(INDEX, index)]
+            if not found:
+                raise KeyError("%s matches no index of %s" % (INDEX, NAME))
+        else:
+            if INDEX not in _object:
+                raise KeyError("%s is not an index of %s" % (INDEX, NAME))
+            found = [INDEX]
+
+        if np.ndim(VALUE) == 0:
+            values = [VALUE] * len(found)
+        else:
+            values = np.asarray(VALUE, dtype=float).ravel().tolist()
+            if len(values) != len(found):
+                raise ValueError("%d values given for the %d matched indices of %s" % (len(values), len(found), NAME))
+        return [(_object[index], value) for index, value in zip(found, values)]
+
+    def resolve_changes(self, changes):
+        #all (element, value) pairs of a mapping {(NAME, INDEX): VALUE}; raises before anything is changed
+
+        resolved = []
+        for (NAME, INDEX), VALUE in changes.items():
+            resolved.extend(self.resolve(NAME, INDEX, VALUE))
+        return resolved
+
+    def elements(self):
+        #flat lists of the mutable Param and Var elements, in a fixed order
+
+        if self.params is None:
+            self.params = []
+            self.vars = []
+            for c in self.components.values():
+                if c.ctype is Var:
+                    self.vars.extend(c.values())
+                else:
+                    self.params.extend(c.values())
+        return self.params, self.vars
+
+    def capture(self, name=None, solved=False, results=None):
+
+        params, variables = self.elements()
+        return Changeset(name,
+                         np.array([p.value for p in params], dtype=float),
+                         np.array([v.value for v in variables], dtype=float),
+                         np.array([v.fixed for v in variables], dtype=bool),
+                         solved, results)
+
+    def restore(self, changeset):
+        #write only the elements that differ from the current state
+
+        params, variables = self.elements()
+        if len(params) != len(changeset.param_values) or len(variables) != len(changeset.var_values):
+            raise ValueError("changeset %s does not match the structure of this instance" % changeset.name)
+        current = self.capture()
+        for k in np.flatnonzero(~same(current.param_values, changeset.param_values)):
+            val = changeset.param_values[k]
+            params[k].value = None if np.isnan(val) else float(val)
+        for k in np.flatnonzero(~same(current.var_values, changeset.var_values)):
+            val = changeset.var_values[k]
+            variables[k].set_value(None if np.isnan(val) else float(val), skip_validation=True)
+        for k in np.flatnonzero(current.var_fixed != changeset.var_fixed):
+            variables[k].fixed = bool(changeset.var_fixed[k])
+
+
+class Changeset:
+    """Saved state of an instance, restored by `ComponentIndex.restore`."""
+
+    def __init__(self, name, param_values, var_values, var_fixed, solved=False, results=None):
+
+        self.name = name
+        self.param_values = param_values
+        self.var_values = var_values
+        self.var_fixed = var_fixed
+        self.solved = solved #whether the saved Var values are a solution
+        self.results = results #the solver results of that solution
+
+    def __repr__(self):
+        return "Changeset(%r, %d params, %d vars, solved=%s)" % (self.name, len(self.param_values), len(self.var_values), self.solved)
+
+
+def apply_changes(resolved, undo_map=None, fix=True, log=False):
+    #set every element of `resolved` (from `ComponentIndex.resolve_changes`); Vars are fixed or unfixed
+
+    for element, value in resolved:
+        if undo_map is not None:
+            undo_map[str(element)] = element.value
+        if log:
+            print(element, "was originally", element.value)
+        element.value = value
+        if element.is_variable_type():
+            element.fixed = fix
+        if log:
+            print(element, " is now set to ", element.value)
+    return len(resolved)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk loader for SAM data directories.
+
+An alternative to loading `set-*.csv` and `param-*.csv` one by one through
+`DataPortal`. Every file is parsed in bulk with pandas (in parallel threads),
+parameters are kept as dense NumPy arrays with their row and column labels,
+and the Pyomo data dict for `create_instance` is built from those arrays.
+
+Large SAMs may also be stored in binary as `param-<name>-.npy` (a 2-D array).
+Its row and column labels are the members of the set whose size matches each
+dimension (e.g. the SAM accounts in `set-u-.csv`). Binary files are quicker
+to read than CSV; they are not memory-mapped, since `create_instance` copies
+every value into the instance's Params anyway.
+"""
+import os
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+
+class SamData:
+    """Sets as label lists and parameters as dense labeled arrays."""
+
+    def __init__(self):
+
+        self.sets = {} #name -> list of members
+        self.params = {} #name -> (row labels, column labels, 2-D array)
+
+    def __repr__(self):
+        return "SamData(sets=%s, params=%s)" % (sorted(self.sets), sorted(self.params))
+
+    def array(self, name):
+        #dense values of a parameter as a labeled DataFrame (no copy)
+        rows, cols, values = self.params[name]
+        return pd.DataFrame(values, index=rows, columns=cols, copy=False)
+
+    def to_pyomo(self):
+        #data dict understood by `AbstractModel.create_instance`
+
+        data = {name: {None: list(members)} for name, members in self.sets.items()}
+        for name, (rows, cols, values) in self.params.items():
+            keys = [(r, c) for r in rows for c in cols]
+            data[name] = dict(zip(keys, np.asarray(values, dtype=float).ravel().tolist()))
+        return {None: data}
+
+
+def read_set(path):
+    #one member per line after the header line
+    members = pd.read_csv(path, header=0, dtype=str, skip_blank_lines=True).iloc[:, 0]
+    return [m.strip() for m in members.tolist()]
+
+
+def read_param_csv(path):
+    #array format: the first row holds the column labels, the first column the row labels
+    frame = pd.read_csv(path, header=0, index_col=0, float_precision='round_trip') #same floats as DataPortal
+    frame.index = [str(r).strip() for r in frame.index]
+    frame.columns = [str(c).strip() for c in frame.columns]
+    return list(frame.index), list(frame.columns), frame.to_numpy(dtype=float)
+
+
+def labels_for(size, sets, filename):
+    matches = [name for name, members in sets.items() if len(members) == size]
+    if len(matches) != 1:
+        raise ValueError("cannot tell which set labels dimension %d of %s (candidates: %s)" % (size, filename, matches))
+    return sets[matches[0]]
+
+
+def load_data_dir(data_dir, workers=None):
+    """Read every set and parameter file of `data_dir` into a `SamData`."""
+
+    set_files = {}
+    csv_files = {}
+    npy_files = {}
+    for filename in sorted(os.listdir(data_dir)):
+        parts = filename.split('-')
+        if len(parts) != 3: #not type-name-.ext
+            print(filename, " is not in the right format and was not loaded")
+            continue
+        dat_type, name, file_type = parts
+        path = os.path.join(data_dir, filename)
+        if dat_type == 'set' and file_type == '.csv':
+            set_files[name] = path
+        elif dat_type == 'param' and file_type == '.csv':
+            csv_files[name] = path
+        elif dat_type == 'param' and file_type == '.npy':
+            npy_files[name] = path
+        else:
+            print(filename, " is not in the right format and was not loaded")
+
+    data = SamData()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        set_jobs = {name: pool.submit(read_set, path) for name, path in set_files.items()}
+        param_jobs = {name: pool.submit(read_param_csv, path) for name, path in csv_files.items()}
+        for name, job in set_jobs.items():
+            data.sets[name] = job.result()
+            print("File '" + os.path.basename(set_files[name]) + "' was loaded into set: " + name)
+        for name, job in param_jobs.items():
+            data.params[name] = job.result()
+            print("File '" + os.path.basename(csv_files[name]) + "' was loaded into param: " + name)
+
+    for name, path in npy_files.items(): #labels come from the sets, so these go last
+        values = np.load(path)
+        if values.ndim != 2:
+            raise ValueError(os.path.basename(path) + " must be a 2-D array")
+        rows = labels_for(values.shape[0], data.sets, os.path.basename(path))
+        cols = labels_for(values.shape[1], data.sets, os.path.basename(path))
+        data.params[name] = (rows, cols, values)
+        print("File '" + os.path.basename(path) + "' was loaded into param: " + name)
+
+    return data
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of how long ``import pycge`` and its modules take.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``,
+which reports the cumulative microseconds spent importing every module. The
+best of ``--repeat`` runs is kept, since anything else running on the machine
+only ever makes an import slower.
+
+`pycge.pycge` imports pandas, dill, SciPy and Pyomo's solver plugins only when a
+method first needs them. Every record lists the dependencies in `HEAVY` that
+were loaded anyway, and those not allowed by `ALLOWED` for that module are
+reported alongside the modules that got slower.
+
+Each module is appended as one JSON line to a history file, and the run is
+compared with the median of the earlier runs on the same host and Python:
+imports more than `tolerance` times slower are reported as regressions.
+
+Run from the repository root:
+
+    python -m pycge.examples.import_benchmark
+    python -m pycge.examples.import_benchmark pycge.pycge --repeat 10
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from pycge.examples.scaling_benchmark import commit, read_history
+
+
+MODULES = ['pycge', 'pycge.pycge', 'pycge.examples', 'pycge.examples.stdcge_model_def',
+           'pycge.examples.splcge_model_def']
+HEAVY = ('pandas', 'scipy', 'dill', 'pyarrow', 'pyomo.environ')
+#heavy dependencies a module may load at import time; the example models use `from pyomo.environ import *`
+ALLOWED = {'pycge.examples.stdcge_model_def': ('pyomo.environ',),
+           'pycge.examples.splcge_model_def': ('pyomo.environ',)}
+HISTORY = 'import-history.jsonl'
+REPEAT = 5
+TOLERANCE = 1.5 #an import is a regression when it is this many times slower than the median of earlier runs
+MIN_US = 20000 #imports quicker than this are too noisy to compare
+TOP = 5 #number of slowest dependencies recorded
+
+
+def parse_importtime(stderr):
+    #(depth, cumulative us, module) of every line `-X importtime` wrote, in the order they were printed;
+    #a module is printed when its import finishes, so after everything it imported
+
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2 #the first level has one space
+        imports.append((depth, int(cumulative), name.strip()))
+    return imports
+
+
+def measure(module):
+    """Import `module` once in a fresh interpreter and return its record."""
+
+    code = "import %s, sys; print([m for m in %r if m in sys.modules])" % (module, HEAVY)
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    if completed.returncode != 0:
+        raise RuntimeError("importing %s failed:\n%s" % (module, completed.stderr[-2000:]))
+
+    #the top-level lines are the module (or, if already imported with the interpreter, its packages)
+    #and the interpreter's own start-up
+    packages = {'.'.join(module.split('.')[:k]) for k in range(1, module.count('.') + 2)}
+    total = loaded = 0
+    children, pending = [], []
+    for depth, cumulative, name in parse_importtime(completed.stderr):
+        if depth == 0:
+            if name in packages:
+                total += cumulative
+                loaded += len(pending) + 1
+                children += pending
+            pending = []
+        else:
+            pending.append((depth, cumulative, name))
+    top = sorted(((cumulative, name) for depth, cumulative, name in children if depth == 1), reverse=True)[:TOP]
+    heavy = ast.literal_eval(completed.stdout.strip().splitlines()[-1])
+    return {'module': module, 'total_us': total, 'modules_loaded': loaded,
+            'heavy': heavy, 'unexpected': [m for m in heavy if m not in ALLOWED.get(module, ())],
+            'top': [[name, cumulative] for cumulative, name in top]}
+
+
+def run(modules=MODULES, repeat=REPEAT, history=HISTORY, tolerance=TOLERANCE):
+    """Measure every module, append the records to `history` and return them with the regressions found."""
+
+    run_info = {'run': time.strftime('%Y%m%dT%H%M%S'), 'commit': commit(), 'host': platform.node(),
+                'python': platform.python_version()}
+    records = []
+    for module in modules:
+        print("Timing import of", module)
+        best = min((measure(module) for _ in range(repeat)), key=lambda record: record['total_us'])
+        records.append(dict(run_info, **best))
+
+    earlier = read_history(history)
+    with open(history, 'a') as history_file:
+        for record in records:
+            history_file.write(json.dumps(record, default=str) + '\n')
+    frame = pd.DataFrame(records)
+    return frame, regressions(earlier, frame, tolerance)
+
+
+def regressions(earlier, latest, tolerance=TOLERANCE):
+    """Modules of `latest` slower to import than `tolerance` times the median of comparable `earlier` runs."""
+
+    keys = ['host', 'python', 'module']
+    if earlier.empty or latest.empty:
+        return pd.DataFrame(columns=keys + ['total_us', 'median_total_us', 'ratio'])
+    median = earlier.groupby(keys)['total_us'].median().rename('median_total_us').reset_index()
+    compared = latest[keys + ['total_us']].merge(median, on=keys)
+    compared['ratio'] = compared['total_us'] / compared['median_total_us']
+    slow = (compared['ratio'] > tolerance) & (compared['total_us'] > MIN_US)
+    return compared[slow].reset_index(drop=True)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Import-time benchmark of pycge")
+    parser.add_argument('modules', nargs='*', default=MODULES, help="modules to import")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="imports per module; the quickest is kept")
+    parser.add_argument('--history', default=HISTORY)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    frame, slow = run(args.modules, args.repeat, args.history, args.tolerance)
+    print(frame[['module', 'total_us', 'modules_loaded', 'heavy']].to_string(index=False))
+    for record in frame[frame['top'].map(len) > 0].itertuples():
+        print(record.module, "spends the most time importing", ", ".join("%s (%.0f ms)" % (name, us / 1000) for name, us in record.top))
+    unexpected = frame[frame['unexpected'].map(len) > 0]
+    for record in unexpected.itertuples():
+        print("Warning:", record.module, "now imports", ", ".join(record.unexpected), "at import time")
+    if len(slow):
+        print("Slower than", args.tolerance, "times the median of earlier runs:")
+        print(slow.round(3).to_string())
+    if len(slow) or len(unexpected):
+        return 1
+    print("Results appended to", args.history)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
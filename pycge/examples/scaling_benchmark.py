@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of how the example models scale with the number of goods.
+
+For each size a balanced SAM is generated with `pycge.samgen` and the whole
+pipeline is run with `PyCGE.metrics` recording every stage: building the model,
+loading the data, creating the BASE instance, writing its NL file, calibrating,
+copying the SIM, solving a policy shock and comparing it with the BASE. The shock is a 10%
+tariff cut for `StdModelDef` and a 10% larger capital endowment for
+`SplModelDef`.
+
+The in-process Newton engine builds its Jacobian symbolically, which takes
+minutes per iteration at a few hundred goods, so the SIM is only solved up to
+``--solve-limit`` goods (50 by default). Larger sizes stop after calibrating
+the BASE, which converges at once from the benchmark point.
+
+Every size runs in a fresh process, so `max_rss_kb` (the peak resident memory of
+that process) is the peak of that size alone. Per-stage peaks come from
+`tracemalloc` with ``--memory``, which slows the stages down, so those runs are
+not compared with the timed ones.
+
+Each stage of each size is appended as one JSON line to a history file, and the
+run is compared with the median of the earlier runs on the same host: stages
+more than `tolerance` times slower are reported as regressions.
+
+Run from the repository root:
+
+    python -m pycge.examples.scaling_benchmark                  #2 10 50 200 1000 goods
+    python -m pycge.examples.scaling_benchmark 2 10 --model spl --history spl.jsonl
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from pycge import samgen
+from pycge.metrics import Metrics
+from pycge.pycge import PyCGE
+from pycge.examples.splcge_model_def import SplModelDef
+from pycge.examples.stdcge_model_def import StdModelDef
+
+try:
+    import resource #not on Windows
+except ImportError:
+    resource = None
+
+
+SIZES = [2, 10, 50, 200, 1000]
+MODELS = {'std': StdModelDef, 'spl': SplModelDef}
+HISTORY = 'benchmark-history.jsonl'
+TOLERANCE = 1.5 #a stage is a regression when it is this many times slower than the median of earlier runs
+MIN_SECONDS = 0.05 #stages quicker than this are too noisy to compare
+SOLVE_LIMIT = 50 #largest number of goods whose SIM is solved by default
+
+
+def shock(cge, model):
+    #the policy change solved in the SIM
+
+    if model == 'std':
+        cge.model_modify_sim_bulk({('taum', '*'): [0.9 * cge.sim.taum[i].value for i in cge.sim.i]})
+    else:
+        cge.model_modify_sim('FF', 'CAP', 1.1 * cge.sim.FF['CAP'].value)
+
+
+def benchmark(n, model='std', factors=2, solver='newton', seed=0, memory=False, calibrate=True, solve=True):
+    """Run the pipeline once for `n` goods and return the records of its stages."""
+
+    metrics = Metrics(enabled=True, memory=memory)
+    with tempfile.TemporaryDirectory() as directory:
+        with metrics.stage('generate'):
+            samgen.write_data_dir(samgen.balanced_sam(n, factors, model, seed=seed), directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cge = PyCGE(MODELS[model](), metrics=metrics)
+            cge.model_data(directory, bulk=True)
+            cge.model_instance('pf', 'CAP')
+            with metrics.stage('nl_write') as record:
+                nl_file = os.path.join(directory, 'base.nl')
+                cge.base.write(nl_file, io_options={'symbolic_solver_labels': False})
+                record['nl_bytes'] = os.path.getsize(nl_file)
+            if calibrate:
+                cge.model_calibrate(solver)
+            if calibrate and solve:
+                cge.model_sim()
+                shock(cge, model)
+                cge.model_solve(solver)
+                cge.model_postprocess('compare')
+
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None #kB on Linux, bytes on macOS
+    for record in metrics.records:
+        record.update(goods=n, factors=factors, max_rss_kb=max_rss_kb)
+    return metrics.records
+
+
+def run_in_process(*args, **kwargs):
+    #a fresh process per size, so earlier sizes do not inflate the memory peak
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(benchmark, *args, **kwargs).result()
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(sizes=SIZES, model='std', factors=2, solver='newton', seed=0, memory=False, calibrate=True,
+        solve_limit=SOLVE_LIMIT, history=HISTORY, tolerance=TOLERANCE):
+    """Benchmark every size, append the records to `history` and return them with the regressions found."""
+
+    run_info = {'run': time.strftime('%Y%m%dT%H%M%S'), 'commit': commit(), 'host': platform.node(),
+                'python': platform.python_version(), 'model': model, 'solver': solver, 'memory': memory}
+    records = []
+    for n in sizes:
+        print("Benchmarking", model, "with", n, "goods")
+        solve = solve_limit is None or n <= solve_limit
+        for record in run_in_process(n, model, factors, solver, seed, memory, calibrate, solve):
+            records.append(dict(run_info, **record))
+
+    earlier = read_history(history)
+    with open(history, 'a') as history_file:
+        for record in records:
+            history_file.write(json.dumps(record, default=str) + '\n')
+    frame = pd.DataFrame(records)
+    return frame, regressions(earlier, frame, tolerance)
+
+
+def read_history(path):
+
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path) as history_file:
+        return pd.DataFrame([json.loads(line) for line in history_file if line.strip()])
+
+
+def regressions(earlier, latest, tolerance=TOLERANCE):
+    """Stages of `latest` slower than `tolerance` times the median of comparable `earlier` runs."""
+
+    keys = ['host', 'model', 'solver', 'memory', 'goods', 'factors', 'stage']
+    if earlier.empty or latest.empty:
+        return pd.DataFrame(columns=keys + ['wall_s', 'median_wall_s', 'ratio'])
+    #a stage that runs more than once in a run (e.g. the BASE and SIM solves) is compared by its total
+    per_run = earlier.groupby(keys + ['run'])['wall_s'].sum().reset_index()
+    median = per_run.groupby(keys)['wall_s'].median().rename('median_wall_s').reset_index()
+    current = latest.groupby(keys)['wall_s'].sum().reset_index()
+    compared = current.merge(median, on=keys)
+    compared['ratio'] = compared['wall_s'] / compared['median_wall_s']
+    slow = (compared['ratio'] > tolerance) & (compared['wall_s'] > MIN_SECONDS)
+    return compared[slow].reset_index(drop=True)
+
+
+def report(frame):
+    #wall seconds of each stage (columns) for each size (rows)
+    return frame.pivot_table(index='goods', columns='stage', values='wall_s', aggfunc='sum', sort=False)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Scaling benchmark on synthetic balanced SAMs")
+    parser.add_argument('sizes', nargs='*', type=int, default=SIZES, help="numbers of goods")
+    parser.add_argument('--model', choices=sorted(MODELS), default='std')
+    parser.add_argument('--factors', type=int, default=2)
+    parser.add_argument('--solver', default='newton')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory', action='store_true', help="trace the peak memory of every stage (slower)")
+    parser.add_argument('--no-calibrate', dest='calibrate', action='store_false', help="stop after building the BASE")
+    parser.add_argument('--solve-limit', type=int, default=SOLVE_LIMIT, help="largest number of goods whose SIM is solved")
+    parser.add_argument('--history', default=HISTORY)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    frame, slow = run(args.sizes, args.model, args.factors, args.solver, args.seed, args.memory,
+                      args.calibrate, args.solve_limit, args.history, args.tolerance)
+    print(report(frame).round(3).to_string())
+    print("peak resident memory (MB):", (frame.groupby('goods')['max_rss_kb'].max() / 1024).round(1).to_dict())
+    if len(slow):
+        print("Slower than", args.tolerance, "times the median of earlier runs:")
+        print(slow.round(3).to_string())
+        return 1
+    print("Results appended to", args.history)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
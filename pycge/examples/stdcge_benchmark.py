@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of how `StdModelDef` scales with the number of goods.
+
+The 2-good stdcge SAM is replicated into n goods (each good split evenly, so
+the SAM stays balanced and the calibrated BASE is the same economy). For each
+size the script reports the time to build the BASE instance, the size of its
+NL file, the time to calibrate and the time to solve a 10% tariff cut with
+the in-process Newton engine.
+
+Run from the repository root:
+
+    python -m pycge.examples.stdcge_benchmark 2 10 50 100
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pycge.examples.stdcge_model_def import StdModelDef
+from pycge.pycge import PyCGE
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'stdcge_data_dir')
+
+
+def replicated_data_dir(n, directory):
+    #write an n-good version of the stdcge SAM into `directory`
+
+    sam = pd.read_csv(os.path.join(DATA_DIR, 'param-sam-.csv'), index_col=0)
+    goods = ['BRD', 'MLK']
+    others = [u for u in sam.index if u not in goods]
+    new_goods = ['G%d' % k for k in range(n)]
+    origin = [goods[k % 2] for k in range(n)]
+    copies = np.array([origin.count(g) for g in origin], dtype=float)
+
+    accounts = new_goods + others
+    big = pd.DataFrame(0.0, index=accounts, columns=accounts)
+    for r, g in zip(new_goods, origin):
+        big.loc[r, others] = sam.loc[g, others].to_numpy() / copies[new_goods.index(r)]
+        for c, g2 in zip(new_goods, origin):
+            big.at[r, c] = sam.at[g, g2] / (copies[new_goods.index(r)] * copies[new_goods.index(c)])
+    for r in others:
+        big.loc[r, new_goods] = sam.loc[r, origin].to_numpy() / copies
+        big.loc[r, others] = sam.loc[r, others].to_numpy()
+
+    big.index.name = sam.index.name
+    big.to_csv(os.path.join(directory, 'param-sam-.csv'))
+    for name, members in (('i', new_goods), ('h', ['CAP', 'LAB']), ('u', accounts)):
+        with open(os.path.join(directory, 'set-' + name + '-.csv'), 'w') as set_file:
+            set_file.write(name.upper() + '\n' + '\n'.join(members) + '\n')
+
+
+def benchmark(n, solver='newton'):
+
+    with tempfile.TemporaryDirectory() as directory:
+        replicated_data_dir(n, directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cge = PyCGE(StdModelDef())
+            cge.model_data(directory, bulk=True)
+
+            start = time.perf_counter()
+            cge.model_instance('pf', 'CAP')
+            build = time.perf_counter() - start
+
+            nl_file = os.path.join(directory, 'base.nl')
+            cge.base.write(nl_file, io_options={'symbolic_solver_labels': False})
+            nl_bytes = os.path.getsize(nl_file)
+
+            start = time.perf_counter()
+            cge.model_calibrate(solver)
+            calibrate = time.perf_counter() - start
+
+            cge.model_sim()
+            for i in cge.sim.i:
+                cge.model_modify_sim('taum', i, 0.9 * cge.sim.taum[i].value)
+            start = time.perf_counter()
+            cge.model_solve(solver)
+            solve = time.perf_counter() - start
+
+    return {'goods': n, 'build_s': build, 'nl_kb': nl_bytes / 1024.0,
+            'calibrate_s': calibrate, 'solve_s': solve,
+            'status': str(cge.sim_results.solver.termination_condition)}
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [2, 10, 50, 100]
+    print(pd.DataFrame([benchmark(n) for n in sizes]).set_index('goods').round(3))
@@ -15,8 +15,235 @@ import numpy as np
 
 
 
+def seqsum(a, axis=0):
+    #sum along `axis` one term at a time, left to right, like Python's `sum` over Pyomo params
+    a = np.moveaxis(np.asarray(a, dtype=float), axis, 0)
+    total = a[0].copy()
+    for term in a[1:]:
+        total = total + term
+    return total
+
+
+def power(a, b):
+    #elementwise Python `pow`; NumPy's vectorized power can differ from it in the last bit
+    return np.frompyfunc(pow, 2, 1)(a, b).astype(float)
+
+
+def seqprod(a, axis=0):
+    #product along `axis` one factor at a time, like `np.prod` over a list of Pyomo expressions
+    a = np.moveaxis(np.asarray(a, dtype=float), axis, 0)
+    total = a[0].copy()
+    for factor in a[1:]:
+        total = total * factor
+    return total
+
+
+def component_array(component, *sets):
+    #values of a Var or Param over the product of `sets` (in set order) as an array; unset Vars are nan
+    if not sets:
+        val = component.value
+        return np.nan if val is None else float(val)
+    shape = [len(s) for s in sets]
+    if len(component) == np.prod(shape): #every index is present, so the elements come in set order
+        elements = component.values()
+    else:
+        keys = list(sets[0]) if len(sets) == 1 else [(a, b) for a in sets[0] for b in sets[1]]
+        elements = (component[key] for key in keys)
+    values = [getattr(element, 'value', element) for element in elements] #immutable Params are plain numbers
+    return np.array([np.nan if val is None else val for val in values], dtype=float).reshape(shape)
+
+
+ELASTICITY_PARAMS = ('sigma', 'psi', 'eta', 'phi', 'deltam', 'deltad', 'gamma', 'xie', 'xid', 'theta')
+
+
+def elasticity_calibration(sigma, psi, M0, D0, E0, Z0, Q0, taum):
+    #Armington and transformation parameters for the elasticities `sigma` and `psi`;
+    #arrays broadcast, so a (draws, goods) array of elasticities gives (draws, goods) parameters
+    
+    sigma, psi = np.broadcast_arrays(np.asarray(sigma, dtype=float), np.asarray(psi, dtype=float))
+    eta = (sigma - 1) / sigma
+    phi = (psi + 1) / psi
+    deltam = (1 + taum) * power(M0, 1 - eta) / ((1 + taum) * power(M0, 1 - eta) + power(D0, 1 - eta))
+    deltad = power(D0, 1 - eta) / ((1 + taum) * power(M0, 1 - eta) + power(D0, 1 - eta))
+    gamma = Q0 / power(deltam * power(M0, eta) + deltad * power(D0, eta), 1 / eta)
+    xie = power(E0, 1 - phi) / (power(E0, 1 - phi) + power(D0, 1 - phi))
+    xid = power(D0, 1 - phi) / (power(E0, 1 - phi) + power(D0, 1 - phi))
+    theta = Z0 / power(xie * power(E0, phi) + xid * power(D0, phi), 1 / phi)
+    return {'sigma': sigma, 'psi': psi, 'eta': eta, 'phi': phi, 'deltam': deltam, 'deltad': deltad,
+            'gamma': gamma, 'xie': xie, 'xid': xid, 'theta': theta}
+
+
 class StdModelDef:
     
+    calibration = None #Param values from `calibrate`, used instead of the `*_init` rules
+    elasticity_inputs = ('sigma', 'psi') #Params that the rest of ELASTICITY_PARAMS are calibrated from
+    
+    
+    def calibrated(self, name, rule):
+        #initialize rule that reads the value computed by `calibrate`, or falls back to `rule`
+        
+        def init(model, *index):
+            if index == (None,): #Pyomo passes None as the index of a scalar component
+                index = ()
+            if self.calibration is None or name not in self.calibration:
+                return rule(model, *index)
+            if len(index) == 0:
+                return self.calibration[name][None]
+            if len(index) == 1:
+                return self.calibration[name][index[0]]
+            return self.calibration[name][index]
+        
+        return init
+    
+    
+    def calibrate(self, sam_data):
+        #compute every benchmark quantity and share/scale parameter from the SAM in one vectorized pass
+        #(same operations in the same order as the `*_init` rules, so the values match exactly)
+        
+        sam = sam_data.array('sam')
+        i = list(sam_data.sets['i'])
+        h = list(sam_data.sets['h'])
+        
+        def cell(row, col):
+            return float(sam.at[row, col])
+        
+        def block(rows, cols):
+            return sam.loc[rows, cols].to_numpy(dtype=float)
+        
+        Td0 = cell('GOV', 'HOH')
+        Tz0 = block(['IDT'], i)[0]
+        Tm0 = block(['TRF'], i)[0]
+        F0 = block(h, i)                              # [h, i]
+        Y0 = seqsum(F0, axis=0)
+        X0 = block(i, i)                              # [i, j]
+        Z0 = Y0 + seqsum(X0, axis=0)
+        M0 = block(['EXT'], i)[0]
+        tauz = Tz0 / Z0
+        taum = Tm0 / M0
+        Xp0 = block(i, ['HOH'])[:, 0]
+        FF = block(['HOH'], h)[0]
+        Xg0 = block(i, ['GOV'])[:, 0]
+        Xv0 = block(i, ['INV'])[:, 0]
+        E0 = block(i, ['EXT'])[:, 0]
+        Q0 = Xp0 + Xg0 + Xv0 + seqsum(X0, axis=1)
+        D0 = (1 + tauz) * Z0 - E0
+        Sp0 = cell('INV', 'HOH')
+        Sg0 = cell('INV', 'GOV')
+        Sf = cell('INV', 'EXT')
+        
+        sigma = np.full(len(i), 2.0)
+        psi = np.full(len(i), 2.0)
+        alpha = Xp0 / seqsum(Xp0)
+        beta = F0 / seqsum(F0, axis=0)
+        b = Y0 / seqprod(power(F0, beta), axis=0)
+        ax = X0 / Z0
+        ay = Y0 / Z0
+        mu = Xg0 / seqsum(Xg0)
+        lambd = Xv0 / (Sp0 + Sg0 + Sf)
+        elastic = elasticity_calibration(sigma, psi, M0, D0, E0, Z0, Q0, taum)
+        ssp = Sp0 / seqsum(FF)
+        ssg = Sg0 / (Td0 + seqsum(Tz0) + seqsum(Tm0))
+        taud = Td0 / seqsum(FF)
+        
+        def by_i(values):
+            return dict(zip(i, np.asarray(values).tolist()))
+        
+        def by_pair(rows, cols, values):
+            return {(r, c): v for r, row in zip(rows, np.asarray(values).tolist()) for c, v in zip(cols, row)}
+        
+        self.calibration = {
+            'Td0': {None: Td0}, 'Tz0': by_i(Tz0), 'Tm0': by_i(Tm0), 'F0': by_pair(h, i, F0),
+            'Y0': by_i(Y0), 'X0': by_pair(i, i, X0), 'Z0': by_i(Z0), 'M0': by_i(M0),
+            'tauz': by_i(tauz), 'taum': by_i(taum), 'Xp0': by_i(Xp0), 'FF': dict(zip(h, FF.tolist())),
+            'Xg0': by_i(Xg0), 'Xv0': by_i(Xv0), 'E0': by_i(E0), 'Q0': by_i(Q0), 'D0': by_i(D0),
+            'Sp0': {None: Sp0}, 'Sg0': {None: Sg0}, 'Sf': {None: Sf},
+            'alpha': by_i(alpha), 'beta': by_pair(h, i, beta),
+            'b': by_i(b), 'ax': by_pair(i, i, ax), 'ay': by_i(ay), 'mu': by_i(mu), 'lambd': by_i(lambd),
+            'ssp': {None: float(ssp)}, 'ssg': {None: float(ssg)}, 'taud': {None: float(taud)},
+            }
+        for name, values in elastic.items():
+            self.calibration[name] = by_i(values)
+        return self.calibration
+    
+    
+    def recalibrate(self, instance, sigma, psi):
+        #elasticity-dependent Params of a calibrated `instance` for new elasticities; `sigma` and `psi`
+        #are arrays over the goods in set order, or (draws, goods) arrays to recalibrate many draws at once;
+        #like the `*_init` rules, only benchmark values are used (the tariff Tm0/M0, not a shocked taum)
+        
+        def benchmark(name):
+            component = getattr(instance, name)
+            return np.array([component[i].value for i in instance.i], dtype=float)
+        
+        return elasticity_calibration(sigma, psi, benchmark('M0'), benchmark('D0'), benchmark('E0'),
+                                      benchmark('Z0'), benchmark('Q0'), benchmark('Tm0') / benchmark('M0'))
+    
+    
+    def derived_params(self, instance, changes=None):
+        #{NAME: {INDEX: value}} of the Params calibrated from `elasticity_inputs` (eta, phi, deltam, ...), for the
+        #sigma and psi of `instance` with `changes` ({(NAME, INDEX): value}, e.g. a scenario's) applied
+        
+        goods = list(instance.i)
+        def current(name):
+            values = np.array([getattr(instance, name)[i].value for i in goods], dtype=float)
+            for (NAME, INDEX), val in (changes or {}).items():
+                if NAME == name:
+                    values[goods.index(INDEX)] = val
+            return values
+        
+        params = self.recalibrate(instance, current('sigma'), current('psi'))
+        return {name: dict(zip(goods, values.tolist())) for name, values in params.items() if name not in self.elasticity_inputs}
+    
+    
+    def residuals(self, instance):
+        #left-hand side minus right-hand side of every equation at the current values of `instance`, as arrays
+        #over the equation indices; the "check" solver uses it to reject a point quickly, never to accept one
+        
+        i, h = instance.i, instance.h
+        def a(name, *sets):
+            return component_array(getattr(instance, name), *sets)
+        
+        Y, Z, Xp, Xg, Xv, E, M, Q, D = (a(name, i) for name in ('Y', 'Z', 'Xp', 'Xg', 'Xv', 'E', 'M', 'Q', 'D'))
+        py, pz, pq, pe, pm, pd, Tz, Tm = (a(name, i) for name in ('py', 'pz', 'pq', 'pe', 'pm', 'pd', 'Tz', 'Tm'))
+        F, X, pf = a('F', h, i), a('X', i, i), a('pf', h)
+        epsilon, Sp, Sg, Td = (a(name) for name in ('epsilon', 'Sp', 'Sg', 'Td'))
+        b, ay, mu, lambd, alpha = (a(name, i) for name in ('b', 'ay', 'mu', 'lambd', 'alpha'))
+        tauz, taum, pWe, pWm = (a(name, i) for name in ('tauz', 'taum', 'pWe', 'pWm'))
+        eta, phi, deltam, deltad, gamma, xie, xid, theta = (a(name, i) for name in ('eta', 'phi', 'deltam', 'deltad', 'gamma', 'xie', 'xid', 'theta'))
+        beta, ax, FF = a('beta', h, i), a('ax', i, i), a('FF', h)
+        taud, ssp, ssg, Sf = (a(name) for name in ('taud', 'ssp', 'ssg', 'Sf'))
+        
+        income = np.sum(pf*FF)
+        revenue = Td + np.sum(Tz) + np.sum(Tm)
+        savings = Sp + Sg + epsilon*Sf
+        with np.errstate(all='ignore'): #an undefined term gives nan, which fails the check
+            return {
+                'eqpy': Y - b*np.prod(F**beta, axis=0),
+                'eqF': F - beta*py*Y/pf[:, None],
+                'eqX': X - ax*Z,
+                'eqY': Y - ay*Z,
+                'eqpzs': pz - (ay*py + np.sum(ax*pq[:, None], axis=0)),
+                'eqTd': Td - taud*income,
+                'eqTz': Tz - tauz*pz*Z,
+                'eqTm': Tm - taum*pm*M,
+                'eqXg': Xg - mu*(revenue - Sg)/pq,
+                'eqXv': Xv - lambd*savings/pq,
+                'eqSp': Sp - ssp*income,
+                'eqSg': Sg - ssg*revenue,
+                'eqXp': Xp - alpha*(income - Sp - Td)/pq,
+                'eqpe': pe - epsilon*pWe,
+                'eqpm': pm - epsilon*pWm,
+                'eqepsilon': np.sum(pWe*E) + Sf - np.sum(pWm*M),
+                'eqpqs': Q - gamma*(deltam*M**eta + deltad*D**eta)**(1/eta),
+                'eqM': M - (gamma**eta*deltam*pq/((1 + taum)*pm))**(1/(1 - eta))*Q,
+                'eqD': D - (gamma**eta*deltad*pq/pd)**(1/(1 - eta))*Q,
+                'eqpzd': Z - theta*(xie*E**phi + xid*D**phi)**(1/phi),
+                'eqE': E - (theta**phi*xie*(1 + tauz)*pz/pe)**(1/(1 - phi))*Z,
+                'eqDs': D - (theta**phi*xid*(1 + tauz)*pz/pd)**(1/(1 - phi))*Z,
+                'eqpqd': Q - (Xp + Xg + Xv + np.sum(X, axis=1)),
+                'eqpf': np.sum(F, axis=1) - FF,
+            }
+    
     
     def model(self):
                 
@@ -42,20 +269,20 @@ class StdModelDef:
             return model.sam['GOV','HOH']
         
         
-        self.m.Td0 = Param(initialize=Td0_init,
+        self.m.Td0 = Param(initialize=self.calibrated('Td0', Td0_init),
                          doc='direct tax', mutable = True)
         
         def Tz0_init(model, i):
             return model.sam['IDT', i]
         
         
-        self.m.Tz0 = Param(self.m.i, initialize=Tz0_init,
+        self.m.Tz0 = Param(self.m.i, initialize=self.calibrated('Tz0', Tz0_init),
                          doc='production tax', mutable = True)
         
         def Tm0_init(model, i):
             return model.sam['TRF', i]
         
-        self.m.Tm0 = Param(self.m.i, initialize=Tm0_init,
+        self.m.Tm0 = Param(self.m.i, initialize=self.calibrated('Tm0', Tm0_init),
                          doc='import tariff', mutable = True)
         
         
@@ -63,35 +290,35 @@ class StdModelDef:
             return model.sam[h,i]
         
         
-        self.m.F0 = Param(self.m.h, self.m.i, initialize=F0_init,
+        self.m.F0 = Param(self.m.h, self.m.i, initialize=self.calibrated('F0', F0_init),
                          doc='the h-th factor input by the j-th firm', mutable = True)
         
         def Y0_init(model, i):
             return sum(model.F0[h, i] for h in model.h)
          
         
-        self.m.Y0 = Param(self.m.i, initialize=Y0_init,
+        self.m.Y0 = Param(self.m.i, initialize=self.calibrated('Y0', Y0_init),
                          doc='composite factor', mutable = True)
         
         def X0_init(model, i, j):
             return model.sam[i, j]
         
         
-        self.m.X0 = Param(self.m.i, self.m.i, initialize=X0_init,
+        self.m.X0 = Param(self.m.i, self.m.i, initialize=self.calibrated('X0', X0_init),
                          doc='intermediate input', mutable = True)
         
         def Z0_init(model, j):
             return model.Y0[j] + sum(model.X0[i,j] for i in model.i)
         
         
-        self.m.Z0 = Param(self.m.i, initialize=Z0_init,
+        self.m.Z0 = Param(self.m.i, initialize=self.calibrated('Z0', Z0_init),
                          doc='output of the j-th good', mutable = True)
         
         def M0_init(model, i):
             return model.sam['EXT', i]
         
         
-        self.m.M0 = Param(self.m.i, initialize=M0_init,
+        self.m.M0 = Param(self.m.i, initialize=self.calibrated('M0', M0_init),
                          doc='imports', mutable = True)
         
         
@@ -99,14 +326,14 @@ class StdModelDef:
             return model.Tz0[i]/model.Z0[i]
         
         
-        self.m.tauz = Param(self.m.i, initialize=tauz_init,
+        self.m.tauz = Param(self.m.i, initialize=self.calibrated('tauz', tauz_init),
                          doc='production tax rate', mutable = True)
         
         def taum_init(model, i):
             return model.Tm0[i]/model.M0[i]
         
         
-        self.m.taum = Param(self.m.i, initialize=taum_init,
+        self.m.taum = Param(self.m.i, initialize=self.calibrated('taum', taum_init),
                          doc='import tariff rate', mutable = True)
         
         
@@ -114,14 +341,14 @@ class StdModelDef:
             return model.sam[i, 'HOH']
         
         
-        self.m.Xp0 = Param(self.m.i, initialize=Xp0_init,
+        self.m.Xp0 = Param(self.m.i, initialize=self.calibrated('Xp0', Xp0_init),
                          doc='household consumption of the i-th good', mutable = True)
         
         def FF_init(model, h):
             return model.sam['HOH', h]
         
         
-        self.m.FF = Param(self.m.h, initialize=FF_init,
+        self.m.FF = Param(self.m.h, initialize=self.calibrated('FF', FF_init),
                          doc='factor endowment of the h-th factor', mutable = True)
         
         
@@ -129,56 +356,56 @@ class StdModelDef:
             return model.sam[i, 'GOV']
         
         
-        self.m.Xg0 = Param(self.m.i, initialize=Xg0_init,
+        self.m.Xg0 = Param(self.m.i, initialize=self.calibrated('Xg0', Xg0_init),
                          doc='government consumption', mutable = True)
         
         def Xv0_init(model, i):
             return model.sam[i, 'INV']
         
         
-        self.m.Xv0 = Param(self.m.i, initialize=Xv0_init,
+        self.m.Xv0 = Param(self.m.i, initialize=self.calibrated('Xv0', Xv0_init),
                          doc='investment demand', mutable = True)
         
         def E0_init(model, i):
             return model.sam[i, 'EXT']
         
         
-        self.m.E0 = Param(self.m.i, initialize=E0_init,
+        self.m.E0 = Param(self.m.i, initialize=self.calibrated('E0', E0_init),
                          doc='exports', mutable = True)
         
         def Q0_init(model, i):
             return model.Xp0[i] + model.Xg0[i] + model.Xv0[i] + sum(model.X0[i,j] for j in model.i)
         
         
-        self.m.Q0 = Param(self.m.i, initialize=Q0_init,
+        self.m.Q0 = Param(self.m.i, initialize=self.calibrated('Q0', Q0_init),
                          doc='Armingtons composite good', mutable = True)
         
         def D0_init(model, i):
             return (1 + model.tauz[i])*model.Z0[i]-model.E0[i]
         
         
-        self.m.D0 = Param(self.m.i, initialize=D0_init,
+        self.m.D0 = Param(self.m.i, initialize=self.calibrated('D0', D0_init),
                          doc='domestic good', mutable = True)
         
         def Sp0_init(model):
             return model.sam['INV', 'HOH']
         
         
-        self.m.Sp0 = Param(initialize=Sp0_init,
+        self.m.Sp0 = Param(initialize=self.calibrated('Sp0', Sp0_init),
                          doc='private saving', mutable = True)
         
         def Sg0_init(model):
             return model.sam['INV','GOV']
         
         
-        self.m.Sg0 = Param(initialize=Sg0_init,
+        self.m.Sg0 = Param(initialize=self.calibrated('Sg0', Sg0_init),
                          doc='government saving', mutable = True)
         
         def Sf_init(model):
             return model.sam['INV','EXT']
         
         
-        self.m.Sf = Param(initialize=Sf_init,
+        self.m.Sf = Param(initialize=self.calibrated('Sf', Sf_init),
                          doc='foreign saving in US dollars', mutable = True)
         
         def pWe_init(model, i):
@@ -203,121 +430,121 @@ class StdModelDef:
             return 2
         
         
-        self.m.sigma = Param(self.m.i, initialize=sigma_init,
-                            doc='elasticity of substitution')
+        self.m.sigma = Param(self.m.i, initialize=self.calibrated('sigma', sigma_init),
+                            doc='elasticity of substitution', mutable = True)
         
         def psi_init(model, i):
             return 2
         
-        self.m.psi = Param(self.m.i, initialize=psi_init,
-                            doc='elasticity of transformation')
+        self.m.psi = Param(self.m.i, initialize=self.calibrated('psi', psi_init),
+                            doc='elasticity of transformation', mutable = True)
         
         def eta_init(model, i):
             return (model.sigma[i] - 1) / model.sigma[i]
         
-        self.m.eta = Param(self.m.i, initialize=eta_init,
-                            doc='substitution elasticity parameter')
+        self.m.eta = Param(self.m.i, initialize=self.calibrated('eta', eta_init),
+                            doc='substitution elasticity parameter', mutable = True)
         
         def phi_init(model, i):
             return (model.psi[i] + 1) / model.psi[i]
         
-        self.m.phi = Param(self.m.i, initialize=phi_init,
-                            doc='transformation elasticity parameter')
+        self.m.phi = Param(self.m.i, initialize=self.calibrated('phi', phi_init),
+                            doc='transformation elasticity parameter', mutable = True)
         
         def alpha_init(model, i):
             return (model.Xp0[i])/ sum(model.Xp0[j] for j in model.i)
         
-        self.m.alpha = Param(self.m.i, initialize=alpha_init,
+        self.m.alpha = Param(self.m.i, initialize=self.calibrated('alpha', alpha_init),
                             doc='share parameter in utility func.')
             
         def beta_init(model, h, i):
             return (model.F0[h, i]) / sum(model.F0[k,i] for k in model.h)
         
-        self.m.beta = Param(self.m.h, self.m.i,  initialize=beta_init,
+        self.m.beta = Param(self.m.h, self.m.i,  initialize=self.calibrated('beta', beta_init),
                             doc='share parameter in production func.')
             
         def b_init(model, i):
             return model.Y0[i] / np.prod([model.F0[h, i]**model.beta[h, i] for h in model.h])
         
-        self.m.b = Param(self.m.i, initialize=b_init,
+        self.m.b = Param(self.m.i, initialize=self.calibrated('b', b_init),
                             doc='scale parameter in production func.')
             
         def ax_init(model, i, j):
             return model.X0[i,j] / model.Z0[j]
         
-        self.m.ax = Param(self.m.i, self.m.i, initialize=ax_init,
+        self.m.ax = Param(self.m.i, self.m.i, initialize=self.calibrated('ax', ax_init),
                             doc='intermediate input requirement coeff.')
             
         def ay_init(model,i):
             return model.Y0[i]/model.Z0[i]
             
-        self.m.ay = Param(self.m.i, initialize=ay_init,
+        self.m.ay = Param(self.m.i, initialize=self.calibrated('ay', ay_init),
                             doc=' composite fact. input req. coeff.')
             
         def mu_init(model, i):
             return model.Xg0[i] / sum(model.Xg0[j] for j in model.i)
             
-        self.m.mu = Param(self.m.i, initialize=mu_init,
+        self.m.mu = Param(self.m.i, initialize=self.calibrated('mu', mu_init),
                             doc=' government consumption share')
             
         def lambd_init (model, i):
             return model.Xv0[i] / (model.Sp0 + model.Sg0 + model.Sf)
             
-        self.m.lambd = Param(self.m.i, initialize=lambd_init,
+        self.m.lambd = Param(self.m.i, initialize=self.calibrated('lambd', lambd_init),
                             doc='investment demand share')
         
         def deltam_init(model, i):
             return (1+model.taum[i])*model.M0[i]**(1-model.eta[i]) / ((1+model.taum[i])*model.M0[i]**(1-model.eta[i]) + model.D0[i]**(1-model.eta[i]))
             
-        self.m.deltam = Param(self.m.i, initialize=deltam_init,
-                            doc='share par. in Armington func.')
+        self.m.deltam = Param(self.m.i, initialize=self.calibrated('deltam', deltam_init),
+                            doc='share par. in Armington func.', mutable = True)
             
         def deltad_init(model, i):
             return model.D0[i]**(1-model.eta[i]) / ((1+model.taum[i])*model.M0[i]**(1-model.eta[i]) + model.D0[i]**(1-model.eta[i]))
             
-        self.m.deltad = Param(self.m.i, initialize=deltad_init,
-                            doc='share par. in Armington func.')
+        self.m.deltad = Param(self.m.i, initialize=self.calibrated('deltad', deltad_init),
+                            doc='share par. in Armington func.', mutable = True)
             
         def gamma_init(model, i):
             return model.Q0[i] / (model.deltam[i]*model.M0[i]**model.eta[i]+model.deltad[i]*model.D0[i]**model.eta[i])**(1/model.eta[i])
                
-        self.m.gamma = Param(self.m.i, initialize=gamma_init,
-                            doc='scale par. in Armington func.')
+        self.m.gamma = Param(self.m.i, initialize=self.calibrated('gamma', gamma_init),
+                            doc='scale par. in Armington func.', mutable = True)
             
         def xie_init(model, i):
             return model.E0[i]**(1-model.phi[i])/(model.E0[i]**(1-model.phi[i])+model.D0[i]**(1-model.phi[i]))
          
-        self.m.xie = Param(self.m.i, initialize=xie_init,
-                            doc='share par. in transformation func.')
+        self.m.xie = Param(self.m.i, initialize=self.calibrated('xie', xie_init),
+                            doc='share par. in transformation func.', mutable = True)
         
         def  xid_init(model, i):
             return model.D0[i]**(1-model.phi[i])/(model.E0[i]**(1-model.phi[i])+model.D0[i]**(1-model.phi[i]))
             
-        self.m.xid = Param(self.m.i, initialize=xid_init,
-                            doc='share par. in transformation func.')
+        self.m.xid = Param(self.m.i, initialize=self.calibrated('xid', xid_init),
+                            doc='share par. in transformation func.', mutable = True)
         
         def theta_init(model, i):
             return model.Z0[i] / (model.xie[i]*model.E0[i]**model.phi[i]+model.xid[i]*model.D0[i]**model.phi[i])**(1/model.phi[i])
            
-        self.m.theta = Param(self.m.i, initialize=theta_init,
-                            doc='scale par. in transformation func.')
+        self.m.theta = Param(self.m.i, initialize=self.calibrated('theta', theta_init),
+                            doc='scale par. in transformation func.', mutable = True)
              
         def ssp_init(model):
             return model.Sp0/sum(model.FF[h] for h in model.h)
             
-        self.m.ssp = Param(initialize=ssp_init,
+        self.m.ssp = Param(initialize=self.calibrated('ssp', ssp_init),
                             doc='average propensity for private saving')
             
         def ssg_init(model):
             return model.Sg0/(model.Td0+sum(model.Tz0[i] for i in model.i)+sum(model.Tm0[i] for i in model.i))
             
-        self.m.ssg = Param(initialize=ssg_init,
+        self.m.ssg = Param(initialize=self.calibrated('ssg', ssg_init),
                             doc='average propensity for gov. saving')
             
         def taud_init(model):
             return model.Td0/sum(model.FF[h] for h in model.h)
                 
-        self.m.taud = Param(initialize=taud_init,
+        self.m.taud = Param(initialize=self.calibrated('taud', taud_init),
                             doc='direct tax rate')
            
         # ------------------------------------------- #
@@ -325,57 +552,57 @@ class StdModelDef:
         # DEFINE VARIABLES
         
         self.m.Y = Var(self.m.i,
-                      initialize=Y0_init,
+                      initialize=self.calibrated('Y0', Y0_init),
                       within=PositiveReals,
                       doc='composite factor')
         
         self.m.F = Var(self.m.h, self.m.i,
-                      initialize=F0_init,
+                      initialize=self.calibrated('F0', F0_init),
                       within=PositiveReals,
                       doc='the h-th factor input by the j-th firm')
         
         self.m.X = Var(self.m.i, self.m.i,
-                      initialize=X0_init,
+                      initialize=self.calibrated('X0', X0_init),
                       within=PositiveReals,
                       doc='intermediate input')
         
         self.m.Z = Var(self.m.i,
-                      initialize=Z0_init,
+                      initialize=self.calibrated('Z0', Z0_init),
                       within=PositiveReals,
                       doc='output of the j-th good')
         
         self.m.Xp = Var(self.m.i,
-                      initialize=Xp0_init,
+                      initialize=self.calibrated('Xp0', Xp0_init),
                       within=PositiveReals,
                       doc=' household consumption of the i-th good')
         
         self.m.Xg = Var(self.m.i,
-                      initialize=Xg0_init,
+                      initialize=self.calibrated('Xg0', Xg0_init),
                       within=PositiveReals,
                       doc='government consumption')
         
         self.m.Xv = Var(self.m.i,
-                      initialize=Xv0_init,
+                      initialize=self.calibrated('Xv0', Xv0_init),
                       within=PositiveReals,
                       doc=' investment demand')
         
         self.m.E = Var(self.m.i,
-                      initialize=E0_init,
+                      initialize=self.calibrated('E0', E0_init),
                       within=PositiveReals,
                       doc=' exports')
         
         self.m.M = Var(self.m.i,
-                      initialize=M0_init,
+                      initialize=self.calibrated('M0', M0_init),
                       within=PositiveReals,
                       doc='imports')
         
         self.m.Q = Var(self.m.i,
-                      initialize=Q0_init,
+                      initialize=self.calibrated('Q0', Q0_init),
                       within=PositiveReals,
                       doc='Armingtons composite good')
         
         self.m.D = Var(self.m.i,
-                      initialize=D0_init,
+                      initialize=self.calibrated('D0', D0_init),
                       within=PositiveReals,
                       doc='domestic good')
         
@@ -426,30 +653,50 @@ class StdModelDef:
                       doc='exchange rate')
         
         self.m.Sp = Var(
-                      initialize=Sp0_init,
+                      initialize=self.calibrated('Sp0', Sp0_init),
                       within=PositiveReals,
                       doc='private saving')
         
         self.m.Sg = Var(
-                      initialize=Sg0_init,
+                      initialize=self.calibrated('Sg0', Sg0_init),
                       within=PositiveReals,
                       doc='government saving')
         
         self.m.Td = Var(
-                      initialize=Td0_init,
+                      initialize=self.calibrated('Td0', Td0_init),
                       within=PositiveReals,
                       doc='direct tax')
         
         self.m.Tz = Var(self.m.i,
-                      initialize=Tz0_init,
+                      initialize=self.calibrated('Tz0', Tz0_init),
                       within=PositiveReals,
                       doc='production tax')
         
         self.m.Tm = Var(self.m.i,
-                      initialize=Tm0_init,
+                      initialize=self.calibrated('Tm0', Tm0_init),
                       within=PositiveReals,
                       doc='import tariff')
         
+        # ------------------------------------------- #
+        # DEFINE AGGREGATES
+        # (named once and referenced by the equations that use them; the NL file and solver see the same sums)
+        
+        def income_rule(model):
+            return sum(model.pf[h]*model.FF[h] for h in model.h)
+        
+        self.m.income = Expression(rule=income_rule, doc='household factor income')
+        
+        def revenue_rule(model):
+            return model.Td +sum(model.Tz[j] for j in model.i) +sum(model.Tm[j] for j in model.i)
+        
+        self.m.revenue = Expression(rule=revenue_rule, doc='government tax revenue')
+        
+        def savings_rule(model):
+            return model.Sp +model.Sg +model.epsilon*model.Sf
+        
+        self.m.savings = Expression(rule=savings_rule, doc='total savings')
+        
+        
         # ------------------------------------------- #
         # DEFINE EQUATIONS
         
@@ -479,7 +726,7 @@ class StdModelDef:
         self.m.eqpzs = Constraint(self.m.i, rule=eqpzs_rule, doc='unit cost function')
         
         def eqTd_rule(model):
-            return (model.Td == model.taud*sum(model.pf[h]*model.FF[h] for h in model.h) )
+            return (model.Td == model.taud*model.income)
         
         self.m.eqTd = Constraint(rule=eqTd_rule, doc='direct tax revenue function')
         
@@ -494,27 +741,27 @@ class StdModelDef:
         self.m.eqTm = Constraint(self.m.i, rule=eqTm_rule, doc='import tariff revenue function')
         
         def eqXg_rule(model, i):
-            return (model.Xg[i] == model.mu[i]*(model.Td +sum(model.Tz[j] for j in model.i) +sum(model.Tm[j] for j in model.i)- model.Sg)  /model.pq[i])
+            return (model.Xg[i] == model.mu[i]*(model.revenue - model.Sg)/model.pq[i])
         
         self.m.eqXg = Constraint(self.m.i, rule=eqXg_rule, doc='government demand function')
         
         def eqXv_rule(model, i):
-            return (model.Xv[i] == model.lambd[i]*(model.Sp +model.Sg +model.epsilon*model.Sf)/model.pq[i])
+            return (model.Xv[i] == model.lambd[i]*model.savings/model.pq[i])
         
         self.m.eqXv = Constraint(self.m.i, rule=eqXv_rule, doc='investment demand function')
         
         def eqSp_rule(model):
-            return (model.Sp == model.ssp*sum(model.pf[h]*model.FF[h] for h in model.h) )
+            return (model.Sp == model.ssp*model.income)
         
         self.m.eqSp = Constraint(rule=eqSp_rule, doc='private saving function')
         
         def eqSg_rule(model):
-            return (model.Sg == model.ssg*(model.Td +sum(model.Tz[j] for j in model.i)+sum(model.Tm[j] for j in model.i)))
+            return (model.Sg == model.ssg*model.revenue)
         
         self.m.eqSg = Constraint(rule=eqSg_rule, doc='government saving function')
         
         def eqXp_rule(model, i):
-            return (model.Xp[i] == model.alpha[i]*(sum(model.pf[h]*model.FF[h] for h in model.h) - model.Sp - model.Td) / model.pq[i])
+            return (model.Xp[i] == model.alpha[i]*(model.income - model.Sp - model.Td) / model.pq[i])
         
         self.m.eqXp = Constraint(self.m.i, rule=eqXp_rule, doc='household demand function')
         
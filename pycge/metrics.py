@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Stage-level timing of the PyCGE pipeline.
+
+`PyCGE.metrics` records, for every stage (building the model, loading data,
+creating the instance, each solve and its NL writing / solver run / solution
+reading, postprocessing), the wall time, CPU time and peak Python memory, plus
+what the stage reports about itself (e.g. the solver iterations). Records are
+plain dicts, exported with `to_jsonl` or `to_frame`.
+
+Recording is off unless ``PyCGE(model_def, metrics=True)`` or
+``metrics.enable()``. Peak memory comes from `tracemalloc`, which slows Python
+code down severalfold; ``Metrics(enabled=True, memory=False)`` records times
+only. When it is off every stage is a shared no-op context
+manager, so the instrumentation costs one attribute check per stage.
+"""
+import contextlib
+import functools
+import json
+import time
+import tracemalloc
+
+
+NULL_STAGE = contextlib.nullcontext() #yields None, so callers can skip filling in a record
+
+#methods of Pyomo's shell solvers (e.g. Ipopt through an NL file), timed as sub-stages of a solve
+SOLVER_STEPS = (('_presolve', 'write'), ('_apply_solver', 'solver'), ('_postsolve', 'read'))
+
+
+class Metrics:
+    """Records of the stages run by a `PyCGE` object."""
+
+    def __init__(self, enabled=False, memory=True):
+
+        self.enabled = False
+        self.memory = memory #whether peak memory is traced
+        self.records = [] #one dict per finished stage, in the order they finished
+        self.open = [] #records of the stages currently running, outermost first
+        self.started_tracing = False
+        if enabled:
+            self.enable()
+
+    def __repr__(self):
+        return "Metrics(enabled=%s, memory=%s, %d records)" % (self.enabled, self.memory, len(self.records))
+
+    def enable(self):
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+
+        self.enabled = False
+        if self.started_tracing and not self.open:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def clear(self):
+        self.records = []
+
+    def stage(self, name, **info):
+        #context manager that times `name`; it yields the record (None when disabled) so the stage can add fields
+        if not self.enabled:
+            return NULL_STAGE
+        return self.timed_stage(name, info)
+
+    @contextlib.contextmanager
+    def timed_stage(self, name, info):
+
+        record = {'stage': name, 'parent': self.open[-1]['stage'] if self.open else None}
+        record.update(info)
+        tracing = self.memory and tracemalloc.is_tracing()
+        current = 0
+        if tracing:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        record['_start_bytes'] = current
+        record['_child_peak'] = 0
+        self.open.append(record)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            self.open.pop()
+            start_bytes = record.pop('_start_bytes')
+            child_peak = record.pop('_child_peak')
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                #the tracemalloc peak was reset by any inner stage, so take the larger of the two
+                peak = max(peak, child_peak)
+                record['peak_bytes'] = peak - start_bytes
+                if self.open:
+                    self.open[-1]['_child_peak'] = max(self.open[-1]['_child_peak'], peak)
+            else:
+                record['peak_bytes'] = None
+            record['time'] = time.time()
+            self.records.append(record)
+
+    def instrument(self, solver):
+        #time the NL writing, solver run and solution reading of one Pyomo shell solver object as sub-stages
+
+        if not self.enabled:
+            return solver
+        for method_name, stage_name in SOLVER_STEPS:
+            method = getattr(solver, method_name, None)
+            if method is not None:
+                setattr(solver, method_name, self.timed_method(method, stage_name))
+        return solver
+
+    def timed_method(self, method, stage_name):
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with self.stage(stage_name):
+                return method(*args, **kwargs)
+        return timed
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        #total and mean wall/CPU time, and the largest peak memory, of each stage
+        frame = self.to_frame()
+        if frame.empty:
+            return frame
+        return frame.groupby('stage', sort=False).agg(count=('wall_s', 'size'), wall_s=('wall_s', 'sum'),
+                                                       mean_wall_s=('wall_s', 'mean'), cpu_s=('cpu_s', 'sum'),
+                                                       peak_bytes=('peak_bytes', 'max'))
+
+    def to_jsonl(self, path, append=True):
+        #one JSON object per record
+
+        with open(path, 'a' if append else 'w') as jsonl_file:
+            for record in self.records:
+                jsonl_file.write(json.dumps(record, default=str) + '\n')
+        return path
+
+
+def timed(stage_name):
+    #decorator for `PyCGE` methods: the whole call is one stage of `self.metrics`
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(stage_name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
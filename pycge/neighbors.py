@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Starting points from the nearest solved instances.
+
+A `NeighborIndex` keeps the solution of every SIM (or scenario) solved from one
+calibrated BASE, together with where it lies in parameter space: its mutable
+Param values and the values of its fixed Vars. Only the coordinates that some
+stored point (or the instance being solved) changed from BASE are compared,
+each divided by max(|BASE value|, 1), and the nearest points are found with a
+KD-tree over those coordinates.
+
+`NeighborIndex.start` then seeds the free Vars of an instance with
+
+* ``'nearest'``: the solution of the nearest solved point, or
+* ``'interpolate'``: the combination of the solutions of the `k` nearest points
+  whose weights (summing to 1) best reproduce the instance's parameters. In a
+  sweep of one tax rate this is linear interpolation between, or extrapolation
+  beyond, the two closest rates solved.
+
+Values on (or beyond) a Var bound are replaced by the BASE value. The KD-tree
+needs ``scipy``.
+"""
+import numpy as np
+
+from pyomo.common.dependencies import attempt_import
+
+from pycge.components import ComponentIndex
+
+spatial, _ = attempt_import('scipy.spatial') #imported on the first lookup
+
+
+METHODS = ('nearest', 'interpolate')
+K = 3 #neighbours combined by 'interpolate'
+MAX_POINTS = 1000 #solved points kept; the oldest are dropped first
+MAX_WEIGHT = 4.0 #'interpolate' falls back to 'nearest' when the weights' absolute values add up to more
+BOUND_PUSH = 1e-2 #a solved value closer than this (times max(|bound|, 1)) to its bound is not used as a start
+
+
+class NeighborIndex:
+    """Solved instances of one BASE, looked up by their distance in parameter space."""
+
+    def __init__(self, base, max_points=MAX_POINTS):
+
+        self.base = base
+        self.max_points = max_points
+        self.elements = ComponentIndex(base) #any copy of BASE has its elements in the same order
+        state = self.elements.capture()
+        self.base_values = state.var_values
+        self.base_point = self.point(state)
+        self.scale = np.maximum(np.abs(self.base_point), 1.0)
+        _, variables = self.elements.elements()
+        self.lower = np.array([-np.inf if v.lb is None else v.lb for v in variables], dtype=float)
+        self.upper = np.array([np.inf if v.ub is None else v.ub for v in variables], dtype=float)
+        self.push = BOUND_PUSH * np.maximum(np.abs(np.nan_to_num(self.lower, neginf=0.0)),
+                                            np.abs(np.nan_to_num(self.upper, posinf=0.0)))
+        self.push = np.maximum(self.push, BOUND_PUSH)
+        self.points = [] #parameter-space coordinates of every solved instance
+        self.solutions = [] #and its Var values
+        self.names = [] #label of each, by default the number of the solve
+        self.added = 0
+        self.tree = None #KD-tree over `points`, rebuilt when a point is added or other coordinates are compared
+        self.dims = None #coordinates the tree was built over
+
+    def __len__(self):
+        return len(self.points)
+
+    def point(self, state):
+        #mutable Param values, then the values of fixed Vars (BASE values for free ones), unset ones as 0
+
+        var_values = np.where(state.var_fixed, state.var_values, self.base_values)
+        return np.nan_to_num(np.concatenate([state.param_values, var_values]))
+
+    def capture(self, instance):
+
+        if self.elements.instance is not instance:
+            self.elements = ComponentIndex(instance)
+        return self.elements.capture()
+
+    def add(self, instance, name=None):
+        #remember the solution `instance` holds now
+
+        state = self.capture(instance)
+        self.points.append(self.point(state))
+        self.solutions.append(state.var_values)
+        self.names.append(name if name is not None else self.added)
+        self.added += 1
+        if len(self.points) > self.max_points:
+            del self.points[0], self.solutions[0], self.names[0]
+        self.tree = None
+
+    def neighbors(self, point, k=1):
+        #(distances, positions) of the `k` stored points nearest to `point`, nearest first
+
+        points = np.array(self.points)
+        dims = np.flatnonzero(np.any(points != self.base_point, axis=0) | (point != self.base_point))
+        if not len(dims): #every point is BASE itself
+            return np.zeros(1), np.array([len(points) - 1])
+        if self.tree is None or not np.array_equal(dims, self.dims):
+            self.dims = dims
+            self.tree = spatial.cKDTree(points[:, dims] / self.scale[dims])
+        k = min(k, len(points))
+        distances, positions = self.tree.query(point[dims] / self.scale[dims], k=k)
+        return np.atleast_1d(distances), np.atleast_1d(positions)
+
+    def start(self, instance, method='nearest', k=K):
+        """Seed the free Vars of `instance` from the nearest solved points and return a dict describing the start.
+
+        Returns None when nothing has been solved yet.
+        """
+        if method not in METHODS:
+            raise ValueError("method must be one of %s, not %r" % (METHODS, method))
+        if not self.points:
+            return None
+
+        state = self.capture(instance)
+        point = self.point(state)
+        distances, positions = self.neighbors(point, k if method == 'interpolate' else 1)
+        weights = np.ones(1)
+        if method == 'interpolate' and len(positions) > 1 and distances[0] > 0:
+            weights = affine_weights(np.array(self.points)[positions][:, self.dims] / self.scale[self.dims],
+                                     point[self.dims] / self.scale[self.dims])
+            if weights is None:
+                method, weights, positions = 'nearest', np.ones(1), positions[:1]
+        else:
+            method, positions = 'nearest', positions[:1]
+
+        values = np.tensordot(weights, np.array(self.solutions)[positions], axes=1)
+        #a value on its bound (e.g. tariff revenue at a zero tariff) is a poor start for any other point; take BASE's
+        on_bound = (values < self.lower + self.push) | (values > self.upper - self.push)
+        values = np.clip(np.where(on_bound, self.base_values, values), self.lower, self.upper)
+        _, variables = self.elements.elements()
+        for j in np.flatnonzero(~state.var_fixed & ~np.isnan(values)): #never overwrite a value the user fixed
+            variables[j].set_value(float(values[j]), skip_validation=True)
+        return {'method': method, 'neighbors': [self.names[j] for j in positions],
+                'weights': weights.tolist(), 'distance': float(distances[0])}
+
+
+def affine_weights(points, target):
+    #weights w, summing to 1, with w @ points as close to `target` as possible (the smallest such w);
+    #None when they are so large that the solutions would be extrapolated too far
+
+    A = np.vstack([points.T, np.ones(len(points))])
+    b = np.append(target, 1.0)
+    weights, _, _, _ = np.linalg.lstsq(A, b, rcond=None)
+    if not np.all(np.isfinite(weights)) or np.abs(weights).sum() > MAX_WEIGHT:
+        return None
+    return weights
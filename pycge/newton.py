@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+In-process damped Newton engine for square CGE systems.
+
+The `*ModelDef` systems are square: the objective is fictitious and the
+equality constraints pin down the equilibrium. This engine reads the active
+constraints of a Pyomo instance, treats every fixed variable (e.g. the
+numeraire fixed by `model_instance`) as data, and solves the remaining
+equations with a damped Newton method and a sparse LU factorization. No NL
+file is written and no external solver is called.
+
+Use it by passing ``solver='newton'`` to `model_calibrate` or `model_solve`.
+``solver='check'`` solves nothing: it only checks that the current values
+already satisfy every constraint (`check_point`), which is how `model_calibrate`
+recognizes a benchmark point that needs no solver.
+
+The same Jacobian gives the sensitivities of a solved equilibrium to mutable
+Params by the implicit function theorem (`implicit_sensitivities`).
+"""
+import time
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from pyomo.core import Constraint, value
+from pyomo.core.expr.visitor import identify_variables, identify_mutable_parameters
+from pyomo.core.expr.calculus.derivatives import differentiate, Modes
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+
+
+SOLVER_NAME = 'newton'
+CHECK_NAME = 'check' #checks the current point instead of solving
+
+TOL = 1e-8 #largest absolute constraint residual accepted as a solution
+MAX_ITER = 50 #Newton iterations before giving up
+MIN_STEP = 1e-8 #smallest damping factor tried in the line search
+BOUNDARY_FRACTION = 0.99 #how close a step may get to a variable bound
+
+
+class NewtonSystem:
+    """Residuals and sparse Jacobian of the equality constraints of `instance`."""
+
+    def __init__(self, instance):
+
+        self.instance = instance
+        self.cons = []
+        for c in instance.component_data_objects(Constraint, active=True):
+            if not c.equality:
+                raise ValueError("constraint %s is not an equality; the newton engine only solves square systems" % c.name)
+            self.cons.append(c)
+
+        #the unknowns are the free variables that appear in some constraint
+        self.vars = []
+        position = {}
+        self.con_vars = [] #for each constraint, the positions of its free variables
+        for c in self.cons:
+            cols = []
+            for v in identify_variables(c.body, include_fixed=False):
+                if id(v) not in position:
+                    position[id(v)] = len(self.vars)
+                    self.vars.append(v)
+                cols.append(position[id(v)])
+            self.con_vars.append(cols)
+
+        self.rows = np.repeat(np.arange(len(self.cons)), [len(cols) for cols in self.con_vars])
+        self.cols = np.array([j for cols in self.con_vars for j in cols], dtype=int)
+
+        self.lower = np.array([-np.inf if v.lb is None else v.lb for v in self.vars], dtype=float)
+        self.upper = np.array([np.inf if v.ub is None else v.ub for v in self.vars], dtype=float)
+        #prices and quantities bounded only below by zero are stepped in logs, so they stay positive;
+        #one that is exactly zero (a zero flow in the SAM) has no log and is stepped like any other bounded variable
+        self.positive = (self.lower == 0) & (self.upper == np.inf)
+
+    @property
+    def shape(self):
+        return len(self.cons), len(self.vars)
+
+    def get_x(self):
+        return np.array([v.value for v in self.vars], dtype=float)
+
+    def set_x(self, x):
+        for v, val in zip(self.vars, x):
+            v.set_value(float(val), skip_validation=True)
+
+    def residual(self):
+        #an undefined term (e.g. 0 raised to a negative power) gives nan instead of a logged error
+        values = [value(c.body, exception=False) for c in self.cons]
+        return np.array([np.nan if v is None else v - value(c.upper) for c, v in zip(self.cons, values)], dtype=float)
+
+    def jacobian(self):
+        data = []
+        for c, cols in zip(self.cons, self.con_vars):
+            if cols:
+                data.extend(differentiate(c.body, wrt_list=[self.vars[j] for j in cols], mode=Modes.reverse_numeric))
+        return sp.csc_matrix((data, (self.rows, self.cols)), shape=self.shape)
+
+    def param_jacobian(self, params):
+        #derivatives of the constraint bodies with respect to the mutable Param elements `params`
+
+        position = {id(p): k for k, p in enumerate(params)}
+        rows, cols, data = [], [], []
+        for row, c in enumerate(self.cons):
+            expr = c.body - c.upper #a Param alone on one side of the equation ends up in `upper`, not `body`
+            found = [p for p in identify_mutable_parameters(expr) if id(p) in position]
+            if found:
+                rows.extend([row] * len(found))
+                cols.extend(position[id(p)] for p in found)
+                data.extend(differentiate(expr, wrt_list=found, mode=Modes.reverse_numeric))
+        return sp.csc_matrix((data, (rows, cols)), shape=(len(self.cons), len(params)))
+
+    def log_stepped(self, x):
+        return self.positive & (x > 0)
+
+    def move(self, x, dx, step):
+        #Newton step in x, taken in log(x) for the positive variables
+        x_new = x + step * dx
+        pos = self.log_stepped(x)
+        x_new[pos] = x[pos] * np.exp(step * dx[pos] / x[pos])
+        return x_new
+
+    def max_step(self, x, dx):
+        #largest step in (0, 1] that keeps x strictly inside its (non log-stepped) bounds
+        step = 1.0
+        additive = ~self.log_stepped(x)
+        down = (dx < 0) & additive
+        if np.any(down):
+            step = min(step, np.min(BOUNDARY_FRACTION * (self.lower[down] - x[down]) / dx[down]))
+        up = (dx > 0) & additive
+        if np.any(up):
+            step = min(step, np.min(BOUNDARY_FRACTION * (self.upper[up] - x[up]) / dx[up]))
+        return max(step, 0.0)
+
+
+def factorize(J):
+    #one sparse LU of J; the returned function solves J dx = b (b a vector or a matrix of right-hand sides)
+    #square systems use J directly; an extra (Walras-redundant) equation is handled with the normal equations
+
+    m, n = J.shape
+    if m == n:
+        return spla.splu(J.tocsc()).solve
+    JT = J.T.tocsc()
+    lu = spla.splu((JT @ J).tocsc())
+    return lambda b: lu.solve(JT @ b)
+
+
+def newton_direction(J, r):
+    return factorize(J)(-r)
+
+
+def implicit_sensitivities(instance, params=None):
+    """dx*/dp of the free variables of a solved `instance` with respect to mutable Param
+    elements, by the implicit function theorem: J_x dx/dp = -J_p. `params` defaults to every
+    mutable Param element in the constraints. Returns the variables (rows), the Param
+    elements (columns) and a dense matrix."""
+
+    system = NewtonSystem(instance)
+    m, n = system.shape
+    if m < n:
+        raise ValueError("%d equations for %d unknowns: the sensitivities are not unique" % (m, n))
+    if params is None:
+        params = []
+        seen = set()
+        for c in system.cons:
+            for p in identify_mutable_parameters(c.body - c.upper):
+                if id(p) not in seen:
+                    seen.add(id(p))
+                    params.append(p)
+    solve = factorize(system.jacobian()) #raises RuntimeError if J_x is singular
+    Jp = system.param_jacobian(params)
+    return system.vars, params, solve(-Jp.toarray())
+
+
+def constraint_residuals(instance, vectorized=None):
+    #residuals of the active constraints at the current values, as {component name: array in index order};
+    #`vectorized` holds arrays already computed for some components (e.g. by a ModelDef's `residuals` method)
+
+    residuals = {}
+    for con in instance.component_objects(Constraint, active=True):
+        if vectorized is not None and con.name in vectorized:
+            r = np.ravel(np.asarray(vectorized[con.name], dtype=float))
+            if r.size == len(con) and all(c.active for c in con.values()):
+                residuals[con.name] = r
+                continue
+        values = []
+        for c in con.values():
+            body = value(c.body, exception=False) if c.active else None
+            if not c.active:
+                values.append(0.0)
+            elif body is None:
+                values.append(np.nan)
+            elif c.equality:
+                values.append(body - value(c.upper))
+            else: #an inequality only has a residual where it is violated
+                lower = value(c.lower) if c.has_lb() else -np.inf
+                upper = value(c.upper) if c.has_ub() else np.inf
+                values.append(max(lower - body, body - upper, 0.0))
+        residuals[con.name] = np.array(values, dtype=float)
+    return residuals
+
+
+def largest_residual(residuals):
+    #(largest absolute residual, (component name, position)) of `constraint_residuals`; nan counts as infinite
+
+    norm, worst = 0.0, None
+    for name, r in residuals.items():
+        if r.size:
+            size = np.where(np.isnan(r), np.inf, np.abs(r)) #an undefined residual is the worst there is
+            k = int(np.argmax(size))
+            if worst is None or size[k] > norm:
+                norm, worst = float(size[k]), (name, k)
+    return norm, worst
+
+
+def check_point(instance, tol=TOL, vectorized=None):
+    """`SolverResults` for the current values of `instance`, which are left as they are:
+    optimal when every active constraint holds within `tol`, otherwise a warning that
+    names the constraint with the largest residual.
+
+    `vectorized` (arrays from a ModelDef's `residuals` method) only screens the point:
+    if they already show a residual above `tol` the point is rejected at once, but a
+    point is only accepted once every constraint body has been evaluated.
+    """
+
+    start = time.time()
+    results = SolverResults()
+    results.solver.name = CHECK_NAME
+    results.problem.name = instance.name
+
+    if vectorized is not None:
+        residuals = constraint_residuals(instance, vectorized)
+        norm, worst = largest_residual(residuals)
+    if vectorized is None or norm <= tol: #only the constraint bodies accept a point
+        residuals = constraint_residuals(instance)
+        norm, worst = largest_residual(residuals)
+    results.problem.number_of_constraints = sum(r.size for r in residuals.values())
+
+    if norm <= tol:
+        results.solver.status = SolverStatus.ok
+        results.solver.termination_condition = TerminationCondition.optimal
+        results.solver.message = "check: the current point satisfies every constraint, max residual %.3e" % norm
+    else:
+        con = instance.component(worst[0])
+        element = con[list(con.keys())[worst[1]]]
+        results.solver.status = SolverStatus.warning
+        results.solver.termination_condition = TerminationCondition.other
+        results.solver.message = "check: max residual %.3e in %s" % (norm, element.name)
+    results.solver.time = time.time() - start
+    return results
+
+
+def newton_solve(instance, tol=TOL, max_iter=MAX_ITER, tee=False, time_limit=None, stop=None):
+    """Solve `instance` in place and return a `SolverResults` like `SolverFactory(...).solve` does.
+
+    The iterations also stop after `time_limit` seconds, or once `stop` (a
+    `threading.Event`, for a solve running in another thread) is set.
+    """
+
+    start = time.time()
+    results = SolverResults()
+    results.solver.name = SOLVER_NAME
+
+    system = NewtonSystem(instance)
+    m, n = system.shape
+    results.problem.name = instance.name
+    results.problem.number_of_constraints = m
+    results.problem.number_of_variables = n
+
+    if m < n:
+        results.solver.status = SolverStatus.error
+        results.solver.termination_condition = TerminationCondition.invalidProblem
+        results.solver.message = "newton: %d equations for %d free variables; fix the numeraire" % (m, n)
+        results.solver.time = time.time() - start
+        return results
+
+    x = system.get_x()
+    if np.any(np.isnan(x)):
+        x = np.where(np.isnan(x), 1.0, x) #variables without a starting value
+        system.set_x(x)
+    r = system.residual()
+    norm = np.max(np.abs(r)) if m else 0.0
+    iterations = 0
+
+    try:
+        with np.errstate(all='ignore'): #overflowing or undefined trial points are rejected by the line search
+            while norm > tol and iterations < max_iter:
+                if stop is not None and stop.is_set():
+                    raise InterruptedError("stopped")
+                if time_limit is not None and time.time() - start > time_limit:
+                    raise TimeoutError("time limit of %g seconds reached" % time_limit)
+                dx = newton_direction(system.jacobian(), r)
+                step = system.max_step(x, dx)
+                merit = r @ r
+                while True: #backtrack until the squared residual decreases
+                    x_new = system.move(x, dx, step)
+                    system.set_x(x_new)
+                    try:
+                        r_new = system.residual()
+                    except (ValueError, TypeError, ZeroDivisionError, OverflowError): #e.g. a negative number raised to a fractional power
+                        r_new = None
+                    if r_new is not None and np.all(np.isfinite(r_new)) and np.sum(r_new**2) < merit:
+                        break
+                    step = step / 2
+                    if step < MIN_STEP:
+                        system.set_x(x)
+                        raise ArithmeticError("line search failed")
+                x, r = x_new, r_new
+                norm = np.max(np.abs(r))
+                iterations += 1
+                if tee:
+                    print("newton iteration %3d  max residual %.3e  step %.3e" % (iterations, norm, step))
+    except (RuntimeError, ArithmeticError) as e: #RuntimeError: singular Jacobian
+        results.solver.status = SolverStatus.warning
+        results.solver.termination_condition = TerminationCondition.solverFailure
+        results.solver.message = "newton: %s after %d iterations, max residual %.3e" % (e, iterations, norm)
+        results.solver.time = time.time() - start
+        return results
+    except (InterruptedError, TimeoutError) as e:
+        results.solver.status = SolverStatus.aborted
+        results.solver.termination_condition = (TerminationCondition.userInterrupt if isinstance(e, InterruptedError)
+                                                else TerminationCondition.maxTimeLimit)
+        results.solver.message = "newton: %s after %d iterations, max residual %.3e" % (e, iterations, norm)
+        results.solver.time = time.time() - start
+        return results
+
+    if norm <= tol:
+        results.solver.status = SolverStatus.ok
+        results.solver.termination_condition = TerminationCondition.optimal
+        results.solver.message = "newton: converged in %d iterations, max residual %.3e" % (iterations, norm)
+    else:
+        results.solver.status = SolverStatus.warning
+        results.solver.termination_condition = TerminationCondition.maxIterations
+        results.solver.message = "newton: stopped after %d iterations, max residual %.3e" % (iterations, norm)
+    results.solver.time = time.time() - start
+
+    return results
@@ -1,34 +1,97 @@
 # Import packages
-from pyomo.environ import *
-import pandas as pd
+#pandas, dill, SciPy (through the Newton engine and SAM balancing) and Pyomo's solver plugins
+#are only imported when a method first needs them, so `import pycge.pycge` stays quick;
+#`attempt_import` returns a stand-in that imports the module on first attribute access
+from pyomo.common.dependencies import attempt_import
+from pyomo.core import Var, Param, Constraint, Suffix, value
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition, SolverFactory, SolverManagerFactory
+from pyomo.opt.parallel.manager import ActionManagerError
 import numpy as np
-import dill
-from pyomo.opt import SolverResults
 import time
 import os
-from pyomo.opt import SolverStatus, TerminationCondition
-import importlib
 import copy
+import re
+import tempfile
+import io
+import contextlib
+import concurrent.futures
+import uuid
+import threading
+from pycge.scenario import Scenario, SharedInstance
+from pycge.results import ResultsStore
+from pycge import snapshot
+from pycge.cache import InstanceCache, SolutionCache, cache_key, solution_key
+from pycge.metrics import Metrics, timed
+from pycge import components
+from pycge.components import ComponentIndex, apply_changes
+from pycge import solverpool #registers the 'localpool' solver manager, so `mgr='localpool'` works
 
+pd, _ = attempt_import('pandas')
+dill, _ = attempt_import('dill')
+newton, _ = attempt_import('pycge.newton')
+balance, _ = attempt_import('pycge.balance')
+dataload, _ = attempt_import('pycge.dataload')
+ssa, _ = attempt_import('pycge.ssa')
+asyncio, _ = attempt_import('asyncio')
+asyncsolve, _ = attempt_import('pycge.asyncsolve')
+neighbors, _ = attempt_import('pycge.neighbors')
 
 
 
+# solvers that can use multipliers and bound duals as a warm start
+INTERIOR_POINT_SOLVERS = ('ipopt',)
+
+# options that tell Ipopt to start from the supplied primal/dual point
+# instead of pushing it back into the interior
+IPOPT_WARMSTART_OPTIONS = {'warm_start_init_point': 'yes',
+                           'warm_start_bound_push': 1e-9,
+                           'warm_start_bound_frac': 1e-9,
+                           'warm_start_slack_bound_frac': 1e-9,
+                           'warm_start_slack_bound_push': 1e-9,
+                           'warm_start_mult_bound_push': 1e-9,
+                           'mu_init': 1e-6}
+
+CONTINUATION_MIN_STEP = 1e-3 #`model_solve_continuation` gives up below this step length
+CONTINUATION_FAST_ITERATIONS = 5 #a step that converges in this many iterations or fewer doubles the next one
+DERIVED_STEP = 1e-5 #relative step of the central differences of `derived_jacobian`
+
+
 class PyCGE:
     """Pyomo port of splcge.gams from GAMS model library"""
     """Inputs: dat, solver """
 
 # --------------------------------------------------------#
 # LOAD MODEL
-    def __init__(self, model_def):
+    def __init__(self, model_def, metrics=False):
 
 
-        self.m = model_def.model()
+        self.metrics = metrics if isinstance(metrics, Metrics) else Metrics(enabled=metrics) #stage timings; see `pycge.metrics`
+        self.model_def = model_def
+        self.model_def_id = snapshot.model_def_id(model_def) #identifies the model definition in snapshots
+        with self.metrics.stage('model'):
+            self.m = model_def.model()
         self.dict_base = {}
         self.dict_sim = {}
+        self.warmstart_point = {} #primal/dual values of the last solved instance
+        self.cold_start_stats = {} #iterations and seconds of the last cold solve of 'base' and 'sim'
+        self.warmstart_stats = {} #savings of the last warm-started solve
+        self.shared = None #working copy of BASE that scenarios are materialized into
+        self.shared_lock = None #(event loop, asyncio.Lock) guarding `shared` during `solve_async`
+        self.results_store = None #columnar file that `model_store` appends solved instances to
+        self.sam_data = None #dense arrays from `model_data(bulk=True)`
+        self.component_indexes = {} #'base'/'sim' -> ComponentIndex, for bulk modifications
+        self.changesets = {'base': {}, 'sim': {}} #name -> Changeset saved by `model_changeset`
+        self.continuation_path = None #steps taken by the last `model_solve_continuation`
+        self.solution_cache = None #solved SIM states that `model_solve` loads instead of solving; see `model_solution_cache`
+        self.neighbor_index = None #solved SIMs and scenarios by their parameters, for `warmstart='nearest'`
+        self.neighbor_stats = [] #one record per solve started from its nearest solved neighbours
 
     # -----------------------------------------------------#
     #LOAD DATA
-    def model_data(self, data_dir = ''):
+    @timed('data')
+    def model_data(self, data_dir = '', bulk=False, workers=None, balance=None):
+        #bulk=True reads the files with pandas in parallel threads instead of one by one through DataPortal;
+        #every SAM is then checked, and rebalanced with `balance` ('cross_entropy' or 'ras') if it is off
         
         if not data_dir.endswith("/") and data_dir != "": #if the user forgot the slash at the end
             data_dir = data_dir + "/" #add one
@@ -41,8 +104,18 @@ class PyCGE:
         elif not os.path.exists(data_dir): #if the directory does not exist
             print("please enter a valid data directory")
         
+        elif bulk == True:
+            
+            self.sam_data = dataload.load_data_dir(data_dir, workers=workers) #dense labeled arrays
+            self.data = self.sam_data.to_pyomo() #what `create_instance` reads
+            self.data_dir = data_dir
+            self.data_fingerprint = snapshot.data_fingerprint(data_dir) #identifies the data in snapshots
+            self.model_balance(balance)
+        
         else:
         
+            from pyomo.dataportal import DataPortal
+            self.sam_data = None
             data = DataPortal() #create data portal
             
             for filenames in os.listdir(data_dir): #go through files in directory
@@ -63,8 +136,57 @@ class PyCGE:
                     print(filenames, " is not in the right format and was not loaded into DataPortal") 
                     
             self.data = data
+            self.data_dir = data_dir
+            self.data_fingerprint = snapshot.data_fingerprint(data_dir) #identifies the data in snapshots
+            self.model_balance(balance)
+
+
+    @timed('balance')
+    def model_balance(self, method=None, tol=None):
+        #check that every SAM (a square param with the same accounts as rows and columns) is balanced;
+        #with `method`, rebalance the ones that are not before the instance is created;
+        #`tol` defaults to `pycge.balance.TOL`
+        
+        if getattr(self, 'data', None) is None:
+            print("You must load data first")
+            return {}
+        
+        if tol is None:
+            tol = balance.TOL
+        reports = {}
+        for name, (accounts, sam) in data_sams(self.data, self.sam_data).items():
+            gap, worst = balance.imbalance(sam)
+            if gap <= tol:
+                continue
+            if method is None:
+                print("param", name, "is not balanced: the row and column totals of", accounts[worst], "differ by %.3g of the largest total." % gap,
+                      "Pass balance='cross_entropy' or 'ras' to `model_data` to rebalance it")
+                reports[name] = {'method': None, 'imbalance_before': gap, 'worst_account': accounts[worst]}
+                continue
+            try:
+                balanced, info = balance.balance(sam, method, tol)
+            except ValueError as e:
+                print("param", name, "could not be balanced:", e)
+                continue
+            info['worst_account'] = accounts[info['worst_account']]
+            set_data_sam(self.data, self.sam_data, name, accounts, balanced)
+            print("param", name, "balanced with", method, "in", info['iterations'], "iterations (imbalance %.3g -> %.3g)" % (info['imbalance_before'], info['imbalance_after']))
+            if not info['converged']:
+                print("Warning: balancing", name, "did not converge; the largest remaining imbalance is in", info['worst_account'])
+            reports[name] = info
+        
+        changed = [name for name, report in reports.items() if report['method'] is not None]
+        if changed:
+            if self.sam_data is not None:
+                self.data = self.sam_data.to_pyomo() #what `create_instance` reads
+            suffix = '+' + method
+            if not self.data_fingerprint.endswith(suffix): #balanced data is not the data on disk
+                self.data_fingerprint += suffix
+        self.balance_report = reports
+        return reports
 
 
+    @timed('instance')
     def model_instance(self, NAME, INDEX):
         
         try:
@@ -72,7 +194,14 @@ class PyCGE:
                 try:
                     if self.data: #if the data is loaded
         
-                        self.base = self.m.create_instance(self.data) #create instance
+                        if hasattr(self.model_def, 'calibrate'): #vectorized calibration from the bulk-loaded SAM
+                            if self.sam_data is not None:
+                                with self.metrics.stage('calibrate_sam'):
+                                    self.model_def.calibrate(self.sam_data)
+                            else:
+                                self.model_def.calibration = None
+                        with self.metrics.stage('create_instance'):
+                            self.base = self.m.create_instance(self.data) #create instance
                         test = False #create a flag to check if the NAME was ever found
                         for v in self.base.component_objects(Var, active=True): #go through variables
                             if str(v)==NAME: #find the variable the user entered
@@ -94,6 +223,77 @@ class PyCGE:
             print("model not loaded")
               
 
+    def model_cached_base(self, data_dir, NAME, INDEX, solver, mgr='', cache_dir=None, max_bytes=None, balance=None):
+        #`model_data` + `model_instance` + `model_calibrate`, skipped entirely when the same data,
+        #ModelDef and numeraire have been calibrated before (on this machine)
+        
+        if not data_dir.endswith("/") and data_dir != "": #if the user forgot the slash at the end
+            data_dir = data_dir + "/" #add one
+        if data_dir == "" or not os.path.exists(data_dir):
+            print("please enter a valid data directory")
+            return
+        
+        kwds = {}
+        if cache_dir is not None:
+            kwds['directory'] = cache_dir
+        if max_bytes is not None:
+            kwds['max_bytes'] = max_bytes
+        cache = InstanceCache(**kwds)
+        fingerprint = snapshot.data_fingerprint(data_dir)
+        if balance is not None:
+            fingerprint += '+' + balance #as `model_balance` marks balanced data
+        key = cache_key(fingerprint, self.model_def_id, NAME, INDEX)
+        
+        entry = cache.get(key)
+        if entry is not None:
+            self.data = entry['data']
+            self.data_dir = data_dir
+            self.data_fingerprint = fingerprint
+            self.base = entry['base']
+            self.base_results = entry['base_results']
+            self.base_calibrated = True
+            self.shared = None
+            print("Calibrated BASE instance loaded from cache. Call `model_sim` to create a SIM.")
+            return
+        
+        print("BASE instance not in cache; building and calibrating it")
+        self.model_data(data_dir, balance=balance)
+        self.model_instance(NAME, INDEX)
+        self.model_calibrate(solver, mgr)
+        
+        if getattr(self, 'base_calibrated', False) and self.base_results.solver.termination_condition == TerminationCondition.optimal:
+            cache.put(key, {'data': self.data, 'base': self.base, 'base_results': self.base_results})
+            print("Calibrated BASE instance saved to cache:", cache.path(key))
+        else:
+            print("BASE instance was not calibrated to optimality, so it was not cached")
+
+
+    def model_solution_cache(self, max_entries=None, directory=None, max_bytes=None):
+        #memoize SIM solutions: `model_solve` then loads the stored solution of a SIM it has solved before
+        #(same ModelDef, data, Param values, fixed Vars and solver) instead of calling the solver;
+        #the last `max_entries` are kept in memory and, with a `directory`, every one on disk
+        
+        kwds = {}
+        if max_entries is not None:
+            kwds['max_entries'] = max_entries
+        if max_bytes is not None:
+            kwds['max_bytes'] = max_bytes
+        self.solution_cache = SolutionCache(directory=directory, **kwds)
+        print("Solution cache enabled" + (" (on disk: " + directory + ")" if directory else " (in memory)"))
+        return self.solution_cache
+
+
+    def model_solution_key(self, solver, options=None):
+        #`solution_key` of the SIM as it is now; None when the data has no fingerprint to key it by
+        
+        fingerprint = getattr(self, 'data_fingerprint', None)
+        if fingerprint is None:
+            return None
+        state = self.component_index('sim').capture()
+        return solution_key(self.model_def_id, fingerprint, state, str(solver), options)
+
+
+    @timed('sim')
     def model_sim (self):
         
         try:
@@ -135,17 +335,15 @@ class PyCGE:
                             _object[INDEX].value = self.dict_sim[dict_key] #set the value to what the user entered
                             print(_object[INDEX], " is now set to ", _object[INDEX].value)
                             self.sim_solved = False
-                            
+                        self.model_rederive(self.sim, [NAME])
                         
-                        for v in self.sim.component_objects(Var, active=True): #go through variables
-                            if str(v)==NAME: #if the component they entered was a variable
-                                varobject = getattr(self.sim, str(v)) #get the entered variable
-                                if fix == True:
-                                    varobject[INDEX].fixed = True #fix it (default)
-                                    print("Note, ", _object[INDEX], " is now fixed")
-                                if fix == False:
-                                    varobject[INDEX].fixed = False
-                                    print("Note, ", _object[INDEX], " is NOT fixed")
+                        if isinstance(_object, Var): #if the component they entered was a variable
+                            if fix == True:
+                                _object[INDEX].fixed = True #fix it (default)
+                                print("Note, ", _object[INDEX], " is now fixed")
+                            if fix == False:
+                                _object[INDEX].fixed = False
+                                print("Note, ", _object[INDEX], " is NOT fixed")
     
     
                         print("SIM updated. Call `model_postprocess` to output or `model_solve` to solve.")
@@ -187,16 +385,15 @@ class PyCGE:
                             _object[INDEX].value = self.dict_base[dict_key] #set the value to what the user entered
                             print(_object[INDEX], " is now set to ", _object[INDEX].value)
                             self.base_calibrated = False
+                        self.model_rederive(self.base, [NAME])
                         
-                        for v in self.base.component_objects(Var, active=True): #go through variables
-                            if str(v)==NAME: #if the component they entered was a variable
-                                varobject = getattr(self.base, str(v)) #get the entered variable
-                                if fix == True:
-                                    varobject[INDEX].fixed = True #fix it (default)
-                                    print("Note, ", _object[INDEX], " is now fixed")
-                                if fix == False:
-                                    varobject[INDEX].fixed = False
-                                    print("Note, ", _object[INDEX], " is NOT fixed")
+                        if isinstance(_object, Var): #if the component they entered was a variable
+                            if fix == True:
+                                _object[INDEX].fixed = True #fix it (default)
+                                print("Note, ", _object[INDEX], " is now fixed")
+                            if fix == False:
+                                _object[INDEX].fixed = False
+                                print("Note, ", _object[INDEX], " is NOT fixed")
     
     
                         print("BASE updated. Call `model_postprocess` to output or `model_solve` to solve.")
@@ -215,27 +412,149 @@ class PyCGE:
         print("\nRemember, you can pass in undo=True to restore to the following value:")
         print (self.dict_base)
 
-    def model_calibrate(self, solver, mgr=''):
+
+    def component_index(self, kind):
+        #name -> component index of the 'base' or 'sim' instance, rebuilt only when that instance is replaced
+        
+        instance = getattr(self, kind)
+        index = self.component_indexes.get(kind)
+        if index is None or index.instance is not instance:
+            index = ComponentIndex(instance)
+            self.component_indexes[kind] = index
+        return index
+
+
+    def model_modify_bulk(self, kind, changes, undo_map, fix=True, log=False, rederive=True):
+        #resolve every change first so that a bad NAME or INDEX leaves the instance untouched;
+        #rederive=False when `changes` already holds the derived Params (see `model_rederive`)
+        
+        try:
+            resolved = self.component_index(kind).resolve_changes(changes)
+        except (KeyError, ValueError) as e:
+            print(e.args[0])
+            return 0
+        n = apply_changes(resolved, undo_map, fix=fix, log=log)
+        if rederive:
+            self.model_rederive(getattr(self, kind), [NAME for NAME, INDEX in changes])
+        return n
+
+
+    def model_rederive(self, instance, names):
+        #a model definition may calibrate some Params from others (in `StdModelDef`, eta, phi, deltam, ...
+        #from the elasticities sigma and psi, which appear in no equation); when `names` includes one of
+        #those inputs, recompute the derived Params of `instance` so that the change takes effect
         
+        inputs = [name for name in getattr(self.model_def, 'elasticity_inputs', ()) if name in names]
+        if not inputs:
+            return {}
+        derived = self.model_def.derived_params(instance)
+        for NAME, values in derived.items():
+            component = getattr(instance, NAME)
+            for INDEX, val in values.items():
+                component[INDEX].value = val
+        print(", ".join(derived), "recalibrated for the new", " and ".join(inputs))
+        return derived
+
+
+    def model_modify_sim_bulk(self, changes, fix=True, log=False, rederive=True):
+        #changes: {(NAME, INDEX): VALUE}; INDEX may be '*' (or a tuple with '*') and VALUE an array aligned with the matched indices
+        
+        if getattr(self, 'sim', None) is None:
+            print("Must first create sim instance. Call `model_sim`.")
+            return 0
+        n = self.model_modify_bulk('sim', changes, self.dict_sim, fix=fix, log=log, rederive=rederive)
+        if n:
+            self.sim_solved = False
+            print(n, "SIM elements updated. Call `model_postprocess` to output or `model_solve` to solve.")
+        return n
+
+
+    def model_modify_base_bulk(self, changes, fix=True, log=False, rederive=True):
+        #same as `model_modify_sim_bulk`, for the BASE instance
+        
+        if getattr(self, 'base', None) is None:
+            print("Must first create base instance. Call `model_instance`.")
+            return 0
+        n = self.model_modify_bulk('base', changes, self.dict_base, fix=fix, log=log, rederive=rederive)
+        if n:
+            self.base_calibrated = False
+            print(n, "BASE elements updated. Call `model_postprocess` to output or `model_calibrate` to solve.")
+        return n
+
+
+    def model_changeset(self, name, kind='sim'):
+        #save the current state of the 'base' or 'sim' instance under `name`, e.g. before a batch of edits
+        
+        if getattr(self, kind, None) is None:
+            print("Must first create", kind, "instance.")
+            return None
+        if kind == 'base':
+            solved, results = self.base_calibrated, getattr(self, 'base_results', None)
+        else:
+            solved, results = self.sim_solved, getattr(self, 'sim_results', None)
+        changeset = self.component_index(kind).capture(name, solved, results if solved else None)
+        self.changesets[kind][name] = changeset
+        print(kind.upper(), "state saved as", repr(name) + ". Call `model_rollback` to return to it.")
+        return changeset
+
+
+    def model_rollback(self, name=None, kind='sim'):
+        #restore a state saved by `model_changeset` (the latest one if `name` is None); it stays saved
+        
+        saved = self.changesets[kind]
+        if not saved:
+            print("No", kind.upper(), "state has been saved. Call `model_changeset` first.")
+            return
+        if name is None:
+            name = next(reversed(saved))
+        if name not in saved:
+            print(repr(name), "is not a saved", kind.upper(), "state:", list(saved))
+            return
+        if getattr(self, kind, None) is None:
+            print("Must first create", kind, "instance.")
+            return
+        
+        changeset = saved[name]
+        try:
+            self.component_index(kind).restore(changeset)
+        except ValueError as e:
+            print(e)
+            return
+        if kind == 'base':
+            self.base_calibrated = changeset.solved
+            if changeset.results is not None:
+                self.base_results = changeset.results
+        else:
+            self.sim_solved = changeset.solved
+            if changeset.results is not None:
+                self.sim_results = changeset.results
+        print(kind.upper(), "restored to", repr(name))
+
+    def model_calibrate(self, solver, mgr='', warmstart=False, check=True):
+        #with check=True the benchmark point is tested first; if it already satisfies every constraint
+        #(a balanced SAM) it is taken as the solution and `solver` is never called
         
         try:
             if self.base: #if base instance has already been created
                 if self.base_calibrated == True: #if base has already been calibrated
                     print('Model already calibrated. If a SIM has been created, call `model_solve` to solve it.')
                 else:
-                    if mgr=='':
-                        print('local solver', solver, 'used')
-                        local_solver = SolverFactory(solver)
-                        self.base_results = local_solver.solve(self.base)
-                        self.base.solutions.store_to(self.base_results)
-                    else:
-                        print('solver', solver, 'used through', mgr)
-                        with SolverManagerFactory(mgr) as solver_mgr:
-                            self.base_results = solver_mgr.solve(self.base, opt=solver)
-                            self.base.solutions.store_to(self.base_results)
+                    results = None
+                    if check == True and solver != newton.CHECK_NAME:
+                        results = self.model_solve_instance(self.base, newton.CHECK_NAME, kind='base')
+                        if results.solver.termination_condition == TerminationCondition.optimal:
+                            print("The benchmark point satisfies every constraint, so", solver, "was not called")
+                        else:
+                            print("The benchmark point is not an equilibrium (" + results.solver.message + "); solving with", solver)
+                            results = None
+                    if results is None:
+                        results = self.model_solve_instance(self.base, solver, mgr, warmstart=warmstart, kind='base')
+                    self.base_results = results
                     
                     print("Base model solved. Call `model_postprocess` to output.")
                     self.base_calibrated = True
+                    self.shared = None #scenarios now start from the new BASE
+                    self.neighbor_index = None #and solutions of the old BASE are no use as starting points
                 
         
                     if (self.base_results.solver.status == SolverStatus.ok) and (self.base_results.solver.termination_condition == TerminationCondition.optimal):
@@ -249,7 +568,7 @@ class PyCGE:
 
 
 
-    def model_solve(self, solver, mgr=''):
+    def model_solve(self, solver, mgr='', warmstart=False):
 
 
         if self.base_calibrated == True: #if the base has already been calibrated
@@ -258,18 +577,18 @@ class PyCGE:
                     if self.sim_solved == True:
                         print("this sim has already been solved")
                     else:
-                        if mgr=='':
-                            print('local solver', solver, 'used')
-                            local_solver = SolverFactory(solver)
-                            self.sim_results = local_solver.solve(self.sim)
-                            self.sim.solutions.store_to(self.sim_results)
+                        #warm-start options only change where the solver starts, so no options are part of the key
+                        key = self.model_solution_key(solver) if self.solution_cache is not None else None
+                        entry = self.solution_cache.get(key) if key is not None else None
+                        if entry is not None:
+                            self.component_index('sim').restore(entry)
+                            self.sim_results = entry.results
+                            print("Sim solution loaded from the solution cache;", solver, "was not called. Call `model_postprocess` to output.")
                         else:
-                            print('solver', solver, 'used through', mgr)
-                            with SolverManagerFactory(mgr) as solver_mgr:
-                                self.sim_results = solver_mgr.solve(self.sim, opt=solver)
-                                self.sim.solutions.store_to(self.sim_results)
-                        
-                        print("Sim model solved. Call `model_postprocess` to output.")
+                            self.sim_results = self.model_solve_instance(self.sim, solver, mgr, warmstart=warmstart, kind='sim')
+                            if key is not None and self.sim_results.solver.termination_condition == TerminationCondition.optimal:
+                                self.solution_cache.put(key, self.component_index('sim').capture(key, True, self.sim_results))
+                            print("Sim model solved. Call `model_postprocess` to output.")
                         self.sim_solved = True
                 
         
@@ -285,10 +604,644 @@ class PyCGE:
             print("You must first calibrate the model. Call `model_calibrate`.")
 
 
+    def model_solve_continuation(self, solver, mgr='', warmstart=True, first_step=0.25,
+                                 min_step=CONTINUATION_MIN_STEP, fast_iterations=CONTINUATION_FAST_ITERATIONS):
+        #solve the SIM by moving the modified Params (and fixed Vars) from their BASE values to their
+        #targets in steps: each step starts from the last equilibrium, a failed step is retried at half
+        #the length and a step that converged quickly is followed by one twice as long
+        
+        if self.base_calibrated == False:
+            print("You must first calibrate the model. Call `model_calibrate`.")
+            return None
+        if getattr(self, 'sim', None) is None:
+            print("You must create SIM instance before you can solve it. Call `model_sim` first.")
+            return None
+        if self.sim_solved == True:
+            print("this sim has already been solved")
+            return self.continuation_path
+        
+        sim_index = self.component_index('sim')
+        start = self.component_index('base').capture()
+        target = sim_index.capture()
+        params, variables = sim_index.elements()
+        moved_params = np.flatnonzero(~components.same(start.param_values, target.param_values))
+        moved_vars = np.flatnonzero(target.var_fixed & ~components.same(start.var_values, target.var_values))
+        
+        def move_to(t):
+            for k in moved_params:
+                params[k].value = float(start.param_values[k] + t * (target.param_values[k] - start.param_values[k]))
+            for k in moved_vars:
+                variables[k].value = float(start.var_values[k] + t * (target.var_values[k] - start.var_values[k]))
+        
+        print("Continuation over", len(moved_params), "Params and", len(moved_vars), "fixed Vars")
+        path = []
+        t = 0.0
+        step = first_step
+        results = None
+        while t < 1.0:
+            t_next = min(1.0, t + step)
+            last_point = sim_index.capture()
+            last_warmstart = self.warmstart_point
+            move_to(t_next)
+            with contextlib.redirect_stdout(io.StringIO()): #one line per step instead of the solve messages
+                results = self.model_solve_instance(self.sim, solver, mgr, warmstart=warmstart, kind='sim')
+            stats = self.warmstart_stats.get('sim') if warmstart else self.cold_start_stats.get('sim')
+            iterations = stats['iterations'] if stats else None
+            ok = (results.solver.status == SolverStatus.ok) and (results.solver.termination_condition == TerminationCondition.optimal)
+            path.append({'t_from': t, 't_to': t_next, 'step': step, 'converged': ok,
+                         'iterations': iterations, 'seconds': stats['seconds'] if stats else None,
+                         'termination_condition': str(results.solver.termination_condition)})
+            print("  t = %.4f -> %.4f:" % (t, t_next), "converged" if ok else "failed",
+                  "" if iterations is None else "in %d iterations" % iterations)
+            if ok:
+                t = t_next
+                if iterations is not None and iterations <= fast_iterations:
+                    step = step * 2
+            else:
+                sim_index.restore(last_point) #back to the last equilibrium
+                self.warmstart_point = last_warmstart
+                step = step / 2
+                if step < min_step:
+                    print("Continuation stopped at t = %.4f: the step fell below %g" % (t, min_step))
+                    break
+        
+        self.continuation_path = pd.DataFrame(path)
+        self.sim_results = results
+        if t >= 1.0:
+            self.sim_solved = True
+            print("Sim model solved along a path of", len(path), "steps. See `continuation_path`.")
+            print('Solution is optimal and feasible')
+        else:
+            move_to(1.0) #leave the targets in place so the SIM can be solved again
+            print("WARNING. Continuation did not reach the targets. See `continuation_path`.")
+        return self.continuation_path
+
+
+    def sensitivities(self, params=None, kind=None):
+        #dx*/dp at the solved SIM (or calibrated BASE) from one factorization of the constraint Jacobian;
+        #`params` lists Param names (every index) or (NAME, INDEX) pairs, and defaults to every mutable
+        #Param in the equations. Returns a DataFrame with a row per free Var and a column per Param element.
+        #An elasticity input of the model definition (see `model_rederive`) is differentiated through the
+        #Params calibrated from it; a Param that is in no equation and calibrates nothing is left out
+        
+        if kind is None:
+            kind = 'sim' if getattr(self, 'sim_solved', False) else 'base'
+        solved = self.sim_solved if kind == 'sim' else self.base_calibrated
+        instance = getattr(self, kind, None)
+        if instance is None or not solved:
+            print("The", kind.upper(), "instance must be solved first")
+            return None
+        
+        elements = None
+        inputs = [] #elements of elasticity inputs, which appear in no equation
+        if params is not None:
+            index = self.component_index(kind)
+            elements = []
+            for item in params:
+                NAME, INDEX = item if isinstance(item, tuple) else (item, '*')
+                _object = getattr(self.base, NAME, None)
+                if isinstance(_object, Param) and not _object.mutable:
+                    print(NAME, "is not a mutable Param; its value is built into the equations, so it has no sensitivities here")
+                    continue
+                try:
+                    if not isinstance(index.component(NAME), Param):
+                        print(NAME, "is a Var, not a Param")
+                        continue
+                    resolved = [element for element, _ in index.resolve(NAME, INDEX, 0.0)]
+                except KeyError as e:
+                    print(e.args[0])
+                    continue
+                if NAME in getattr(self.model_def, 'elasticity_inputs', ()):
+                    inputs.extend(resolved)
+                else:
+                    elements.extend(resolved)
+            if not elements and not inputs:
+                return None
+        
+        requested = None if elements is None else len(elements)
+        if inputs:
+            derived, chain = derived_jacobian(self.model_def, instance, inputs)
+            own = {id(p) for p in elements}
+            elements = elements + [p for p in derived if id(p) not in own]
+        
+        try:
+            variables, elements, matrix = newton.implicit_sensitivities(instance, elements)
+        except (ValueError, RuntimeError) as e: #RuntimeError: singular Jacobian
+            print("Sensitivities could not be computed:", e)
+            return None
+        if requested is None:
+            requested = len(elements)
+        
+        keep = [k for k in range(requested) if np.any(matrix[:, k])]
+        unused = [str(elements[k]) for k in range(requested) if not np.any(matrix[:, k])]
+        if unused:
+            print("Not in the equations (e.g. only used to calibrate other Params), so they are left out:", ', '.join(unused))
+        columns = [elements[k] for k in keep]
+        blocks = [matrix[:, keep]]
+        if inputs: #chain rule through the calibrated Params
+            position = {id(p): k for k, p in enumerate(elements)}
+            blocks.append(matrix[:, [position[id(p)] for p in derived]] @ chain)
+            columns.extend(inputs)
+        if not columns:
+            return None
+        matrix = np.hstack(blocks)
+        
+        rows = pd.MultiIndex.from_tuples([(v.parent_component().name, v.index()) for v in variables], names=['component', 'index'])
+        columns = pd.MultiIndex.from_tuples([(p.parent_component().name, p.index()) for p in columns], names=['param', 'index'])
+        return pd.DataFrame(matrix, index=rows, columns=columns)
+
+
+    def model_solve_instance(self, instance, solver, mgr='', warmstart=False, kind='sim', name=None):
+        #this is called from `model_calibrate` and `model_solve`; `kind` is 'base' or 'sim'
+        #warmstart is True (start from the last solved instance), 'nearest' or 'interpolate' (from the
+        #nearest solved SIMs, see `pycge.neighbors`) or False; `name` labels a solved SIM in the neighbour index
+        
+        declare_warmstart_suffixes(instance) #so multipliers and bound duals come back with the solution
+        options = {}
+        neighbor_start = None
+        if isinstance(warmstart, str):
+            if kind != 'sim' or warmstart not in neighbors.METHODS:
+                print("warmstart=%r is not available here (use one of %s for a SIM), so this is a cold start" % (warmstart, neighbors.METHODS))
+            else:
+                neighbor_start = self.model_neighbor_index().start(instance, warmstart)
+                if neighbor_start is None:
+                    print("No SIM has been solved from this BASE yet, so this is a cold start")
+                else:
+                    print("Warm start: primal values from", ("the nearest solved SIM," if neighbor_start['method'] == 'nearest'
+                          else "an interpolation of the solved SIMs"), neighbor_start['neighbors'], "(distance %.4g)" % neighbor_start['distance'])
+            if neighbor_start is None:
+                warmstart = False
+        elif warmstart == True:
+            if self.warmstart_point: #if something has been solved before
+                self.model_warmstart(instance, solver, options)
+            else:
+                print("Nothing has been solved yet, so this is a cold start")
+                warmstart = False
+        
+        handle, logfile = tempfile.mkstemp(suffix='.log') #the solver log is parsed for the iteration count
+        os.close(handle)
+        with self.metrics.stage('solve', kind=kind, solver=str(solver), mgr=mgr, warmstart=warmstart) as record:
+            start = time.time()
+            try:
+                if solver == newton.CHECK_NAME: #nothing is solved; the current values are checked against every constraint
+                    vectorized = self.model_def.residuals(instance) if hasattr(self.model_def, 'residuals') else None
+                    results = newton.check_point(instance, vectorized=vectorized)
+                elif solver == newton.SOLVER_NAME: #in-process engine, no NL file or solver process
+                    if mgr != '':
+                        print("the", solver, "engine runs in-process, so", mgr, "is not used")
+                    print('in-process', solver, 'engine used')
+                    results = newton.newton_solve(instance)
+                elif mgr=='':
+                    print('local solver', solver, 'used')
+                    import pyomo.environ #registers Pyomo's solver plugins
+                    local_solver = self.metrics.instrument(SolverFactory(solver)) #NL writing, solver run and reading are timed separately
+                    kwds = {}
+                    if warmstart == True and local_solver.warm_start_capable(): #e.g. MIP solvers that read a start file
+                        kwds['warmstart'] = True
+                    results = local_solver.solve(instance, options=options, logfile=logfile, **kwds)
+                else:
+                    print('solver', solver, 'used through', mgr)
+                    import pyomo.environ #registers Pyomo's solver managers
+                    with SolverManagerFactory(mgr) as solver_mgr:
+                        results = solver_mgr.solve(instance, opt=solver, options=options)
+                seconds = time.time() - start
+                with self.metrics.stage('load'):
+                    instance.solutions.store_to(results)
+                iterations = 0 if solver == newton.CHECK_NAME else solver_iterations(results, logfile)
+            finally:
+                os.remove(logfile)
+            
+            if solver == newton.CHECK_NAME and results.solver.termination_condition != TerminationCondition.optimal:
+                return results #nothing was solved, so the warm start point and statistics stay as they were
+            
+            self.warmstart_point = extract_warmstart_point(instance) #the next warm start begins here
+            if kind == 'sim' and results.solver.termination_condition == TerminationCondition.optimal:
+                self.model_neighbor_index().add(instance, name)
+            if record is not None:
+                record.update(iterations=iterations, status=str(results.solver.status),
+                              termination_condition=str(results.solver.termination_condition))
+        
+        stats = {'iterations': iterations, 'seconds': seconds}
+        if warmstart == False:
+            self.cold_start_stats[kind] = stats
+        else:
+            self.model_warmstart_report(kind, stats)
+            if neighbor_start is not None:
+                self.neighbor_stats.append(dict(self.warmstart_stats[kind], **neighbor_start))
+        
+        return results
+
+
+    def model_neighbor_index(self):
+        #solved SIMs and scenarios of the current BASE; every optimal SIM solve is added to it
+        
+        if self.neighbor_index is None or self.neighbor_index.base is not self.base:
+            self.neighbor_index = neighbors.NeighborIndex(self.base)
+        return self.neighbor_index
+
+
+    def model_warmstart(self, instance, solver, options):
+        #seed `instance` with the values of the last solved instance
+        
+        point = self.warmstart_point
+        for key, v in element_items(instance, Var):
+            if not v.fixed and key in point['primal']: #never overwrite a value the user fixed
+                v.value = point['primal'][key]
+        print("Warm start: primal values loaded from the last solved instance")
+        
+        if any(name in str(solver).lower() for name in INTERIOR_POINT_SOLVERS):
+            for key, c in element_items(instance, Constraint):
+                if c.active and key in point['dual']:
+                    instance.dual[c] = point['dual'][key]
+            for key, v in element_items(instance, Var):
+                if key in point['zL']:
+                    instance.ipopt_zL_in[v] = point['zL'][key]
+                if key in point['zU']:
+                    instance.ipopt_zU_in[v] = point['zU'][key]
+            options.update(IPOPT_WARMSTART_OPTIONS)
+            print("Warm start: multipliers and bound duals loaded from the last solved instance")
+
+
+    def model_warmstart_report(self, kind, stats):
+        #compare a warm-started solve with the last cold solve of the same `kind`
+        
+        report = {'iterations': stats['iterations'], 'seconds': stats['seconds'],
+                  'cold_iterations': None, 'cold_seconds': None,
+                  'iterations_saved': None, 'seconds_saved': None}
+        
+        cold = self.cold_start_stats.get(kind)
+        if cold is None:
+            print("Warm start took %.4f seconds. No cold start of" % stats['seconds'], kind, "to compare with")
+        else:
+            report['cold_iterations'] = cold['iterations']
+            report['cold_seconds'] = cold['seconds']
+            report['seconds_saved'] = cold['seconds'] - stats['seconds']
+            print("Warm start took %.4f seconds (cold start: %.4f, saved: %.4f)" % (stats['seconds'], cold['seconds'], report['seconds_saved']))
+            if stats['iterations'] is not None and cold['iterations'] is not None:
+                report['iterations_saved'] = cold['iterations'] - stats['iterations']
+                print("Warm start took", stats['iterations'], "iterations (cold start:", cold['iterations'], ", saved:", report['iterations_saved'], ")")
+            else:
+                print("Iteration count not reported by the solver")
+        
+        self.warmstart_stats[kind] = report
+
+
+    def model_scenario(self, name=None):
+        #a copy-on-write alternative to `model_sim`: the scenario only records what differs from BASE
+        
+        try:
+            if self.base_calibrated == False:
+                print("You must calibrate first")
+                return None
+        except AttributeError:
+            print("You must create BASE instance first.")
+            return None
+        
+        print("Scenario", name, "created. Note, this is currently the same as BASE. Call `model_modify_scenario` to modify.")
+        return Scenario(name)
+
+
+    def model_modify_scenario(self, scenario, NAME, INDEX, VALUE, fix=True):
+        
+        _object = self.base.component(NAME)
+        if _object is None:
+            print(NAME, "does not exist in current instance")
+            return
+        try:
+            _object[INDEX]
+        except KeyError:
+            print(INDEX, "is not an index of", NAME)
+            return
+        
+        if isinstance(_object, Var): #variables are fixed (default) or unfixed at VALUE
+            scenario.fixed[(NAME, INDEX)] = (VALUE, fix)
+        elif isinstance(_object, Param) and _object.mutable:
+            scenario.params[(NAME, INDEX)] = VALUE
+            if NAME in getattr(self.model_def, 'elasticity_inputs', ()): #see `model_rederive`
+                inputs = {key: val for key, val in scenario.params.items() if key[0] in self.model_def.elasticity_inputs}
+                for DERIVED, values in self.model_def.derived_params(self.base, inputs).items():
+                    for index, val in values.items():
+                        scenario.params[(DERIVED, index)] = val
+        else:
+            print(NAME, "is not a mutable Param or a Var and cannot be modified")
+            return
+        scenario.solved = False
+        print("Scenario", scenario.name, "updated. Call `model_solve_scenario` to solve.")
+
+
+    def model_shared_instance(self, scenario):
+        #write `scenario` into the shared working copy of BASE and return it
+        
+        if self.shared is None:
+            self.shared = SharedInstance(self.base)
+        return self.shared.materialize(scenario)
+
+
+    def model_solve_scenario(self, scenario, solver, mgr='', warmstart=False):
+        
+        if self.base_calibrated == False:
+            print("You must first calibrate the model. Call `model_calibrate`.")
+            return None
+        
+        if scenario.solved == True:
+            print("this scenario has already been solved")
+            return scenario.results()
+        
+        instance = self.model_shared_instance(scenario)
+        results = self.model_solve_instance(instance, solver, mgr, warmstart=warmstart, kind='sim', name=scenario.name)
+        scenario.store(self.shared, results)
+        print("Scenario", scenario.name, "solved. Call `model_load_scenario` to compare or output it.")
+        
+        if (results.solver.status == SolverStatus.ok) and (results.solver.termination_condition == TerminationCondition.optimal):
+            print('Solution is optimal and feasible')
+        elif (results.solver.termination_condition == TerminationCondition.infeasible):
+            print("Model is infeasible")
+        else:
+            print ('WARNING. Solver Status: ', results.solver)
+        return results
+
+
+    def model_load_scenario(self, scenario):
+        #make `scenario` the SIM so `model_compare` and `model_postprocess` work on it
+        #(the SIM is the shared instance, so it changes when another scenario is solved or loaded)
+        
+        self.sim = self.model_shared_instance(scenario)
+        self.sim_solved = scenario.solved
+        if scenario.solved:
+            self.sim_results = scenario.results()
+        else:
+            self.__dict__.pop('sim_results', None)
+        print("Scenario", scenario.name, "loaded as SIM.")
+
+
+    async def solve_async(self, scenario, solver='newton', timeout=None):
+        #asyncio counterpart of `model_solve_scenario`: `await cge.solve_async(scenario, 'ipopt')`
+        #the solver runs without blocking the event loop, so many scenarios can be in flight (see `as_completed`);
+        #a solve still running after `timeout` seconds is stopped, and the scenario stays unsolved
+        
+        if self.base_calibrated == False:
+            print("You must first calibrate the model. Call `model_calibrate`.")
+            return None
+        
+        if scenario.solved == True:
+            print("this scenario has already been solved")
+            return scenario.results()
+        
+        lock = self.model_shared_lock()
+        start = time.time()
+        if solver == newton.SOLVER_NAME: #solved in the shared instance, so one at a time
+            async with lock:
+                instance = self.model_shared_instance(scenario)
+                results = await asyncsolve.in_thread(newton.newton_solve, instance, time_limit=timeout, stop=threading.Event())
+                if results.solver.termination_condition != TerminationCondition.maxTimeLimit:
+                    scenario.store(self.shared, results)
+        elif not solverpool.PRIVATE_API: #this Pyomo cannot run the solver apart from writing and reading; no timeout
+            async with lock:
+                instance = self.model_shared_instance(scenario)
+                results = await asyncsolve.in_thread(solverpool.solver_object(solver).solve, instance)
+                scenario.store(self.shared, results)
+        else: #only writing the NL file and reading the solution need the shared instance
+            async with lock:
+                instance = self.model_shared_instance(scenario)
+                opt, context = await asyncsolve.in_thread(solverpool.write_problem, solver, instance,
+                                                          cleanup=lambda written: written[1].release())
+            try:
+                rc, log = await asyncsolve.run_command(opt._command, timeout)
+            except asyncio.TimeoutError:
+                context.release()
+                results = asyncsolve.timed_out(solver, timeout, start)
+            except BaseException:
+                context.release()
+                raise
+            else:
+                async with lock: #another scenario may have been written into the shared instance meanwhile
+                    instance = self.model_shared_instance(scenario)
+                    results = await asyncsolve.in_thread(solverpool.read_solution, opt, instance, context, rc, log, start)
+                    scenario.store(self.shared, results)
+        
+        if results.solver.termination_condition == TerminationCondition.maxTimeLimit:
+            print("Scenario", scenario.name, "was not solved within", timeout, "seconds")
+        else:
+            print("Scenario", scenario.name, "solved. Call `model_load_scenario` to compare or output it.")
+        if (results.solver.status == SolverStatus.ok) and (results.solver.termination_condition == TerminationCondition.optimal):
+            print('Solution is optimal and feasible')
+        elif (results.solver.termination_condition == TerminationCondition.infeasible):
+            print("Model is infeasible")
+        else:
+            print ('WARNING. Solver Status: ', results.solver)
+        return results
+
+
+    async def as_completed(self, scenarios, solver='newton', timeout=None, limit=None):
+        #solve `scenarios` concurrently and yield (scenario, results) in the order they finish:
+        #    async for scenario, results in cge.as_completed(scenarios, 'ipopt'): ...
+        #at most `limit` solves (default `solverpool.MAX_WORKERS`) run at once; `timeout` is per solve;
+        #leaving the loop early (or a solve raising) cancels the solves still in flight
+        
+        semaphore = asyncio.Semaphore(limit or solverpool.MAX_WORKERS)
+        
+        async def solve(scenario):
+            async with semaphore:
+                return await self.solve_async(scenario, solver, timeout)
+        
+        tasks = {asyncio.ensure_future(solve(scenario)): scenario for scenario in scenarios}
+        position = {task: k for k, task in enumerate(tasks)}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=position.get): #in submission order when several finish together
+                    yield tasks[task], task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+
+    def model_shared_lock(self):
+        #the asyncio lock of the shared instance, for the running event loop
+        
+        loop = asyncio.get_running_loop()
+        if self.shared_lock is None or self.shared_lock[0] is not loop:
+            self.shared_lock = (loop, asyncio.Lock())
+        return self.shared_lock[1]
+
+
+    def model_queue_sims(self, jobs, apply, solver, mgr, workers, warmstart=False):
+        #solve one SIM per job through the solver manager `mgr` (e.g. 'localpool' or 'neos', see `pycge.solverpool`)
+        #with at most `workers` solves queued at a time; `apply(cge, job)` creates the SIM of a job (with `model_sim`,
+        #so the queued SIMs are left alone) in a copy of this object and modifies it; (job, SIM instance, results,
+        #error, start time) is yielded as each solve finishes
+        
+        import pyomo.environ #registers Pyomo's solver managers
+        cge = scenario_base_copy(self)
+        kwds = {'max_workers': workers} if mgr == solverpool.POOL_NAME else {}
+        queued = {} #action handle id: (job, instance, start time)
+        with SolverManagerFactory(mgr, **kwds) as solver_mgr:
+            for job in jobs:
+                start = time.time()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        apply(cge, job)
+                        options = {}
+                        if warmstart == True and self.warmstart_point:
+                            declare_warmstart_suffixes(cge.sim)
+                            cge.model_warmstart(cge.sim, solver, options)
+                        handle = solver_mgr.queue(cge.sim, opt=solver, options=options)
+                    queued[handle.id] = (job, cge.sim, start)
+                except Exception as e:
+                    yield job, None, None, e, start
+                if len(queued) >= workers:
+                    yield collect_queued(solver_mgr, queued)
+            while queued:
+                yield collect_queued(solver_mgr, queued)
+
+
+    def run_scenarios(self, scenarios, solver='newton', mgr='', workers=None, warmstart=False):
+        #solve many policy experiments from the calibrated BASE in a pool of processes (or, given a solver
+        #manager `mgr` and a solver other than 'newton', queued with that manager; see `model_queue_sims`)
+        #`scenarios` is a list (or a dict keyed by scenario id) of parameter-change sets;
+        #each change set is a list of (NAME, INDEX, VALUE) or (NAME, INDEX, VALUE, fix) tuples,
+        #exactly the arguments of `model_modify_sim`
+        
+        try:
+            if self.base_calibrated == False:
+                print("You must first calibrate the model. Call `model_calibrate`.")
+                return None
+        except AttributeError:
+            print("You must create the BASE instance first. Call `model_instance`.")
+            return None
+        
+        if isinstance(scenarios, dict):
+            jobs = list(scenarios.items())
+        else:
+            jobs = list(enumerate(scenarios))
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(jobs)))
+        
+        start = time.time()
+        rows = []
+        if queued_solves(solver, mgr): #the solver manager runs the solves; this process only writes and reads them
+            order = {scenario_id: k for k, (scenario_id, _) in enumerate(jobs)}
+            for (scenario_id, _), instance, results, error, begun in self.model_queue_sims(
+                    jobs, lambda cge, job: scenario_apply(cge, job[1]), solver, mgr, workers, warmstart):
+                rows.append(scenario_row({'scenario': scenario_id}, instance, results, error, begun))
+            rows.sort(key=lambda row: order[row['scenario']])
+            print(len(rows), "scenarios solved through", mgr, "with", workers, "solve(s) queued at a time in %.4f seconds" % (time.time() - start))
+            return pd.DataFrame(rows).set_index('scenario')
+        
+        #the calibrated BASE is built once and shipped to every worker with dill
+        payload = dill.dumps(scenario_base_copy(self))
+        
+        if workers == 1: #no pool needed
+            scenario_worker_init(payload)
+            for scenario_id, changes in jobs:
+                rows.append(scenario_worker(scenario_id, changes, solver, mgr, warmstart))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=scenario_worker_init, initargs=(payload,)) as pool:
+                futures = [pool.submit(scenario_worker, scenario_id, changes, solver, mgr, warmstart) for scenario_id, changes in jobs]
+                rows = [future.result() for future in futures]
+        
+        print(len(rows), "scenarios solved with", workers, "worker(s) in %.4f seconds" % (time.time() - start))
+        
+        table = pd.DataFrame(rows)
+        table = table.set_index('scenario')
+        return table
+
+
+    def run_ssa(self, draws, changes, path=None, solver='newton', mgr='', workers=None, outputs=None, resume=True):
+        #Monte Carlo sensitivity analysis: for every draw of elasticities, recalibrate and solve the policy
+        #`changes` (a `model_modify_sim_bulk` mapping) from BASE; `draws` maps elasticity names (e.g.
+        #'sigma', 'psi') to (draws, goods) arrays. Rows are streamed to the CSV file `path`, and draws
+        #already in it are skipped, so an interrupted run resumes. `outputs` lists the Var names to keep
+        
+        try:
+            if self.base_calibrated == False:
+                print("You must first calibrate the model. Call `model_calibrate`.")
+                return None
+        except AttributeError:
+            print("You must create the BASE instance first. Call `model_instance`.")
+            return None
+        if not hasattr(self.model_def, 'recalibrate'):
+            print("The model definition has no `recalibrate` method, so its elasticities cannot be drawn")
+            return None
+        
+        #every draw is recalibrated in one vectorized pass
+        params = self.model_def.recalibrate(self.base, **draws)
+        n_draws = len(next(iter(params.values())))
+        goods = list(self.base.i)
+        
+        if outputs is None:
+            outputs = [v.name for v in self.base.component_objects(Var, active=True)]
+        output_columns = []
+        for NAME in outputs:
+            output_columns.extend(v.name for v in getattr(self.base, NAME).values())
+        columns = (['draw', 'status', 'termination_condition', 'message', 'welfare', 'obj', 'seconds']
+                   + ['%s[%s]' % (name, good) for name in draws for good in goods] + output_columns)
+        
+        if path is None:
+            path = os.path.join(tempfile.mkdtemp(prefix='pycge_ssa_'), 'draws.csv')
+        expected = {d: {'%s[%s]' % (name, good): values[d][k] for name, values in draws.items() for k, good in enumerate(goods)}
+                    for d in range(n_draws)}
+        with ssa.DrawLog(path, columns, resume=resume, draws=expected) as log:
+            jobs = [d for d in range(n_draws) if d not in log.done]
+            if len(jobs) < n_draws:
+                print(n_draws - len(jobs), "draws already in", path, "are skipped")
+            
+            if workers is None:
+                workers = os.cpu_count() or 1
+            workers = max(1, min(workers, len(jobs) or 1))
+            
+            def job(d):
+                return {(name, '*'): values[d] for name, values in params.items()}
+            
+            start = time.time()
+            if queued_solves(solver, mgr): #the solver manager runs the solves; this process only writes and reads them
+                def apply(cge, d):
+                    cge.model_sim()
+                    ssa_apply(cge, job(d), changes)
+                base_obj = value(self.base.obj)
+                for d, instance, results, error, begun in self.model_queue_sims(jobs, apply, solver, mgr, workers):
+                    log.append(ssa_row(ssa_draw_row(d, job(d), self.base), instance, results, error, begun, base_obj, outputs))
+            elif workers == 1:
+                payload = dill.dumps(scenario_base_copy(self))
+                scenario_worker_init(payload)
+                for d in jobs:
+                    log.append(ssa_worker(d, job(d), changes, outputs, solver, mgr))
+            else:
+                payload = dill.dumps(scenario_base_copy(self))
+                with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=scenario_worker_init, initargs=(payload,)) as pool:
+                    futures = [pool.submit(ssa_worker, d, job(d), changes, outputs, solver, mgr) for d in jobs]
+                    for future in concurrent.futures.as_completed(futures): #written as soon as each draw finishes
+                        log.append(future.result())
+        
+        print(len(jobs), "draws solved with", workers, "worker(s) in %.4f seconds. Results are in" % (time.time() - start), path)
+        return ssa.read_draws(path)
+
+
     def model_compare(self, verbose = ''):
+        #returns a DataFrame of base and sim values indexed by (component, index);
+        #verbose='print' prints it and verbose='directory/name/' writes it to a file
+        
+        try:
+            self.base
+        except AttributeError:
+            print("You have not created a BASE instance")
+            return None
+        try:
+            self.sim
+        except AttributeError:
+            print("You have not created a SIM instance")
+            return None
+        
+        compared = compare_instances(self.base, self.sim)
+        
         if verbose == '':
-            print('please specify how you would like to output')
-            
+            return compared
+        
         elif verbose == 'print':            
             output = print
         
@@ -305,74 +1258,165 @@ class PyCGE:
             
             output = output_file.write                 
         
-        if verbose != '':
-            try:
-                if self.base: #if base instance has been created
-                    try:
-                        if self.sim: #if sim instance has been created
-                                            
-                            try:
-                                if self.base_results: #if base has been solved
-                                    try:
-                                        if self.sim_results: #if sim has been solved
-                                            
-                                            output("#===========HERE ARE THE DIFFERENCES==========#\n")
-                                            output("#===========note: both models solved==========#\n")
-                                            
-                                                
-                                    except:
-                                            output("#===========HERE ARE THE DIFFERENCES==========#\n")
-                                            output("#===========note: base model solved===========#\n")
-                                            output("#===========      sim model unsolved==========#\n")
-                            except:
-                                output("#===========HERE ARE THE DIFFERENCES==========#\n")
-                                output("#===========note: both models unsolved==========#\n") 
-                            
-                         
-                            for n in self.sim.component_objects(Var, active=True):  #go through sim components
-                                newobject = getattr(self.sim, str(n)) #get sim object
-                                for o in self.base.component_objects(Var, active=True): #go through base components
-                                    oldobject = getattr(self.base, str(o)) #get base object
-                                    if str(n)==str(o): #if they are the same object (for example X == X)
-                                        output(str(newobject)) # print it
-                                        for newindex in newobject: #go through sim indexes
-                                            for oldindex in oldobject: #go through base indexes
-                                                if newindex == oldindex: #if they are the same index (for example 'BRD' == 'BRD')
-                                                    diff = oldobject[oldindex].value - newobject[newindex].value #calculate the difference between the two
-                                                    if newobject[newindex].value != 0: #if the sim value does not equal 0 (to avoid division by 0)
-                                                    
-                                                        per = (oldobject[oldindex].value / newobject[newindex].value) * 100 #caluculate percentage
-                                                        output('{},{},{}\n'.format(newindex, "Difference = %.4f" % diff, "     Percentage = %.4f" % per)) 
-                                                    else: #if it DOES equal zero
-                                                        output('{},{},{}\n'.format(newindex, "Difference = %.4f" % diff, "     Note: ", newindex, "now = 0" ))
-                            
-                            
-                            output('{},{}\n'.format("\nCalibrated Value of obj = ", value(self.base.obj)))
-                            output('{},{}\n'.format("\nSimulated Value of obj = ", value(self.sim.obj)))
-                            output('{},{}\n'.format("\nDifference of obj = ", value(self.base.obj) - value(self.sim.obj)))   
-    
-                    except AttributeError:
-                        print("You have not created a SIM instance")
-            except AttributeError:
-                print("You have not created a BASE instance")
-            
-            
-        if verbose != '' and verbose !='print':
+        output("#===========HERE ARE THE DIFFERENCES==========#\n")
+        if hasattr(self, 'base_results') and hasattr(self, 'sim_results'):
+            output("#===========note: both models solved==========#\n")
+        elif hasattr(self, 'base_results'):
+            output("#===========note: base model solved===========#\n")
+            output("#===========      sim model unsolved==========#\n")
+        else:
+            output("#===========note: both models unsolved==========#\n") 
+        
+        render_compare(compared, output)
+        
+        output('{},{}\n'.format("\nCalibrated Value of obj = ", value(self.base.obj)))
+        output('{},{}\n'.format("\nSimulated Value of obj = ", value(self.sim.obj)))
+        output('{},{}\n'.format("\nDifference of obj = ", value(self.base.obj) - value(self.sim.obj)))   
+        
+        if verbose !='print':
             output_file.close()
+        
+        return compared
+
+
+    def model_store(self, directory='', base=True, scenario_id=None, fmt=None):
+        #append the Var values of BASE (or SIM) to this run's results file (Parquet, or .npz without pyarrow)
+        
+        if directory == '':
+            print("Please enter where to export to")
+            return
+        try:
+            instance = self.base if base == True else self.sim
+        except AttributeError:
+            print('Please make sure what you are trying to output has been created (base, sim)')
+            return
+        if scenario_id is None:
+            scenario_id = 'base' if base == True else 'sim'
+        
+        directory = os.path.abspath(directory)
+        if self.results_store is None or os.path.dirname(self.results_store.path) != directory:
+            if self.results_store is not None:
+                self.results_store.close()
+            self.results_store = ResultsStore(directory, fmt=fmt)
+        
+        keys, values = instance_values(instance)
+        self.results_store.append(scenario_id, keys, values)
+        print(scenario_id, "values saved to: " + self.results_store.path)
+
+
+    def model_close_store(self):
+        #finish the results file (a Parquet file is only readable once closed)
+        
+        if self.results_store is not None:
+            self.results_store.close()
+            print("Results store closed: " + self.results_store.path)
+            self.results_store = None
+
+
+    def model_snapshot(self, directory='', base=True):
+        #save only the values of BASE (or SIM) as flat arrays; much smaller and faster than `dill_instance`
+        
+        if directory == '':
+            print("Please enter where to export to")
+            return None
+        try:
+            if base == True:
+                instance, solved, kind = self.base, self.base_calibrated, 'base'
+                status = self.base_results.solver.termination_condition if solved else ''
+            else:
+                instance, solved, kind = self.sim, self.sim_solved, 'sim'
+                status = self.sim_results.solver.termination_condition if solved else ''
+        except AttributeError:
+            print('Please make sure what you are trying to output has been created (base, sim)')
+            return None
+        
+        if not os.path.exists(directory):
+            print(directory, "directory did not exist so one was created")
+            os.makedirs(directory)
+        moment=time.strftime("%Y-%b-%d__%H_%M_%S",time.localtime())
+        path = os.path.abspath(os.path.join(directory, 'snapshot_' + kind + '_' + moment + '_' + uuid.uuid4().hex[:8] + '.npz'))
+        
+        snapshot.save_snapshot(path, instance,
+                               data_id=getattr(self, 'data_fingerprint', ''),
+                               def_id=self.model_def_id,
+                               solved=solved, status=status)
+        print(kind, "snapshot saved to: " + path)
+        return path
+
+
+    def model_load_snapshot(self, pathname, base=True):
+        #restore a snapshot into BASE (or SIM), reusing the existing instance when there is one
+        
+        if not os.path.exists(pathname):
+            print(pathname, " does not exist. Please enter a valid path to the file you would like to load")
+            return
+        
+        saved = snapshot.read_snapshot(pathname)
+        if saved['model_def_id'] != self.model_def_id:
+            print("This snapshot was saved from a different model definition and was not loaded")
+            return
+        if saved['data_fingerprint'] != getattr(self, 'data_fingerprint', ''):
+            print("Note, this snapshot was saved with different data than the data currently loaded")
+        
+        try:
+            if base == True:
+                instance = self.base if hasattr(self, 'base') else self.m.create_instance(self.data)
+            else:
+                if hasattr(self, 'sim'):
+                    instance = self.sim
+                elif hasattr(self, 'base'):
+                    instance = copy.deepcopy(self.base)
+                else:
+                    instance = self.m.create_instance(self.data)
+        except AttributeError:
+            print("data not loaded. Call `model_data` first.")
+            return
+        
+        try:
+            snapshot.load_snapshot(saved, instance)
+        except ValueError as e:
+            print(e)
+            return
+        
+        results = SolverResults()
+        if saved['solved']:
+            results.solver.status = SolverStatus.ok
+            results.solver.termination_condition = getattr(TerminationCondition, saved['status'], TerminationCondition.unknown)
+        
+        if base == True:
+            self.base = instance
+            self.base_calibrated = saved['solved']
+            if saved['solved']:
+                self.base_results = results
+            self.shared = None
+            print("base instance loaded from snapshot")
+        else:
+            self.sim = instance
+            self.sim_solved = saved['solved']
+            if saved['solved']:
+                self.sim_results = results
+            print("sim instance loaded from snapshot")
 
 
+    @timed('postprocess')
     def model_postprocess(self, object_name = "" , verbose="", base=True):
         
         #this doesnt matter if `base` is True or False
         if (object_name=="compare"):
             self.model_compare(verbose = verbose)
         
+        if object_name in ("store", "vars"): #"vars" appends to this run's results file; "vars_csv" writes one CSV per Var
+            self.model_store(verbose, base=base)
+        
+        if (object_name=="snapshot"):
+            self.model_snapshot(verbose, base=base)
+        
         if base == True: # if you want to post process things from the base
             try:
                 if (object_name==""): #make sure user enters something
                     print("please specify what you would like to output")
                     
-                elif object_name=='compare': #Still need to have this for the error handling (i.e. "please enter a valid object_name")
+                elif object_name in ('compare', 'store', 'vars', 'snapshot'): #Still need to have this for the error handling (i.e. "please enter a valid object_name")
                     pass #but we've already taken care of it above
                 
                 elif (object_name=="instance"):
@@ -389,7 +1433,7 @@ class PyCGE:
                             print(index, value(paramobject[index]))
 
                 
-                elif (object_name=="vars") or (object_name=="obj") or (object_name=="dill_instance"):
+                elif (object_name=="vars_csv") or (object_name=="obj") or (object_name=="dill_instance"):
                     moment=time.strftime("%Y-%b-%d__%H_%M_%S",time.localtime()) #create moment
                     if(verbose==""):
                         print("Please enter where to export to")
@@ -401,7 +1445,7 @@ class PyCGE:
                             
                         check = os.path.abspath(os.path.join(directory, object_name)) #creates a directory whether the user ends the path with a '/' or not
                 
-                        if (object_name=="vars"):
+                        if (object_name=="vars_csv"):
                             print("Vars saved to: \n") #let user know where they were saved to (pt. 1)
                             for v in self.base.component_objects(Var, active=True): #go through components
                                 with open(check + str(v) + "_"+  moment + '.csv', 'w') as var_output: #create a file
@@ -439,7 +1483,7 @@ class PyCGE:
                 if (object_name==""):
                     print("please specify what you would like to output")
                     
-                elif object_name=='compare': #Still need to have this for the error handling (i.e. "please enter a valid object_name")
+                elif object_name in ('compare', 'store', 'vars', 'snapshot'): #Still need to have this for the error handling (i.e. "please enter a valid object_name")
                     pass #but we've already taken care of it above   
                     
                 elif (object_name=="instance"):
@@ -455,7 +1499,7 @@ class PyCGE:
                         for index in paramobject:
                             print(index, value(paramobject[index]))                    
                 
-                elif (object_name=="vars") or (object_name=="obj") or (object_name=="dill_instance"):
+                elif (object_name=="vars_csv") or (object_name=="obj") or (object_name=="dill_instance"):
                     moment=time.strftime("%Y-%b-%d__%H_%M_%S",time.localtime())
                     if(verbose==""):
                         print("Please enter where to export to")
@@ -467,12 +1511,12 @@ class PyCGE:
                             
                         check = os.path.abspath(os.path.join(directory, object_name))
                 
-                        if (object_name=="vars"):
+                        if (object_name=="vars_csv"):
                             print("Vars saved to: \n")
                             for v in self.sim.component_objects(Var, active=True):
                                 with open(check + str(v) + "_"+  moment + '.csv', 'w') as var_output:
                                     print(str(check + str(v) + "_"+  moment + '.csv'))
-                                    varobject = getattr(self.base, str(v))
+                                    varobject = getattr(self.sim, str(v))
                                     var_output.write ('{},{} \n'.format('Names', varobject ))
                                     for index in varobject:
                                         var_output.write ('{},{} \n'.format(index, varobject[index].value))
@@ -551,3 +1595,297 @@ def print_function (verbose="", output = "", typename=""): #this is called from
         print("Output saved to: " + str(check + moment)) #let the user know where it is saved
 
 
+
+def declare_warmstart_suffixes(instance): #this is called from `model_solve_instance`
+    
+    if instance.component('dual') is None:
+        instance.dual = Suffix(direction=Suffix.IMPORT_EXPORT) #constraint multipliers
+    for name in ('ipopt_zL_out', 'ipopt_zU_out'): #bound duals returned by Ipopt
+        if instance.component(name) is None:
+            instance.add_component(name, Suffix(direction=Suffix.IMPORT))
+    for name in ('ipopt_zL_in', 'ipopt_zU_in'): #bound duals sent to Ipopt
+        if instance.component(name) is None:
+            instance.add_component(name, Suffix(direction=Suffix.EXPORT))
+
+
+def element_items(instance, ctype):
+    #((component name, index), element) for every element of every `ctype` component; cheaper than building `element.name`
+    for component in instance.component_objects(ctype, active=True):
+        name = component.name
+        for index, element in component.items():
+            yield (name, index), element
+
+
+def extract_warmstart_point(instance): #this is called from `model_solve_instance`
+    #values keyed by (component name, index), so they can be loaded into a copy of the instance
+    
+    point = {'primal': {}, 'dual': {}, 'zL': {}, 'zU': {}}
+    for key, v in element_items(instance, Var):
+        if v.value is not None:
+            point['primal'][key] = v.value
+    for suffix, name in ((instance.dual, 'dual'), (instance.ipopt_zL_out, 'zL'), (instance.ipopt_zU_out, 'zU')):
+        for element, val in suffix.items():
+            point[name][(element.parent_component().name, element.index())] = val
+    return point
+
+
+def solver_iterations(results, logfile=''): #this is called from `model_solve_instance`
+    
+    message = results.solver.message
+    if isinstance(message, str):
+        found = re.search(r'(\d+)\s+iterations', message) #e.g. MINOS and CONOPT messages
+        if found:
+            return int(found.group(1))
+    
+    if logfile and os.path.exists(logfile):
+        with open(logfile) as log:
+            found = re.search(r'Number of Iterations\.*:\s*(\d+)', log.read()) #Ipopt log
+        if found:
+            return int(found.group(1))
+    
+    return None
+
+
+
+def derived_jacobian(model_def, instance, inputs): #this is called from `sensitivities`
+    #the Param elements calibrated from the elasticity-input elements `inputs` (see `model_rederive`) and their
+    #derivatives with respect to them, as a (derived, inputs) array, by central differences of `derived_params`
+    
+    derived_values = model_def.derived_params(instance)
+    keys = [(NAME, INDEX) for NAME, values in derived_values.items() for INDEX in values]
+    derived = [getattr(instance, NAME)[INDEX] for NAME, INDEX in keys]
+    chain = np.zeros((len(derived), len(inputs)))
+    for k, p in enumerate(inputs):
+        step = DERIVED_STEP * max(abs(p.value), 1.0)
+        key = (p.parent_component().name, p.index())
+        plus = model_def.derived_params(instance, {key: p.value + step})
+        minus = model_def.derived_params(instance, {key: p.value - step})
+        chain[:, k] = [(plus[NAME][INDEX] - minus[NAME][INDEX]) / (2 * step) for NAME, INDEX in keys]
+    return derived, chain
+
+
+def instance_values(instance): #this is called from `compare_instances`
+    #every Var element of `instance` as parallel lists of (component, index) keys and a value array
+    
+    keys = []
+    values = []
+    for v in instance.component_objects(Var, active=True):
+        for index, vardata in v.items():
+            keys.append((v.name, index))
+            values.append(vardata.value)
+    return keys, np.array(values, dtype=float) #a value of None becomes nan
+
+
+def compare_instances(base, sim): #this is called from `model_compare`
+    
+    base_keys, base_values = instance_values(base)
+    sim_keys, sim_values = instance_values(sim)
+    
+    if sim_keys != base_keys: #align sim to base when the two were not built identically
+        position = {key: n for n, key in enumerate(sim_keys)}
+        take = np.array([position.get(key, -1) for key in base_keys], dtype=int)
+        sim_values = np.where(take >= 0, sim_values[take] if len(sim_values) else np.nan, np.nan)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difference = base_values - sim_values
+        percentage = np.where(sim_values != 0, base_values / sim_values * 100, np.nan)
+        pct_change = np.where(base_values != 0, (sim_values - base_values) / np.abs(base_values) * 100, np.nan)
+    
+    index = pd.MultiIndex.from_tuples(base_keys, names=['component', 'index']) if base_keys else None
+    return pd.DataFrame({'base': base_values, 'sim': sim_values,
+                         'difference': difference, #base - sim
+                         'percentage': percentage, #base as a percentage of sim
+                         'pct_change': pct_change}, #percent change from base to sim
+                        index=index)
+
+
+def render_compare(compared, output): #this is called from `model_compare`
+    
+    component = None
+    for (name, index), difference, percentage, sim_value in zip(compared.index, compared['difference'], compared['percentage'], compared['sim']):
+        if name != component:
+            component = name
+            output(name) # print it
+        if sim_value != 0: #if the sim value does not equal 0 (to avoid division by 0)
+            output('{},{},{}\n'.format(index, "Difference = %.4f" % difference, "     Percentage = %.4f" % percentage)) 
+        else: #if it DOES equal zero
+            output('{},{},{}\n'.format(index, "Difference = %.4f" % difference, "     Note: ", index, "now = 0" ))
+
+
+# state of a `run_scenarios` worker process: a PyCGE object holding the calibrated BASE
+_scenario_cge = None
+
+
+def data_sams(data, sam_data):
+    #every square param whose rows and columns are the same accounts, as (accounts, NumPy array);
+    #no copy for bulk data, and no pandas, so checking the SAMs of `model_data` stays cheap
+    
+    sams = {}
+    if sam_data is not None:
+        for name, (rows, cols, values) in sam_data.params.items():
+            if list(rows) == list(cols):
+                sams[name] = (list(rows), np.asarray(values, dtype=float))
+        return sams
+    for name, values in data.data().items(): #DataPortal: {(row, column): value}
+        if isinstance(values, dict) and values and all(isinstance(k, tuple) and len(k) == 2 for k in values):
+            accounts = list(dict.fromkeys(row for row, _ in values))
+            if set(accounts) == {col for _, col in values}:
+                position = {account: k for k, account in enumerate(accounts)}
+                sam = np.zeros((len(accounts), len(accounts)))
+                for (row, col), val in values.items():
+                    sam[position[row], position[col]] = np.nan if val is None else val
+                sams[name] = (accounts, sam)
+    return sams
+
+
+def set_data_sam(data, sam_data, name, accounts, sam):
+    #write the balanced array `sam` over `accounts` (from `data_sams`) back into the data
+    
+    if sam_data is not None:
+        rows, cols, _ = sam_data.params[name]
+        sam_data.params[name] = (rows, cols, np.asarray(sam, dtype=float))
+    else:
+        position = {account: k for k, account in enumerate(accounts)}
+        values = data.data(name)
+        for row, col in values:
+            values[row, col] = float(sam[position[row], position[col]])
+
+
+def scenario_base_copy(cge): #this is called from `run_scenarios`
+    
+    base_copy = copy.copy(cge) #shallow copy, so the original keeps its SIM
+    for name in ('sim', 'sim_results', 'sim_solved'):
+        base_copy.__dict__.pop(name, None)
+    base_copy.results_store = None #an open results file stays with the original
+    base_copy.component_indexes = {}
+    base_copy.changesets = {'base': {}, 'sim': {}}
+    base_copy.metrics = Metrics() #records are not shipped to the workers
+    base_copy.shared_lock = None #belongs to this process's event loop
+    base_copy.solution_cache = None #each worker would only fill its own copy
+    base_copy.neighbor_index = None
+    base_copy.neighbor_stats = []
+    return base_copy
+
+
+def scenario_worker_init(payload): #runs once in every worker process
+    
+    global _scenario_cge
+    _scenario_cge = dill.loads(payload)
+
+
+def ssa_apply(cge, params, changes): #sets up the SIM of one draw of `run_ssa`
+    
+    #`params` already holds every Param recalibrated for the draw (in `run_ssa`, in one vectorized pass)
+    if cge.model_modify_sim_bulk(params, rederive=False) == 0 or cge.model_modify_sim_bulk(changes) == 0:
+        raise KeyError("the recalibrated Params or the policy changes could not be applied")
+
+
+def ssa_row(row, instance, results, error, start, base_obj, outputs): #fills the row of one draw of `run_ssa`
+    
+    row['seconds'] = time.time() - start
+    if error is not None: #one bad draw must not stop the run
+        row['status'] = 'error'
+        row['termination_condition'] = 'error'
+        row['message'] = str(error)
+        return row
+    row['status'] = str(results.solver.status)
+    row['termination_condition'] = str(results.solver.termination_condition)
+    row['message'] = str(results.solver.message)
+    row['obj'] = value(instance.obj)
+    row['welfare'] = (row['obj'] / base_obj - 1) * 100 #percent change in utility from BASE
+    for NAME in outputs:
+        for v in getattr(instance, NAME).values():
+            row[v.name] = v.value
+    return row
+
+
+def ssa_draw_row(draw_id, params, base): #the draw columns, also in the row of a failed draw, so a resumed run can check it
+    
+    row = {'draw': draw_id}
+    for (NAME, INDEX), values in params.items():
+        for index, val in zip(base.i, values):
+            row['%s[%s]' % (NAME, index)] = val
+    return row
+
+
+def ssa_worker(draw_id, params, changes, outputs, solver, mgr): #solves one draw of `run_ssa`
+    
+    cge = _scenario_cge
+    row = ssa_draw_row(draw_id, params, cge.base)
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if getattr(cge, 'sim', None) is None: #the SIM is copied from BASE once per worker
+                cge.model_sim()
+                cge.model_changeset('ssa start')
+                cge.ssa_base_obj = value(cge.sim.obj)
+            else:
+                cge.model_rollback('ssa start')
+            ssa_apply(cge, params, changes)
+            cge.model_solve(solver, mgr)
+    except Exception as e:
+        return ssa_row(row, None, None, e, start, None, outputs)
+    return ssa_row(row, cge.sim, cge.sim_results, None, start, cge.ssa_base_obj, outputs)
+
+
+def scenario_apply(cge, changes): #sets up the SIM of one scenario of `run_scenarios`
+    
+    cge.model_sim()
+    cge.dict_sim = {}
+    for change in changes:
+        component = cge.sim.component(change[0])
+        if component is None: #`model_modify_sim` would only print this
+            raise KeyError(str(change[0]) + " does not exist in current instance")
+        component[change[1]] #raises if the index does not exist
+        cge.model_modify_sim(*change)
+
+
+def scenario_row(row, instance, results, error, start): #fills the row of one scenario of `run_scenarios`
+    
+    row['seconds'] = time.time() - start
+    if error is not None: #one bad scenario must not stop the batch
+        row['status'] = 'error'
+        row['termination_condition'] = 'error'
+        row['message'] = str(error)
+        row['obj'] = np.nan
+        return row
+    row['status'] = str(results.solver.status)
+    row['termination_condition'] = str(results.solver.termination_condition)
+    row['message'] = str(results.solver.message)
+    row['obj'] = value(instance.obj)
+    for v in instance.component_data_objects(Var):
+        row[v.name] = v.value
+    return row
+
+
+def scenario_worker(scenario_id, changes, solver, mgr, warmstart): #solves one scenario of `run_scenarios`
+    
+    cge = _scenario_cge
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): #the worker's progress messages are not useful here
+            scenario_apply(cge, changes)
+            cge.model_solve(solver, mgr, warmstart=warmstart)
+    except Exception as e:
+        return scenario_row({'scenario': scenario_id}, None, None, e, start)
+    return scenario_row({'scenario': scenario_id}, cge.sim, cge.sim_results, None, start)
+
+
+def queued_solves(solver, mgr): #this is called from `run_scenarios` and `run_ssa`
+    #whether the solves go through the queue of the solver manager `mgr` instead of a pool of processes
+    return mgr != '' and solver not in (newton.SOLVER_NAME, newton.CHECK_NAME)
+
+
+def collect_queued(solver_mgr, queued): #this is called from `model_queue_sims`
+    #(job, instance, results, error, start) of the next queued solve to finish
+    
+    handle = solver_mgr.wait_any()
+    job, instance, start = queued.pop(handle.id)
+    try:
+        results = solver_mgr.get_results(handle)
+        if results is None:
+            raise ActionManagerError("no results for the solve: %s" % handle.explanation)
+        instance.solutions.store_to(results)
+    except Exception as e:
+        return job, instance, None, e, start
+    return job, instance, results, None, start
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar results store.
+
+All solved instances of a run go into a single file with one row per Var
+element: scenario id, component, index and value. The file is Parquet when
+`pyarrow` is installed and a NumPy `.npz` archive otherwise. Either way it
+reloads straight into pandas or NumPy without parsing text.
+
+Each append is written out as it comes: a Parquet row group, or one array per
+column in the `.npz` archive (``value/000003.npy`` holds the values of the
+fourth append). Both files are complete once the store is closed.
+"""
+import os
+import time
+import uuid
+import zipfile
+
+import numpy as np
+from pyomo.common.dependencies import attempt_import
+
+#imported when a store is opened; without pyarrow the store falls back to .npz
+pa, _ = attempt_import('pyarrow')
+pq, pyarrow_available = attempt_import('pyarrow.parquet')
+
+
+COLUMNS = ('scenario', 'component', 'index', 'value')
+
+
+def index_label(index):
+    #'BRD' for a single index, 'CAP,BRD' for a tuple, '' for a scalar component
+    if index is None:
+        return ''
+    if isinstance(index, tuple):
+        return ','.join(str(i) for i in index)
+    return str(index)
+
+
+def run_filename(directory, fmt):
+    #timestamp for readability plus a random suffix so runs started in the same second never collide
+    moment = time.strftime("%Y-%b-%d__%H_%M_%S", time.localtime())
+    return os.path.join(directory, "results_" + moment + "_" + uuid.uuid4().hex[:8] + "." + fmt)
+
+
+class ResultsStore:
+    """Append-only store of solved instances, one file per run."""
+
+    def __init__(self, directory, fmt=None):
+
+        if fmt is None:
+            fmt = 'parquet' if pyarrow_available else 'npz'
+        if fmt == 'parquet' and not pyarrow_available:
+            raise ImportError("pyarrow is required to write parquet; use fmt='npz'")
+        if fmt not in ('parquet', 'npz'):
+            raise ValueError("fmt must be 'parquet' or 'npz'")
+        if not os.path.exists(directory):
+            print(directory, "directory did not exist so one was created")
+            os.makedirs(directory)
+
+        self.fmt = fmt
+        self.path = run_filename(os.path.abspath(directory), fmt)
+        self.rows = 0
+        self._writer = None #parquet: one row group per append
+        self._archive = None #npz: one member per column and append
+        self.chunks = 0
+
+    def append(self, scenario_id, keys, values):
+        #`keys` are (component, index) pairs and `values` the matching Var values
+
+        n = len(keys)
+        columns = {'scenario': np.full(n, str(scenario_id)),
+                   'component': np.array([str(k[0]) for k in keys], dtype=str),
+                   'index': np.array([index_label(k[1]) for k in keys], dtype=str),
+                   'value': np.asarray(values, dtype=float)}
+        self.rows += n
+
+        if self.fmt == 'parquet':
+            table = pa.table({name: columns[name] for name in COLUMNS})
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._archive is None:
+                self._archive = zipfile.ZipFile(self.path, 'w')
+            for name in COLUMNS:
+                with self._archive.open('%s/%06d.npy' % (name, self.chunks), 'w', force_zip64=True) as member:
+                    np.lib.format.write_array(member, columns[name], allow_pickle=False)
+        self.chunks += 1
+
+    def close(self):
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_results(path, as_arrays=False):
+    """Reload a results file as a pandas DataFrame, or as a dict of NumPy arrays."""
+
+    if path.endswith('.parquet'):
+        if not pyarrow_available:
+            raise ImportError("pyarrow is required to read parquet")
+        table = pq.read_table(path)
+        if as_arrays:
+            return {name: table.column(name).to_numpy() for name in COLUMNS}
+        return table.to_pandas()
+
+    with np.load(path, allow_pickle=False) as archive:
+        #one member per column and append, in order
+        members = sorted(archive.files)
+        arrays = {name: np.concatenate([archive[member] for member in members if member.startswith(name + '/')])
+                  for name in COLUMNS}
+    if as_arrays:
+        return arrays
+    import pandas as pd
+    return pd.DataFrame(arrays)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic balanced social accounting matrices.
+
+`balanced_sam` builds a SAM with any number of goods and factors in one of the
+two layouts of the example models:
+
+* ``'std'`` (`StdModelDef`): goods, factors, IDT, TRF, HOH, GOV, INV, EXT
+* ``'spl'`` (`SplModelDef`): goods, factors, HOH
+
+The flows are random but built from the accounting identities, so every row
+total equals its column total (up to floating point). `write_data_dir` writes a SAM
+with its `U`, `I` and `H` sets as a data directory for `PyCGE.model_data`.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+LAYOUTS = ('std', 'spl')
+STD_ACCOUNTS = ['IDT', 'TRF', 'HOH', 'GOV', 'INV', 'EXT'] #the accounts after the goods and factors
+FACTOR_NAMES = ['CAP', 'LAB'] #the first factors keep the names of the shipped data, so 'CAP' is still the numeraire
+
+
+def good_names(n_goods):
+    return ['G%d' % k for k in range(n_goods)]
+
+
+def factor_names(n_factors):
+    return (FACTOR_NAMES + ['F%d' % k for k in range(len(FACTOR_NAMES), n_factors)])[:n_factors]
+
+
+def margin_noise(rows, cols, rng):
+    #a random matrix whose rows and columns all sum to zero
+    noise = rng.standard_normal((rows, cols))
+    return noise - noise.mean(axis=0) - noise.mean(axis=1, keepdims=True) + noise.mean()
+
+
+def spread(row_totals, col_totals, rng, amount=0.5):
+    """Positive matrix with the given row and column totals (which must have the same sum).
+
+    This is the proportional split perturbed by `margin_noise`, scaled so that
+    no entry falls below (1 - amount) of its proportional value.
+    """
+    base = np.outer(row_totals, col_totals) / np.sum(col_totals)
+    if base.shape[0] < 2 or base.shape[1] < 2: #a single row or column is already determined
+        return base
+    noise = margin_noise(base.shape[0], base.shape[1], rng)
+    scale = amount * np.min(base / np.maximum(np.abs(noise), 1e-12))
+    return base + scale * noise
+
+
+def balanced_sam(n_goods, n_factors=2, layout='std', seed=None):
+    """Random balanced SAM as a DataFrame with the accounts of `layout` as index and columns."""
+
+    if layout not in LAYOUTS:
+        raise ValueError("layout must be one of %s, not %r" % (LAYOUTS, layout))
+    if n_goods < 1 or n_factors < 1:
+        raise ValueError("a SAM needs at least one good and one factor")
+
+    rng = np.random.default_rng(seed)
+    goods = good_names(n_goods)
+    factors = factor_names(n_factors)
+
+    if layout == 'spl':
+        #each good is made from factors only and all of it is consumed by the household
+        F = rng.uniform(5, 25, size=(n_factors, n_goods)) #factor h in good j
+        accounts = goods + factors + ['HOH']
+        sam = pd.DataFrame(0.0, index=accounts, columns=accounts)
+        sam.loc[factors, goods] = F
+        sam.loc[goods, 'HOH'] = F.sum(axis=0)
+        sam.loc['HOH', factors] = F.sum(axis=1)
+        sam.index.name = 'U'
+        return sam
+
+    #columns of the goods: intermediates, factors, indirect taxes, tariffs and imports add up to the supply Q
+    Q = rng.uniform(80, 120, size=n_goods)
+    X = 0.3 * rng.uniform(0.5, 1.5, size=(n_goods, n_goods)) / n_goods * Q #row sums stay below 0.45 * 120 < 80
+    rest = Q - X.sum(axis=0)
+    shares = rng.dirichlet(np.full(n_factors + 3, 4.0), size=n_goods) * np.array([0.75] * n_factors + [0.05, 0.02, 0.18]) #factors, IDT, TRF, imports
+    shares /= shares.sum(axis=1, keepdims=True)
+    F = (shares[:, :n_factors] * rest[:, None]).T
+    Tz, Tm, M = (shares[:, n_factors + k] * rest for k in range(3))
+
+    #incomes and savings of the institutions; the final demand they add up to equals Q less the intermediates
+    Y = F.sum()
+    Td = rng.uniform(0.1, 0.25) * Y
+    Sp = rng.uniform(0.1, 0.3) * (Y - Td)
+    Xg_total = rng.uniform(0.6, 0.9) * (Tz.sum() + Tm.sum() + Td)
+    Sg = Tz.sum() + Tm.sum() + Td - Xg_total
+    Sf = rng.uniform(0.1, 0.4) * M.sum() #exports are the imports not financed by foreign savings
+    uses = np.array([Y - Td - Sp, Xg_total, Sp + Sg + Sf, M.sum() - Sf]) #household, government, investment, exports
+    final = spread(Q - X.sum(axis=1), uses, rng)
+
+    accounts = goods + factors + STD_ACCOUNTS
+    sam = pd.DataFrame(0.0, index=accounts, columns=accounts)
+    sam.loc[goods, goods] = X
+    sam.loc[factors, goods] = F
+    sam.loc['IDT', goods] = Tz
+    sam.loc['TRF', goods] = Tm
+    sam.loc['EXT', goods] = M
+    sam.loc[goods, ['HOH', 'GOV', 'INV', 'EXT']] = final
+    sam.loc['HOH', factors] = F.sum(axis=1)
+    sam.loc['GOV', ['IDT', 'TRF', 'HOH']] = [Tz.sum(), Tm.sum(), Td]
+    sam.loc['INV', ['HOH', 'GOV', 'EXT']] = [Sp, Sg, Sf]
+    sam.index.name = 'U'
+    return sam
+
+
+def imbalance(sam):
+    #largest absolute difference between a row total and the matching column total
+    return float(np.max(np.abs(sam.sum(axis=1).to_numpy() - sam.sum(axis=0).to_numpy())))
+
+
+def write_data_dir(sam, directory, goods=None, factors=None, binary=False):
+    """Write `sam` and its sets as a data directory for `PyCGE.model_data`.
+
+    By default the goods are the accounts named like `good_names` and the
+    factors those that are neither goods nor one of the institutions.
+    ``binary=True`` stores the SAM as `param-sam-.npy` (see `pycge.dataload`).
+    """
+
+    accounts = list(sam.index)
+    if goods is None:
+        named = set(good_names(len(accounts)))
+        goods = [u for u in accounts if u in named]
+    if factors is None:
+        factors = [u for u in accounts if u not in goods and u not in STD_ACCOUNTS]
+    os.makedirs(directory, exist_ok=True)
+
+    if binary:
+        np.save(os.path.join(directory, 'param-sam-.npy'), sam.to_numpy(dtype=float))
+    else:
+        sam.to_csv(os.path.join(directory, 'param-sam-.csv'))
+    for name, members in (('i', goods), ('h', factors), ('u', accounts)):
+        with open(os.path.join(directory, 'set-' + name + '-.csv'), 'w') as set_file:
+            set_file.write(name.upper() + '\n' + '\n'.join(members) + '\n')
+    return directory
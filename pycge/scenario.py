@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Copy-on-write scenarios.
+
+A `Scenario` does not hold a Pyomo instance. It stores only what differs from
+the calibrated BASE: the mutable Param values and Var fixings the user changed,
+and, once solved, the solution as a flat array. All scenarios of a `PyCGE`
+object share one working copy of BASE (a `SharedInstance`); a scenario is
+written into it only while it is being solved or inspected.
+"""
+import copy
+
+import numpy as np
+
+from pyomo.core import Var, Param
+from pyomo.opt import SolverResults
+
+
+class Scenario:
+    """Overlay of changes to the calibrated BASE."""
+
+    def __init__(self, name=None):
+
+        self.name = name
+        self.params = {} #(NAME, INDEX) -> value of a mutable Param
+        self.fixed = {} #(NAME, INDEX) -> (value, fixed flag) of a Var
+        self.solution = None #values of every Var, in `SharedInstance.vars` order
+        self.solved = False
+        self.status = None
+        self.termination_condition = None
+        self.message = None
+
+    def __repr__(self):
+        return "Scenario(%r, %d params, %d vars, solved=%s)" % (self.name, len(self.params), len(self.fixed), self.solved)
+
+    def store(self, shared, results):
+        #keep the solution and the solver status, not the results object
+
+        self.solution = shared.get_values()
+        self.status = results.solver.status
+        self.termination_condition = results.solver.termination_condition
+        self.message = results.solver.message
+        self.solved = True
+
+    def results(self):
+        #a small `SolverResults` with the stored solver status
+
+        results = SolverResults()
+        if self.solved:
+            results.solver.status = self.status
+            results.solver.termination_condition = self.termination_condition
+            results.solver.message = self.message
+        return results
+
+
+class SharedInstance:
+    """One working copy of BASE that scenarios are materialized into."""
+
+    def __init__(self, base):
+
+        self.instance = copy.deepcopy(base)
+
+        self.params = [] #mutable Param elements
+        for p in self.instance.component_objects(Param, active=True):
+            if p.mutable:
+                self.params.extend(p[index] for index in p)
+        self.vars = list(self.instance.component_data_objects(Var))
+
+        #the BASE state every scenario starts from
+        self.base_params = np.array([p.value for p in self.params], dtype=float)
+        self.base_values = self.get_values()
+        self.base_fixed = np.array([v.fixed for v in self.vars], dtype=bool)
+
+    def get_values(self):
+        return np.array([v.value for v in self.vars], dtype=float)
+
+    def set_values(self, values):
+        for v, val in zip(self.vars, values):
+            v.set_value(None if np.isnan(val) else float(val), skip_validation=True)
+
+    def materialize(self, scenario):
+        #reset to BASE, then apply the overlay of `scenario`
+
+        for p, val in zip(self.params, self.base_params):
+            p.value = None if np.isnan(val) else float(val)
+        for v, fixed in zip(self.vars, self.base_fixed):
+            v.fixed = bool(fixed)
+
+        if scenario.solution is not None: #start from the scenario's last solution
+            self.set_values(scenario.solution)
+        else:
+            self.set_values(self.base_values)
+
+        for (NAME, INDEX), val in scenario.params.items():
+            getattr(self.instance, NAME)[INDEX].value = val
+        for (NAME, INDEX), (val, fixed) in scenario.fixed.items():
+            var = getattr(self.instance, NAME)[INDEX]
+            var.value = val
+            var.fixed = fixed
+
+        return self.instance
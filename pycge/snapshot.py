@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Solution-only snapshots of an instance.
+
+Instead of pickling a whole Pyomo instance with `dill`, a snapshot keeps only
+flat arrays: mutable Param values, Var values and fixed flags, and constraint
+duals. It is tagged with the data fingerprint, the model-definition id and a
+hash of the instance structure, so it can only be loaded back into an instance
+built from the same `ModelDef` (and, normally, the same data).
+"""
+import hashlib
+import inspect
+import os
+
+import numpy as np
+
+from pyomo.core import Var, Param, Constraint, Suffix
+
+
+def data_fingerprint(data_dir):
+    #hash of the names and contents of the files in a data directory
+
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, filename)
+        if os.path.isfile(path):
+            digest.update(filename.encode())
+            with open(path, 'rb') as data_file:
+                digest.update(data_file.read())
+    return digest.hexdigest()
+
+
+def model_def_id(model_def):
+    #class name plus a hash of the file that defines it, so an edited ModelDef gets a new id
+
+    cls = type(model_def)
+    digest = hashlib.sha256()
+    try:
+        with open(inspect.getsourcefile(cls), 'rb') as source_file:
+            digest.update(source_file.read())
+    except (OSError, TypeError): #e.g. defined interactively
+        pass
+    return cls.__module__ + '.' + cls.__qualname__ + ':' + digest.hexdigest()[:16]
+
+
+def mutable_params(instance):
+    params = []
+    for p in instance.component_objects(Param, active=True):
+        if p.mutable:
+            params.extend(p[index] for index in p)
+    return params
+
+
+def structure_id(params, variables, constraints):
+    #hash of the element names, checked before arrays are loaded by position
+
+    digest = hashlib.sha256()
+    for group in (params, variables, constraints):
+        digest.update('\n'.join(c.name for c in group).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def save_snapshot(path, instance, data_id='', def_id='', solved=False, status=''):
+
+    params = mutable_params(instance)
+    variables = list(instance.component_data_objects(Var))
+    constraints = list(instance.component_data_objects(Constraint, active=True))
+
+    dual = instance.component('dual')
+    if isinstance(dual, Suffix):
+        duals = np.array([dual.get(c, np.nan) for c in constraints], dtype=float)
+    else:
+        duals = np.full(len(constraints), np.nan)
+
+    np.savez_compressed(path,
+                        data_fingerprint=np.array(data_id or ''),
+                        model_def_id=np.array(def_id or ''),
+                        structure_id=np.array(structure_id(params, variables, constraints)),
+                        solved=np.array(bool(solved)),
+                        status=np.array(str(status)),
+                        param_values=np.array([p.value for p in params], dtype=float),
+                        var_values=np.array([v.value for v in variables], dtype=float),
+                        var_fixed=np.array([v.fixed for v in variables], dtype=bool),
+                        duals=duals)
+
+
+def read_snapshot(path):
+
+    with np.load(path, allow_pickle=False) as archive:
+        snapshot = {name: archive[name] for name in archive.files}
+    for name in ('data_fingerprint', 'model_def_id', 'structure_id', 'status'):
+        snapshot[name] = str(snapshot[name])
+    snapshot['solved'] = bool(snapshot['solved'])
+    return snapshot
+
+
+def load_snapshot(snapshot, instance):
+    #bulk-load the arrays of `snapshot` (from `read_snapshot`) into `instance`
+
+    params = mutable_params(instance)
+    variables = list(instance.component_data_objects(Var))
+    constraints = list(instance.component_data_objects(Constraint, active=True))
+    if structure_id(params, variables, constraints) != snapshot['structure_id']:
+        raise ValueError("snapshot does not match the structure of this instance")
+
+    for p, val in zip(params, snapshot['param_values']):
+        p.value = None if np.isnan(val) else float(val)
+    for v, val, fixed in zip(variables, snapshot['var_values'], snapshot['var_fixed']):
+        v.set_value(None if np.isnan(val) else float(val), skip_validation=True)
+        v.fixed = bool(fixed)
+
+    if not np.all(np.isnan(snapshot['duals'])):
+        if instance.component('dual') is None:
+            instance.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+        for c, val in zip(constraints, snapshot['duals']):
+            if not np.isnan(val):
+                instance.dual[c] = float(val)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Local solver manager with the queue-and-poll interface of NEOS.
+
+``SolverManagerFactory('localpool')`` works wherever ``mgr='neos'`` does, but
+the solver runs on this machine. Like the NEOS manager it writes each queued
+instance's NL file in the calling thread. The solver process is then started
+by one of a pool of threads, at most `max_workers` at a time. Its solution is
+read back, and loaded into the instance, by whichever call (`wait_any`,
+`wait_all`, `wait_for` or `solve`) finds it finished. So many instances can be
+queued and their results collected as they finish::
+
+    with SolverManagerFactory('localpool', max_workers=4) as manager:
+        handles = {manager.queue(instance, opt='ipopt'): name for name, instance in instances.items()}
+        for _ in handles:
+            handle = manager.wait_any()
+            results = manager.get_results(handle)
+
+Managers with the same `max_workers` share one pool, so solves started from
+several threads (or several `PyCGE` objects) together never run more than
+`max_workers` solver processes. Only solvers that run an executable on a
+problem file (Ipopt, CONOPT, ...) are pooled. Any other solver is run at once
+in the calling thread, as the ``'serial'`` manager does.
+
+The pool drives Pyomo's shell solvers through their private steps (`_presolve`,
+`_apply_solver`, `_postsolve`) and tempfile stack, which are those of Pyomo 6;
+it was tested with Pyomo 6.10. `PRIVATE_API` tells whether the installed Pyomo
+still has them. When it does not, every solve is run at once in the calling
+thread, as for a solver that is not pooled.
+
+`PyCGE.run_scenarios` and `PyCGE.run_ssa` queue their solves in this way when
+they are given a solver manager (``mgr='localpool'``, ``mgr='neos'``, ...).
+"""
+import concurrent.futures
+import os
+import threading
+import time
+
+from pyomo.common.tempfiles import TempfileManager
+from pyomo.core.base.suffix import active_import_suffix_generator
+from pyomo.opt import SolverFactory, SolverManagerFactory
+from pyomo.opt.base.solvers import OptSolver
+from pyomo.opt.parallel.async_solver import AsynchronousSolverManager
+from pyomo.opt.parallel.manager import ActionManagerError, ActionStatus
+from pyomo.opt.solver import SystemCallSolver
+
+
+POOL_NAME = 'localpool'
+MAX_WORKERS = os.cpu_count() or 1 #default cap; set it before solving to change it for `mgr='localpool'` call sites
+
+_pools = {} #max_workers: thread pool shared by every manager with that cap
+_pools_lock = threading.Lock()
+_tempfile_lock = threading.Lock() #Pyomo's tempfile stack is global, and solves may be queued from several threads
+
+#the private Pyomo 6 steps that a shell solve is split into; a later Pyomo may rename or remove them
+PRIVATE_API = (hasattr(TempfileManager, '_context_stack')
+               and hasattr(OptSolver, '_options_string_to_dict')
+               and all(hasattr(SystemCallSolver, name) for name in ('_presolve', '_apply_solver', '_postsolve')))
+
+
+def shared_pool(max_workers):
+
+    with _pools_lock:
+        if max_workers not in _pools:
+            _pools[max_workers] = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                                        thread_name_prefix=POOL_NAME)
+        return _pools[max_workers]
+
+
+def solver_object(solver):
+    #the Pyomo solver object named by (or given as) `solver`
+
+    import pyomo.environ #registers the solver plugins that `SolverFactory` looks names up in
+    return SolverFactory(solver) if isinstance(solver, str) else solver
+
+
+def write_problem(solver, *args, **kwds):
+    """Write the problem file of one solve with the shell solver `solver` (a name or a solver object).
+
+    Returns the solver object that will run it and the `TempfileContext` of its
+    files. A solver object holds the state of one solve, so a given object is
+    copied and several solves can be in flight. The context is kept off Pyomo's
+    (last in, first out) stack until `read_solution`, since solves may finish
+    in any order.
+    """
+    if not PRIVATE_API:
+        raise ActionManagerError("This version of Pyomo cannot write a problem file apart from its solve")
+    options = kwds.pop('options', {})
+    if isinstance(solver, str):
+        opt = solver_object(solver)
+    else:
+        opt = SolverFactory(solver.name, executable=solver.executable())
+        opt.options.update(solver.options)
+    instance = args[0] if args else None
+    #what `OptSolver.solve` does before writing the problem: import the model's suffixes and apply the options
+    if instance is not None:
+        suffixes = kwds.setdefault('suffixes', [])
+        suffixes.extend(name for name, _ in active_import_suffix_generator(instance) if name not in suffixes)
+    opt.options.update(options)
+    opt.options.update(OptSolver._options_string_to_dict(kwds.pop('options_string', '')))
+    opt.available(exception_flag=True)
+
+    with _tempfile_lock:
+        opt._presolve(*args, **kwds)
+        context = TempfileManager._context_stack.pop()
+    return opt, context
+
+
+def read_solution(opt, instance, context, rc, log, start):
+    """Read back a solve started by `write_problem`, load it into `instance` and remove its files."""
+
+    try:
+        if rc:
+            raise ActionManagerError("Solver (%s) did not exit normally (return code %s):\n%s" % (opt.name, rc, log))
+        opt._rc, opt._log = rc, log
+        with _tempfile_lock:
+            TempfileManager._context_stack.append(context) #`_postsolve` pops it and removes the files
+            try:
+                results = opt._postsolve()
+            finally:
+                if context in TempfileManager._context_stack: #`_postsolve` failed before popping it
+                    TempfileManager._context_stack.remove(context)
+                else:
+                    context = None
+    finally:
+        if context is not None:
+            context.release(remove=True)
+
+    results.pyomo_solve_time = time.time() - start
+    results._smap_id = opt._smap_id
+    results._smap = None
+    if instance is not None and opt._load_solutions:
+        instance.solutions.load_from(results, select=opt._select_index,
+                                     default_variable_value=opt._default_variable_value)
+        results._smap_id = None
+        results.solution.clear()
+    elif instance is not None:
+        results._smap = instance.solutions.symbol_map[opt._smap_id]
+        instance.solutions.delete_symbol_map(opt._smap_id)
+    return results
+
+
+@SolverManagerFactory.register(POOL_NAME, doc="Asynchronously execute solvers in a pool of local processes")
+class LocalPoolManager(AsynchronousSolverManager):
+    """Solver manager that runs queued solves concurrently on this machine."""
+
+    def __init__(self, max_workers=None, **kwds):
+
+        self.max_workers = max_workers or MAX_WORKERS
+        AsynchronousSolverManager.__init__(self, **kwds)
+
+    def clear(self):
+
+        AsynchronousSolverManager.clear(self)
+        self.jobs = {} #action handle id: (handle, future, solver, instance, tempfile context)
+        self.errors = {} #action handle id: exception raised while solving
+
+    def _perform_queue(self, ah, *args, **kwds):
+        #write the problem file here, then hand the solver run to the pool
+
+        solver = kwds.pop('solver', kwds.pop('opt', None))
+        if solver is None:
+            raise ActionManagerError("No solver passed to %s, use keyword option 'solver'" % type(self).__name__)
+        opt = solver_object(solver)
+        instance = args[0] if args else None
+        ah.start = time.time()
+
+        if not PRIVATE_API or not isinstance(opt, SystemCallSolver): #nothing to run in a separate process
+            try:
+                self.results[ah.id] = opt.solve(*args, **kwds)
+                self.results[ah.id].pyomo_solve_time = time.time() - ah.start
+                ah.status = ActionStatus.done
+            except Exception as e:
+                self.errors[ah.id] = e
+                ah.status = ActionStatus.error
+            self.jobs[ah.id] = (ah, None, opt, instance, None)
+            return ah
+
+        opt, context = write_problem(solver, *args, **kwds)
+        future = shared_pool(self.max_workers).submit(opt._apply_solver)
+        self.jobs[ah.id] = (ah, future, opt, instance, context)
+        return ah
+
+    def _perform_wait_any(self):
+        #read back one finished solve; None (poll again) when none has finished yet
+
+        if not self.jobs: #Pyomo's `wait_any` would poll forever (or fail on a handle it does not know)
+            raise ActionManagerError("No queued solves in the %r solver manager" % POOL_NAME)
+        done = [ah_id for ah_id, job in self.jobs.items() if job[1] is None or job[1].done()]
+        if not done:
+            futures = [job[1] for job in self.jobs.values()]
+            concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            return None
+        ah, future, opt, instance, context = self.jobs.pop(done[0])
+        if future is None: #solved when it was queued
+            return ah
+        try:
+            try:
+                status = future.result()
+            except BaseException:
+                context.release(remove=True)
+                raise
+            self.results[ah.id] = read_solution(opt, instance, context, status.rc, status.log, ah.start)
+            ah.status = ActionStatus.done
+        except Exception as e:
+            self.errors[ah.id] = e
+            ah.status = ActionStatus.error
+        return ah
+
+    def get_results(self, ah):
+        #results of a finished solve, or the error it raised
+
+        if ah.id in self.errors:
+            raise self.errors.pop(ah.id)
+        return AsynchronousSolverManager.get_results(self, ah)
+
+    def __exit__(self, t, v, traceback):
+        #drop the solves that have not started and wait for the running ones, then remove their files
+
+        for ah, future, opt, instance, context in self.jobs.values():
+            if future is not None and not future.cancel():
+                concurrent.futures.wait([future])
+            if context is not None:
+                context.release(remove=True)
+        self.jobs = {}
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo systematic sensitivity analysis (SSA) over elasticities.
+
+`PyCGE.run_ssa` recalibrates the model for every draw of elasticities (all
+draws at once, with the `recalibrate` method of the model definition), solves
+a policy scenario for each draw in a pool of processes and streams one row per
+draw to a CSV file. Rows already in the file are skipped when the run is
+started again, so an interrupted run resumes where it stopped.
+"""
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def uniform_draws(n_draws, n_goods, low=0.5, high=4.0, seed=None, names=('sigma', 'psi')):
+    #independent uniform draws of each elasticity for each good, as (draws, goods) arrays
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(low, high, size=(n_draws, n_goods)) for name in names}
+
+
+class DrawLog:
+    """CSV file with one row per finished draw, appended as draws finish.
+
+    `draws` maps each draw id to the values of its draw columns. A file is only
+    resumed when every row in it matches, so a run with another seed or
+    distribution never mixes its rows with the old ones.
+    """
+
+    def __init__(self, path, columns, resume=True, draws=None):
+
+        self.path = path
+        self.columns = list(columns)
+        self.done = set() #ids of the draws already in the file
+
+        if resume and os.path.exists(path):
+            self.repair()
+            with open(path, newline='') as log_file:
+                reader = csv.reader(log_file)
+                header = next(reader, None)
+                if header is not None and header != self.columns:
+                    raise ValueError(path + " was written by a different run (its columns differ); pass resume=False to overwrite it")
+                for row in reader:
+                    if len(row) == len(self.columns):
+                        if draws is not None:
+                            self.check(dict(zip(self.columns, row)), draws)
+                        self.done.add(int(row[0]))
+            self.file = open(path, 'a', newline='')
+            self.writer = csv.DictWriter(self.file, self.columns, restval='', extrasaction='ignore')
+            if header is None:
+                self.writer.writeheader()
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self.file = open(path, 'w', newline='')
+            self.writer = csv.DictWriter(self.file, self.columns, restval='', extrasaction='ignore')
+            self.writer.writeheader()
+        self.file.flush()
+
+    def check(self, row, draws):
+        #refuse to resume a file holding a draw that this run would draw differently
+
+        draw = int(row['draw'])
+        values = draws.get(draw)
+        if values is None:
+            raise ValueError("%s has draw %d, which this run does not make; pass resume=False to overwrite it" % (self.path, draw))
+        for column, val in values.items():
+            try:
+                same = np.isclose(float(row[column]), val, rtol=1e-12, atol=0.0)
+            except ValueError: #empty cell
+                same = False
+            if not same:
+                raise ValueError("%s was written by a different run (draw %d has %s = %s, not %.17g); pass resume=False to overwrite it"
+                                 % (self.path, draw, column, row[column], val))
+
+    def repair(self):
+        #drop a last line that was cut off when the run was interrupted
+
+        with open(self.path, 'rb+') as log_file:
+            data = log_file.read()
+            if data and not data.endswith(b'\n'):
+                log_file.truncate(data.rfind(b'\n') + 1)
+
+    def append(self, row):
+
+        self.writer.writerow(row)
+        self.file.flush()
+        self.done.add(int(row['draw']))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_draws(path):
+    #every row of a `DrawLog` file, indexed by draw
+    return pd.read_csv(path, index_col='draw').sort_index()
+
+
+def summarize(table, columns=None, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Distribution of `columns` (default: every numeric column, i.e. welfare, the elasticities
+    drawn and the outputs) over the draws that converged, with the number of failed draws."""
+
+    converged = table[table['termination_condition'] == 'optimal']
+    if columns is None:
+        columns = [c for c in table.select_dtypes('number').columns if c not in ('seconds', 'obj')]
+    summary = converged[columns].describe(percentiles=list(quantiles)).T
+    summary.insert(0, 'failed', len(table) - len(converged))
+    return summary
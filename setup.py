@@ -10,10 +10,13 @@ from setuptools import setup, find_packages
 setup(
         name='pycge',
         version='0.1dev',
-        python_requires='~=3.6',
+        python_requires='>=3.9', #`tracemalloc.reset_peak` in pycge.metrics
         install_requires = [
             'dill>=0.2.7', 
-            'pyomo>=5.4.3'
+            'numpy',
+            'pandas',
+            'pyomo>=6,<7', #`set_value(skip_validation=True)`; pycge.solverpool uses Pyomo 6 internals, tested with 6.10
+            'scipy>=1.12' #the `rtol` argument of `scipy.sparse.linalg.cg` in pycge.balance
             ],
         packages=find_packages(),
         url='htpps://github.com/juanfung/pycge.git',
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures of the regression tests. Run them from the repository root with
+
+    python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import shutil
+import stat
+import sys
+
+import pytest
+from pyomo.core import Var
+from pyomo.opt import SolverFactory
+
+from pycge.pycge import PyCGE
+from pycge.examples.stdcge_model_def import StdModelDef
+
+
+SLEEP = 0.5 #seconds the stand-in solver of `fake_solver` takes
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pycge', 'data', 'stdcge_data_dir')
+
+
+@contextlib.contextmanager
+def quiet():
+    #the PyCGE methods report progress with print
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def calibrated(data_dir=DATA_DIR, balance=None, bulk=False, **kwds):
+    #StdModelDef calibrated to `data_dir` with the newton engine, and a SIM created
+
+    with quiet():
+        cge = PyCGE(StdModelDef(), **kwds)
+        cge.model_data(data_dir, bulk=bulk, balance=balance)
+        cge.model_instance('pf', 'CAP')
+        cge.model_calibrate('newton', check=False)
+        cge.model_sim()
+    return cge
+
+
+@pytest.fixture
+def data_copy(tmp_path):
+    #a copy of the stdcge data that a test may edit
+
+    directory = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, directory)
+    return str(directory) + '/'
+
+
+def set_sam(data_dir, row, col, value):
+    #overwrite one cell of the SAM file in `data_dir`
+
+    path = os.path.join(data_dir, 'param-sam-.csv')
+    with open(path) as sam_file:
+        lines = sam_file.read().splitlines()
+    columns = lines[0].split(',')
+    for k, line in enumerate(lines):
+        cells = line.split(',')
+        if cells[0] == row:
+            cells[columns.index(col)] = str(value)
+            lines[k] = ','.join(cells)
+    with open(path, 'w') as sam_file:
+        sam_file.write('\n'.join(lines) + '\n')
+
+
+def var_values(instance):
+    #{(component, index): value} of every Var element
+    return {(v.parent_component().name, v.index()): v.value for v in instance.component_data_objects(Var)}
+
+
+@pytest.fixture
+def fake_solver(tmp_path, monkeypatch):
+    #an Ipopt solver object that runs tests/fake_solver.py
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_solver.py')
+    executable = tmp_path / 'fake_ipopt'
+    executable.write_text('#!/bin/sh\nexec "%s" "%s" "$@"\n' % (sys.executable, script))
+    executable.chmod(executable.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('FAKE_SOLVER_SLEEP', str(SLEEP))
+    import pyomo.environ #registers the solver plugins
+    return SolverFactory('ipopt', executable=str(executable))
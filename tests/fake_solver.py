@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for an AMPL solver executable (such as Ipopt) in the solver pool tests.
+
+Called as ``fake_solver.py STUB -AMPL``, it reads the starting point from
+STUB.nl, waits ``$FAKE_SOLVER_SLEEP`` seconds and writes that point to STUB.sol
+as an optimal solution. So it "solves" an instance that is already at its
+equilibrium, and its run time is known.
+"""
+import os
+import sys
+import time
+
+
+def main(stub):
+
+    if stub.endswith('.nl'):
+        stub = stub[:-3]
+    with open(stub + '.nl') as nl_file:
+        lines = nl_file.read().splitlines()
+    n_var, n_con = [int(t) for t in lines[1].split()[:2]]
+    x = [0.0] * n_var
+    k = 0
+    while k < len(lines):
+        if lines[k].startswith('x'): #the starting point: a count, then (variable, value) lines
+            count = int(lines[k][1:].split()[0])
+            for line in lines[k + 1:k + 1 + count]:
+                j, val = line.split()[:2]
+                x[int(j)] = float(val)
+            k += count
+        k += 1
+    time.sleep(float(os.environ.get('FAKE_SOLVER_SLEEP', '0')))
+    with open(stub + '.sol', 'w') as sol_file:
+        sol_file.write("fake solver: Optimal Solution Found\n\nOptions\n3\n1\n1\n0\n%d\n0\n%d\n%d\n" % (n_con, n_var, n_var))
+        sol_file.write(''.join('%r\n' % val for val in x))
+        sol_file.write("objno 0 0\n")
+    print("fake solver done:", n_var, "variables,", n_con, "constraints")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+`PyCGE.solve_async` and `PyCGE.as_completed`, with the Newton engine and a stand-in solver.
+"""
+import asyncio
+import time
+
+import numpy as np
+from pyomo.opt import TerminationCondition
+
+from tests.conftest import SLEEP, calibrated, quiet
+
+
+def tariff_scenarios(cge, rates):
+    #one scenario per tariff rate on every good
+
+    scenarios = []
+    for rate in rates:
+        scenario = cge.model_scenario('taum=%g' % rate)
+        for i in cge.base.i:
+            cge.model_modify_scenario(scenario, 'taum', i, rate)
+        scenarios.append(scenario)
+    return scenarios
+
+
+async def collect(cge, scenarios, solver, **kwds):
+    return [(scenario, results) async for scenario, results in cge.as_completed(scenarios, solver, **kwds)]
+
+
+def test_as_completed_matches_solving_one_at_a_time():
+
+    cge, one = calibrated(), calibrated()
+    with quiet():
+        scenarios = tariff_scenarios(cge, [0.0, 0.1, 0.3])
+        finished = asyncio.run(collect(cge, scenarios, 'newton'))
+        expected = tariff_scenarios(one, [0.0, 0.1, 0.3])
+        for scenario in expected:
+            one.model_solve_scenario(scenario, 'newton')
+    assert sorted(scenario.name for scenario, _ in finished) == sorted(scenario.name for scenario in scenarios)
+    for (scenario, results), other in zip(sorted(finished, key=lambda f: f[0].name), sorted(expected, key=lambda s: s.name)):
+        assert results.solver.termination_condition == TerminationCondition.optimal
+        assert scenario.solved
+        assert np.allclose(scenario.solution, other.solution, rtol=1e-8, atol=1e-7)
+
+
+def test_shell_solves_run_concurrently(fake_solver):
+
+    cge = calibrated()
+    with quiet():
+        scenarios = [cge.model_scenario(k) for k in range(3)] #BASE itself, which the stand-in solver "solves"
+        start = time.time()
+        finished = asyncio.run(collect(cge, scenarios, fake_solver, limit=3))
+    assert time.time() - start < 2 * SLEEP #not 3 * SLEEP one after another
+    assert [results.solver.termination_condition for _, results in finished] == [TerminationCondition.optimal] * 3
+    assert all(scenario.solved for scenario in scenarios)
+    assert np.allclose(scenarios[0].solution, cge.shared.base_values)
+
+
+def test_timed_out_and_abandoned_solves(fake_solver):
+
+    cge = calibrated()
+    with quiet():
+        scenario = cge.model_scenario('slow')
+        results = asyncio.run(cge.solve_async(scenario, fake_solver, timeout=SLEEP / 5))
+    assert results.solver.termination_condition == TerminationCondition.maxTimeLimit
+    assert not scenario.solved
+
+    async def first(scenarios):
+        async for scenario, results in cge.as_completed(scenarios, fake_solver, limit=1):
+            return scenario
+
+    with quiet():
+        scenarios = [cge.model_scenario(k) for k in range(3)]
+        start = time.time()
+        done = asyncio.run(first(scenarios))
+    assert done is scenarios[0] and done.solved
+    assert not any(scenario.solved for scenario in scenarios[1:]) #cancelled when the loop was left
+    assert time.time() - start < 2.5 * SLEEP
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Balancing a perturbed SAM with `pycge.balance`.
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pycge import balance
+from tests.conftest import DATA_DIR, calibrated, set_sam
+
+
+def stdcge_sam():
+    return pd.read_csv(os.path.join(DATA_DIR, 'param-sam-.csv'), index_col=0).astype(float)
+
+
+def test_stdcge_sam_is_balanced():
+
+    gap, _ = balance.imbalance(stdcge_sam())
+    assert gap <= balance.TOL
+
+
+@pytest.mark.parametrize('method', balance.METHODS)
+def test_balance_perturbed_sam(method):
+
+    sam = stdcge_sam()
+    rng = np.random.default_rng(0)
+    perturbed = sam * rng.uniform(0.9, 1.1, size=sam.shape)
+    assert balance.imbalance(perturbed)[0] > 1e-3
+
+    balanced, info = balance.balance(perturbed, method)
+    assert info['converged']
+    assert isinstance(balanced, pd.DataFrame) and balanced.index.equals(sam.index)
+    assert balance.imbalance(balanced)[0] <= balance.TOL
+    assert np.array_equal(balanced.to_numpy() == 0, sam.to_numpy() == 0) #zeros stay zeros and flows stay flows
+    np.testing.assert_allclose(balanced.to_numpy(), perturbed.to_numpy(), rtol=0.2)
+
+
+def test_unbalanceable_sam_is_refused():
+
+    sam = stdcge_sam()
+    sam.loc['EXT', :] = 0.0 #the rest of the world now only receives
+    with pytest.raises(ValueError):
+        balance.balance(sam + 0.0, 'ras')
+
+
+def test_fingerprint_only_changes_when_a_sam_is_rebalanced(data_copy):
+
+    balanced = calibrated(balance='cross_entropy')
+    assert balanced.balance_report == {} and not balanced.data_fingerprint.endswith('+cross_entropy')
+    assert balanced.data_fingerprint == calibrated().data_fingerprint
+
+    set_sam(data_copy, 'MLK', 'BRD', 30)
+    rebalanced = calibrated(data_copy, balance='cross_entropy')
+    assert rebalanced.balance_report['sam']['converged']
+    assert rebalanced.data_fingerprint.endswith('+cross_entropy')
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_rebalanced_sam_reaches_the_instance(data_copy, bulk):
+
+    set_sam(data_copy, 'MLK', 'BRD', 30)
+    cge = calibrated(data_copy, balance='ras', bulk=bulk)
+    assert cge.balance_report['sam']['worst_account'] in cge.base.u
+    accounts = list(cge.base.u)
+    sam = np.array([[cge.base.sam[r, c] for c in accounts] for r in accounts])
+    assert balance.imbalance(sam)[0] <= balance.TOL
+    assert sam[accounts.index('MLK'), accounts.index('BRD')] != 30 #rescaled
+
+
+def test_shipped_sams_are_balanced():
+
+    for name in ('stdcge_data_dir', 'splcge_data_dir', 'splcge_modified'):
+        sam = pd.read_csv(os.path.join(os.path.dirname(DATA_DIR), name, 'param-sam-.csv'), index_col=0).astype(float)
+        assert balance.imbalance(sam)[0] <= balance.TOL, name
+
+
+def test_checking_a_sam_imports_neither_scipy_nor_pandas():
+
+    code = ("import sys, numpy as np; from pycge import balance; "
+            "assert balance.imbalance(np.array([[0., 1.], [1., 0.]]))[0] == 0; "
+            "print(sorted(m for m in ('pandas', 'scipy') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
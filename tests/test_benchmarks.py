@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic SAMs (`pycge.samgen`) and the scaling benchmarks, at sizes small enough to run quickly.
+"""
+import numpy as np
+import pytest
+
+from pycge import samgen
+from pycge.examples import scaling_benchmark, stdcge_benchmark
+
+
+@pytest.mark.parametrize('layout', samgen.LAYOUTS)
+def test_balanced_sam(layout):
+
+    sam = samgen.balanced_sam(20, n_factors=3, layout=layout, seed=0)
+    assert samgen.imbalance(sam) < 1e-9 * sam.to_numpy().sum()
+    assert (sam.to_numpy() >= 0).all()
+    assert sam.equals(samgen.balanced_sam(20, n_factors=3, layout=layout, seed=0))
+
+
+@pytest.mark.parametrize('model', sorted(scaling_benchmark.MODELS))
+def test_scaling_benchmark_runs_every_stage(model):
+
+    records = scaling_benchmark.benchmark(3, model=model)
+    stages = [record['stage'] for record in records]
+    for stage in ('generate', 'instance', 'nl_write', 'sim', 'postprocess'):
+        assert stage in stages
+    assert stages.count('solve') == 2 #calibrating the BASE and solving the SIM
+    assert all(record['goods'] == 3 for record in records)
+
+
+def test_stdcge_benchmark_replicates_the_benchmark_economy():
+
+    row = stdcge_benchmark.benchmark(4)
+    assert row['goods'] == 4 and row['status'] == 'optimal'
+    assert np.isfinite([row['build_s'], row['calibrate_s'], row['solve_s']]).all() and row['nl_kb'] > 0
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+`model_modify_sim_bulk` and `model_modify_base_bulk`.
+"""
+import pytest
+
+from tests.conftest import calibrated, quiet
+
+
+def test_bulk_matches_one_at_a_time():
+
+    one, bulk = calibrated(), calibrated()
+    goods = list(one.sim.i)
+    with quiet():
+        for k, i in enumerate(goods):
+            one.model_modify_sim('taum', i, 0.01 * (k + 1))
+            one.model_modify_sim('F', ('CAP', i), 0.5, fix=False)
+        one.model_modify_sim('Y', goods[0], 10.0, fix=False)
+        n = bulk.model_modify_sim_bulk({('taum', '*'): [0.01 * (k + 1) for k in range(len(goods))],
+                                        ('F', ('CAP', '*')): 0.5,
+                                        ('Y', goods[0]): 10.0}, fix=False)
+    assert n == 2 * len(goods) + 1
+    for i in goods:
+        assert bulk.sim.taum[i].value == one.sim.taum[i].value
+        assert bulk.sim.F['CAP', i].value == one.sim.F['CAP', i].value == 0.5
+        assert not bulk.sim.F['CAP', i].fixed
+    assert bulk.sim.Y[goods[0]].value == 10.0 and not bulk.sim.Y[goods[0]].fixed
+    assert bulk.dict_sim == one.dict_sim #the same values to undo to
+    assert not bulk.sim_solved
+
+
+def test_a_bad_change_leaves_the_instance_untouched():
+
+    cge = calibrated()
+    before = cge.sim.taum['BRD'].value
+    with quiet():
+        assert cge.model_modify_sim_bulk({('taum', 'BRD'): 0.0, ('taum', 'nowhere'): 0.0}) == 0
+        assert cge.model_modify_sim_bulk({('taum', 'BRD'): 0.0, ('nothing', '*'): 0.0}) == 0
+        assert cge.model_modify_sim_bulk({('taum', '*'): [0.0, 0.0, 0.0]}) == 0 #three values for two goods
+        assert cge.model_modify_sim_bulk({('taum', 'BRD'): 0.0, ('beta', ('CAP', '*')): 0.5}) == 0 #beta is not mutable
+    assert cge.sim.taum['BRD'].value == before
+    assert cge.dict_sim == {}
+
+
+def test_base_bulk_needs_recalibration():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_base_bulk({('Sf', None): 1.1 * cge.base.Sf.value})
+    assert not cge.base_calibrated
+    assert cge.base.Sf.value == pytest.approx(1.1 * cge.sim.Sf.value)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+The vectorized calibration of `StdModelDef` (``model_data(bulk=True)``) against its per-element rules.
+"""
+from pyomo.core import Param
+
+from tests.conftest import calibrated, var_values
+
+
+def test_bulk_calibration_matches_rules_exactly():
+
+    rules = calibrated()
+    bulk = calibrated(bulk=True)
+    assert rules.model_def.calibration is None and bulk.model_def.calibration is not None
+    for p in rules.base.component_objects(Param):
+        other = bulk.base.component(p.name)
+        for index in p:
+            a = p[index].value if p.mutable else p[index]
+            b = other[index].value if other.mutable else other[index]
+            assert a == b, (p.name, index, a, b)
+    assert var_values(rules.base) == var_values(bulk.base)
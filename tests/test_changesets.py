@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Named changesets and rollback (`model_changeset`, `model_rollback`).
+"""
+import numpy as np
+
+from pycge.components import same
+from tests.conftest import calibrated, quiet
+
+
+def test_rollback_restores_values_fixings_and_status():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', 'BRD'): 0.05})
+        cge.model_solve('newton')
+        saved = cge.model_changeset('solved')
+        results = cge.sim_results
+
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0, ('pd', 'BRD'): 1.2})
+        cge.model_solve('newton')
+    changed = cge.component_index('sim').capture()
+    assert not np.all(same(changed.param_values, saved.param_values))
+    assert not np.array_equal(changed.var_fixed, saved.var_fixed)
+
+    with quiet():
+        cge.model_modify_sim_bulk({('tauz', '*'): 0.0}) #unsolved again
+        cge.model_rollback('solved')
+    restored = cge.component_index('sim').capture()
+    assert np.all(same(restored.param_values, saved.param_values))
+    assert np.all(same(restored.var_values, saved.var_values))
+    assert np.array_equal(restored.var_fixed, saved.var_fixed)
+    assert cge.sim_solved and cge.sim_results is results
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+`model_solve_continuation`.
+"""
+import pytest
+from pyomo.opt import TerminationCondition
+
+from tests.conftest import calibrated, quiet, var_values
+
+
+def test_path_reaches_the_direct_solution():
+
+    direct = calibrated()
+    with quiet():
+        direct.model_modify_sim_bulk({('taum', '*'): 0.0, ('FF', 'CAP'): 1.5 * direct.base.FF['CAP'].value})
+        direct.model_solve('newton')
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0, ('FF', 'CAP'): 1.5 * cge.base.FF['CAP'].value})
+        path = cge.model_solve_continuation('newton', first_step=0.25, fast_iterations=100)
+    assert cge.sim_solved
+    assert cge.sim_results.solver.termination_condition == TerminationCondition.optimal
+    assert path['converged'].all()
+    assert path['t_to'].tolist() == [0.25, 0.75, 1.0] #every step converged quickly, so each is twice the last
+    expected = var_values(direct.sim)
+    for key, val in var_values(cge.sim).items():
+        assert val == pytest.approx(expected[key], rel=1e-8, abs=1e-7), key #tariff revenue is ~1e-9 at a zero tariff
+
+
+def test_failed_steps_are_halved_then_abandoned():
+    #the "check" solver only accepts a point that already is an equilibrium, so every step fails
+
+    cge = calibrated()
+    start = var_values(cge.sim)
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        path = cge.model_solve_continuation('check', first_step=0.25, min_step=0.05)
+    assert not cge.sim_solved
+    assert not path['converged'].any()
+    assert path['step'].tolist() == [0.25, 0.125, 0.0625]
+    assert (path['t_from'] == 0.0).all()
+    assert var_values(cge.sim) == start #back at the last equilibrium
+    assert cge.sim.taum['BRD'].value == 0.0 #with the targets left in place
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+The bulk loader (``model_data(bulk=True)``) against `DataPortal`, with CSV and binary parameters.
+"""
+import numpy as np
+from pyomo.core import Param
+
+from pycge import dataload, samgen
+from pycge.pycge import PyCGE
+from pycge.examples.stdcge_model_def import StdModelDef
+from tests.conftest import DATA_DIR, quiet
+
+
+def base_params(data_dir, bulk):
+    #every Param value of the BASE built from `data_dir`, without the vectorized calibration
+
+    with quiet():
+        cge = PyCGE(StdModelDef())
+        cge.model_data(data_dir, bulk=bulk)
+        cge.sam_data = None #so the initialize rules read the loaded data
+        cge.model_instance('pf', 'CAP')
+    return {(p.name, index): (p[index].value if p.mutable else p[index])
+            for p in cge.base.component_objects(Param) for index in p}
+
+
+def test_bulk_loader_matches_dataportal():
+
+    with quiet():
+        data = dataload.load_data_dir(DATA_DIR)
+    assert data.sets['i'] == ['BRD', 'MLK']
+    rows, cols, values = data.params['sam']
+    assert rows == cols == data.sets['u'] and values.shape == (len(rows), len(rows))
+    assert base_params(DATA_DIR, bulk=True) == base_params(DATA_DIR, bulk=False)
+
+
+def test_binary_sam_matches_csv(tmp_path):
+
+    sam = samgen.balanced_sam(5, seed=0)
+    csv_dir = samgen.write_data_dir(sam, str(tmp_path / 'csv'))
+    npy_dir = samgen.write_data_dir(sam, str(tmp_path / 'npy'), binary=True)
+    with quiet():
+        from_csv, from_npy = dataload.load_data_dir(csv_dir), dataload.load_data_dir(npy_dir)
+    assert from_npy.params['sam'][:2] == from_csv.params['sam'][:2] #labels from the set of matching size
+    np.testing.assert_array_equal(from_npy.params['sam'][2], sam.to_numpy())
+    np.testing.assert_allclose(from_csv.params['sam'][2], sam.to_numpy(), rtol=1e-15)
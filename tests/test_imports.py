@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy imports and the import-time benchmark.
+"""
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from pycge.examples import import_benchmark
+from tests.conftest import DATA_DIR
+
+
+@pytest.mark.parametrize('module', import_benchmark.MODULES)
+def test_no_unexpected_heavy_imports(module):
+
+    record = import_benchmark.measure(module)
+    assert record['unexpected'] == [], record['heavy']
+    assert record['total_us'] > 0 and record['modules_loaded'] > 0
+
+
+def test_dependencies_load_when_first_needed():
+
+    code = '''
+import sys
+from pycge.pycge import PyCGE
+from pycge.examples.stdcge_model_def import StdModelDef
+cge = PyCGE(StdModelDef())
+print('loaded:', 'pandas' in sys.modules, 'scipy' in sys.modules)
+cge.model_data(%r)
+cge.model_instance('pf', 'CAP')
+cge.model_calibrate('newton', check=False)
+cge.model_sim()
+print('loaded:', 'pandas' in sys.modules)
+cge.model_compare()
+print('loaded:', 'pandas' in sys.modules)
+''' % DATA_DIR
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('loaded:')]
+    assert lines == ['loaded: False False', 'loaded: False', 'loaded: True'] #the comparison is the first thing that needs pandas
+
+
+def test_parse_importtime():
+
+    stderr = '\n'.join(['import time: self [us] | cumulative | imported package',
+                        'import time:       120 |        120 |   numpy.core',
+                        'import time:        80 |        200 | numpy',
+                        'some other output'])
+    assert import_benchmark.parse_importtime(stderr) == [(1, 120, 'numpy.core'), (0, 200, 'numpy')]
+
+
+def test_regressions_compare_with_the_median_of_earlier_runs():
+
+    keys = {'host': 'h', 'python': '3.11'}
+    earlier = pd.DataFrame([dict(keys, module=m, total_us=us)
+                            for m, us in [('slow', 100000), ('slow', 110000), ('slow', 900000), ('quick', 1000)]])
+    latest = pd.DataFrame([dict(keys, module='slow', total_us=200000), dict(keys, module='quick', total_us=5000)])
+    slow = import_benchmark.regressions(earlier, latest, tolerance=1.5)
+    assert slow['module'].tolist() == ['slow'] #'quick' is slower too, but below MIN_US
+    assert slow['ratio'][0] == pytest.approx(200000 / 110000)
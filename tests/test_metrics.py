@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Stage timings of the PyCGE pipeline.
+"""
+import json
+
+from pycge.metrics import NULL_STAGE, Metrics
+from tests.conftest import calibrated, quiet
+
+
+class ShellSolver:
+    #the three steps of a Pyomo shell solver that `Metrics.instrument` times
+
+    def _presolve(self):
+        return 'written'
+
+    def _apply_solver(self):
+        return 'run'
+
+    def _postsolve(self):
+        return 'read'
+
+
+def test_disabled_metrics_record_nothing():
+
+    cge = calibrated()
+    assert cge.metrics.stage('anything') is NULL_STAGE
+    assert cge.metrics.records == []
+
+
+def test_pipeline_stages_are_recorded(tmp_path):
+
+    cge = calibrated(metrics=Metrics(enabled=True, memory=False))
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+    records = cge.metrics.records
+    stages = [r['stage'] for r in records]
+    for stage in ('model', 'data', 'instance', 'create_instance', 'solve', 'load'):
+        assert stage in stages, stage
+    base, sim = [r for r in records if r['stage'] == 'solve']
+    assert (base['kind'], base['iterations']) == ('base', 0) #the benchmark already is the equilibrium
+    assert sim['kind'] == 'sim' and sim['solver'] == 'newton' and sim['iterations'] > 0
+    assert sim['termination_condition'] == 'optimal'
+    loads = [r for r in records if r['stage'] == 'load' and r['parent'] == 'solve']
+    assert len(loads) == 2 and 0 <= loads[1]['wall_s'] <= sim['wall_s']
+    assert all(r['peak_bytes'] is None for r in records) #memory=False
+
+    summary = cge.metrics.summary()
+    assert summary.loc['solve', 'count'] == 2
+    path = cge.metrics.to_jsonl(str(tmp_path / 'metrics.jsonl'))
+    with open(path) as jsonl_file:
+        assert [json.loads(line)['stage'] for line in jsonl_file] == stages
+
+
+def test_peak_memory_of_nested_stages():
+
+    metrics = Metrics(enabled=True)
+    try:
+        with metrics.stage('outer'):
+            with metrics.stage('inner'):
+                block = bytearray(10 ** 7)
+                del block
+    finally:
+        metrics.disable()
+    inner, outer = metrics.records
+    assert inner['parent'] == 'outer'
+    assert inner['peak_bytes'] >= 10 ** 7
+    assert outer['peak_bytes'] >= inner['peak_bytes'] #an inner stage resets the peak, but the outer one still sees it
+
+
+def test_shell_solver_steps_are_sub_stages():
+
+    metrics = Metrics(enabled=True, memory=False)
+    solver = metrics.instrument(ShellSolver())
+    with metrics.stage('solve'):
+        assert (solver._presolve(), solver._apply_solver(), solver._postsolve()) == ('written', 'run', 'read')
+    assert [(r['stage'], r['parent']) for r in metrics.records] == [('write', 'solve'), ('solver', 'solve'),
+                                                                   ('read', 'solve'), ('solve', None)]
+    assert Metrics().instrument(solver) is solver
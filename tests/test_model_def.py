@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+The equations of `StdModelDef`.
+"""
+import numpy as np
+import pytest
+from pyomo.core import Var, value
+
+from pycge import newton
+from tests.conftest import calibrated, quiet
+
+
+def test_aggregates_are_the_sums_they_name():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+    for m in (cge.base, cge.sim):
+        assert value(m.income) == pytest.approx(sum(m.pf[h].value * m.FF[h].value for h in m.h), rel=1e-14)
+        assert value(m.revenue) == pytest.approx(m.Td.value + sum(m.Tz[i].value + m.Tm[i].value for i in m.i), rel=1e-14)
+        assert value(m.savings) == pytest.approx(m.Sp.value + m.Sg.value + m.epsilon.value * m.Sf.value, rel=1e-14)
+        assert m.Td.value == pytest.approx(m.taud.value * value(m.income), rel=1e-8)
+        assert m.Sg.value == pytest.approx(m.ssg.value * value(m.revenue), rel=1e-8)
+
+
+@pytest.mark.parametrize('perturbed', [False, True])
+def test_residuals_match_the_constraint_bodies(perturbed):
+
+    cge = calibrated()
+    m = cge.base
+    if perturbed: #every free Var moved by up to 5%, so no equation holds
+        for k, v in enumerate(x for x in m.component_data_objects(Var) if not x.fixed):
+            v.set_value(v.value * (1 + 0.05 * ((7 * k) % 11 - 5) / 5), skip_validation=True)
+    vectorized = cge.model_def.residuals(m)
+    bodies = newton.constraint_residuals(m)
+    assert set(vectorized) == set(bodies)
+    for name, r in vectorized.items():
+        assert np.ravel(r) == pytest.approx(bodies[name], rel=1e-9, abs=1e-9), name
+    if perturbed:
+        assert max(np.abs(r).max() for r in bodies.values()) > 1e-3
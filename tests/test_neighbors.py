@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Warm starts from the nearest solved SIMs (`pycge.neighbors`).
+"""
+import numpy as np
+import pytest
+from pyomo.opt import TerminationCondition
+
+from pycge import neighbors
+from tests.conftest import calibrated, quiet
+
+
+def solve_rates(cge, rates, warmstart=False):
+    #one scenario per tariff rate on every good, solved in order
+
+    scenarios = []
+    for rate in rates:
+        scenario = cge.model_scenario(rate)
+        for i in cge.base.i:
+            cge.model_modify_scenario(scenario, 'taum', i, rate)
+        results = cge.model_solve_scenario(scenario, 'newton', warmstart=warmstart)
+        assert results.solver.termination_condition == TerminationCondition.optimal
+        scenarios.append(scenario)
+    return scenarios
+
+
+def test_affine_weights():
+
+    points = np.array([[0.0], [1.0]])
+    assert neighbors.affine_weights(points, np.array([0.25])) == pytest.approx([0.75, 0.25])
+    assert neighbors.affine_weights(points, np.array([1.5])) == pytest.approx([-0.5, 1.5]) #extrapolation
+    assert neighbors.affine_weights(points, np.array([10.0])) is None #too far
+
+
+def test_interpolated_start_between_two_solved_rates():
+
+    cge = calibrated()
+    with quiet():
+        solve_rates(cge, [0.05, 0.25])
+        [cold] = solve_rates(calibrated(), [0.15])
+        [warm] = solve_rates(cge, [0.15], warmstart='interpolate')
+    stats = cge.neighbor_stats[-1]
+    assert stats['method'] == 'interpolate'
+    assert sorted(stats['neighbors']) == [0.05, 0.25]
+    assert sorted(stats['weights']) == pytest.approx([0.5, 0.5])
+    assert stats['iterations'] < cge.cold_start_stats['sim']['iterations']
+    assert np.allclose(warm.solution, cold.solution, rtol=1e-8, atol=1e-7)
+
+
+def test_nearest_start_and_bounds():
+
+    cge = calibrated()
+    with quiet():
+        solve_rates(cge, [0.0, 0.3])
+    index = cge.model_neighbor_index()
+    assert len(index) == 2
+    instance = cge.model_shared_instance(cge.model_scenario('new'))
+    for i in cge.base.i:
+        instance.taum[i].value = 0.02
+    start = index.start(instance, 'nearest')
+    assert start['method'] == 'nearest' and start['neighbors'] == [0.0]
+    for i in cge.base.i: #no tariff revenue at a zero tariff, a poor start for any other rate, so BASE's is used
+        assert instance.Tm[i].value == pytest.approx(cge.base.Tm[i].value)
+    with pytest.raises(ValueError):
+        index.start(instance, 'furthest')
+
+
+def test_oldest_points_are_dropped():
+
+    cge = calibrated()
+    index = neighbors.NeighborIndex(cge.base, max_points=2)
+    assert index.start(cge.base.clone(), 'nearest') is None #nothing solved yet
+    for name in 'abc':
+        index.add(cge.base, name)
+    assert len(index) == 2 and index.names == ['b', 'c']
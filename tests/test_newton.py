@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests of the in-process Newton engine.
+"""
+import numpy as np
+import pytest
+
+from pyomo.environ import ConcreteModel, Constraint, NonNegativeReals, Var
+from pyomo.opt import TerminationCondition
+
+from pycge import newton
+from pycge.newton import NewtonSystem, newton_solve
+from tests.conftest import calibrated, quiet, set_sam, var_values
+
+
+def test_zero_positive_variable():
+    #a positive variable that starts at exactly zero is stepped additively, and one that is positive in logs
+
+    m = ConcreteModel()
+    m.x = Var(within=NonNegativeReals, initialize=0.0)
+    m.y = Var(within=NonNegativeReals, initialize=1.0)
+    m.c1 = Constraint(expr=m.x + m.y == 3)
+    m.c2 = Constraint(expr=m.x - 2 * m.y == -3)
+
+    system = NewtonSystem(m)
+    x = system.get_x()
+    assert system.log_stepped(x).tolist() == [False, True]
+    assert np.all(np.isfinite(system.move(x, np.array([1.0, 1.0]), 1.0)))
+
+    results = newton_solve(m)
+    assert results.solver.termination_condition == TerminationCondition.optimal, results.solver.message
+    assert abs(m.x.value - 1.0) < 1e-8 and abs(m.y.value - 2.0) < 1e-8
+
+
+def test_base_from_perturbed_start():
+    #calibrating from 10% off the benchmark point finds the benchmark again
+
+    cge = calibrated()
+    benchmark = var_values(cge.base)
+    for v in cge.base.component_data_objects(Var):
+        if not v.fixed:
+            v.value = 1.1 * v.value
+    results = newton.newton_solve(cge.base)
+    assert results.solver.termination_condition == TerminationCondition.optimal, results.solver.message
+    for key, val in var_values(cge.base).items():
+        assert val == pytest.approx(benchmark[key], rel=1e-6, abs=1e-9), key
+
+
+def test_sim_solves_to_an_equilibrium():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+    assert cge.sim_results.solver.termination_condition == TerminationCondition.optimal, cge.sim_results.solver.message
+    assert newton.check_point(cge.sim).solver.termination_condition == TerminationCondition.optimal
+    assert cge.sim.Tm['BRD'].value == pytest.approx(0.0, abs=1e-8) #no tariff, no tariff revenue
+    assert cge.base.Tm['BRD'].value > 0
+
+
+def test_zero_flow_sam(data_copy):
+    #a zero SAM cell gives variables that are exactly zero; they cannot be stepped in logs
+
+    set_sam(data_copy, 'MLK', 'BRD', 0)
+    cge = calibrated(data_copy, balance='cross_entropy')
+    assert cge.base_results.solver.termination_condition == TerminationCondition.optimal
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+    assert cge.sim_results.solver.termination_condition == TerminationCondition.optimal, cge.sim_results.solver.message
+
+
+def test_check_accepts_only_what_the_constraint_bodies_accept():
+    #residuals from a ModelDef only screen the point: zeros from a wrong copy of the equations cannot pass it
+
+    cge = calibrated()
+    m = cge.sim
+    m.Y['BRD'].set_value(1.1 * m.Y['BRD'].value)
+    zeros = {name: np.zeros(len(con)) for name, con in ((c.name, c) for c in m.component_objects(Constraint, active=True))}
+    results = newton.check_point(m, vectorized=zeros)
+    assert results.solver.termination_condition == TerminationCondition.other
+    assert 'BRD' in results.solver.message
+    results = newton.check_point(cge.base, vectorized=cge.model_def.residuals(cge.base))
+    assert results.solver.termination_condition == TerminationCondition.optimal
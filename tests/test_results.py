@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+The results store and the per-Var CSV export.
+"""
+import glob
+import os
+
+import numpy as np
+import pytest
+from pyomo.core import Var
+
+from pycge.results import ResultsStore, load_results
+from tests.conftest import calibrated, quiet
+
+
+def test_store_appends_each_instance_to_one_file(tmp_path):
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+        cge.model_postprocess('vars', str(tmp_path))
+        cge.model_postprocess('store', str(tmp_path), base=False)
+        path = cge.results_store.path
+        cge.model_close_store()
+    assert glob.glob(str(tmp_path / 'results_*')) == [path]
+
+    frame = load_results(path).set_index(['scenario', 'component', 'index'])['value']
+    assert set(frame.index.get_level_values('scenario')) == {'base', 'sim'}
+    assert frame['base', 'Tm', 'BRD'] == pytest.approx(cge.base.Tm['BRD'].value)
+    assert frame['sim', 'Tm', 'BRD'] == pytest.approx(cge.sim.Tm['BRD'].value)
+    assert frame['sim', 'F', 'CAP,BRD'] == pytest.approx(cge.sim.F['CAP', 'BRD'].value)
+
+
+def test_npz_chunks_reload_in_order(tmp_path):
+
+    with ResultsStore(str(tmp_path), fmt='npz') as store:
+        for k in range(3):
+            store.append('s%d' % k, [('x', None), ('y', ('a', 1))], [k, 10 + k])
+    arrays = load_results(store.path, as_arrays=True)
+    assert arrays['scenario'].tolist() == ['s0', 's0', 's1', 's1', 's2', 's2']
+    assert arrays['index'].tolist() == ['', 'a,1'] * 3
+    assert np.array_equal(arrays['value'], [0, 10, 1, 11, 2, 12])
+
+
+def test_vars_csv_is_opt_in(tmp_path):
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+        cge.model_postprocess('vars_csv', str(tmp_path) + '/', base=False)
+    files = os.listdir(str(tmp_path))
+    assert len(files) == len(list(cge.sim.component_objects(Var, active=True)))
+    [tm_file] = [f for f in files if f.startswith('vars_csvTm_')]
+    with open(str(tmp_path / tm_file)) as csv_file:
+        rows = dict(line.strip().split(',') for line in csv_file.read().splitlines()[1:])
+    assert float(rows['BRD']) == pytest.approx(cge.sim.Tm['BRD'].value) #the SIM values, not BASE's
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Copy-on-write scenarios solved in the shared working copy of BASE.
+"""
+import pytest
+from pyomo.opt import TerminationCondition
+
+from tests.conftest import calibrated, quiet, var_values
+
+
+def sim_solution(changes):
+    #the same changes solved in a full SIM, for comparison
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk(changes)
+        cge.model_solve('newton')
+    return var_values(cge.sim)
+
+
+def test_scenarios_match_full_sims_and_leave_base_alone():
+
+    cge = calibrated()
+    base = var_values(cge.base)
+    with quiet():
+        free_trade = cge.model_scenario('free trade')
+        cge.model_modify_scenario(free_trade, 'taum', 'BRD', 0.0)
+        cge.model_modify_scenario(free_trade, 'taum', 'MLK', 0.0)
+        capital = cge.model_scenario('capital')
+        cge.model_modify_scenario(capital, 'FF', 'CAP', 1.2 * cge.base.FF['CAP'].value)
+        for scenario in (free_trade, capital):
+            results = cge.model_solve_scenario(scenario, 'newton')
+            assert results.solver.termination_condition == TerminationCondition.optimal
+    assert var_values(cge.base) == base
+    assert free_trade.params == {('taum', 'BRD'): 0.0, ('taum', 'MLK'): 0.0} #only what differs from BASE
+
+    expected = sim_solution({('taum', '*'): 0.0})
+    with quiet():
+        cge.model_load_scenario(free_trade) #written back into the shared instance after `capital` was solved there
+    assert cge.sim_solved
+    for key, val in var_values(cge.sim).items():
+        assert val == pytest.approx(expected[key], rel=1e-8, abs=1e-10), key
+    with quiet():
+        compared = cge.model_compare()
+    assert compared.loc[('Tm', 'BRD'), 'sim'] == pytest.approx(0.0, abs=1e-8)
+
+
+def test_bad_modifications_are_refused():
+
+    cge = calibrated()
+    with quiet():
+        scenario = cge.model_scenario('bad')
+        cge.model_modify_scenario(scenario, 'nothing', 'BRD', 0.0)
+        cge.model_modify_scenario(scenario, 'taum', 'nowhere', 0.0)
+    assert scenario.params == {} and scenario.fixed == {}
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Implicit-function-theorem sensitivities against central finite differences.
+"""
+import numpy as np
+
+from tests.conftest import calibrated, quiet, var_values
+
+
+H = 1e-3 #finite-difference step in the tariff rate and the elasticity
+
+
+def keys_of(derivatives):
+    return [(name, None if isinstance(index, float) and np.isnan(index) else index) #a scalar's index is None, shown as nan
+            for name, index in derivatives.index]
+
+
+def test_sensitivities_match_central_differences():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.05})
+        cge.model_solve('newton')
+        S = cge.sensitivities(params=[('taum', 'BRD')])
+    assert S is not None
+
+    solutions = []
+    for t in (0.05 + H, 0.05 - H):
+        with quiet():
+            cge.model_modify_sim_bulk({('taum', 'BRD'): t})
+            cge.model_solve('newton')
+        solutions.append(var_values(cge.sim))
+    plus, minus = solutions
+
+    derivatives = S[('taum', 'BRD')]
+    keys = keys_of(derivatives)
+    differences = np.array([(plus[key] - minus[key]) / (2 * H) for key in keys])
+    assert np.any(np.abs(differences) > 1) #the tariff moves the equilibrium
+    np.testing.assert_allclose(derivatives.to_numpy(), differences, rtol=1e-4, atol=1e-5)
+
+
+def test_elasticity_sensitivities_are_chained_through_the_calibration():
+    #sigma is in no equation; its derivatives go through deltam, deltad, gamma and eta
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.05})
+        cge.model_solve('newton')
+        S = cge.sensitivities(params=[('sigma', 'BRD'), ('M0', 'BRD')])
+    assert list(S.columns) == [('sigma', 'BRD')] #M0 only calibrates other Params, so it has no column
+
+    sigma = cge.sim.sigma['BRD'].value
+    solutions = []
+    for s in (sigma + H, sigma - H):
+        with quiet():
+            cge.model_modify_sim_bulk({('sigma', 'BRD'): s}) #recalibrates deltam, ... as well
+            cge.model_solve('newton')
+        solutions.append(var_values(cge.sim))
+    plus, minus = solutions
+
+    derivatives = S[('sigma', 'BRD')]
+    differences = np.array([(plus[key] - minus[key]) / (2 * H) for key in keys_of(derivatives)])
+    assert np.any(np.abs(differences) > 1e-2)
+    np.testing.assert_allclose(derivatives.to_numpy(), differences, rtol=1e-4, atol=1e-5)
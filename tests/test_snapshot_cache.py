@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Round trips through snapshots, the BASE instance cache and the solution cache.
+"""
+import os
+
+import pytest
+from pyomo.opt import TerminationCondition
+
+from pycge.cache import InstanceCache, cache_key
+from pycge.pycge import PyCGE
+from pycge.examples.stdcge_model_def import StdModelDef
+from tests.conftest import DATA_DIR, calibrated, quiet, var_values
+
+
+def solved_sim(cge, taum=0.0):
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): taum})
+        cge.model_solve('newton')
+    return cge
+
+
+def test_snapshot_round_trip(tmp_path):
+
+    cge = solved_sim(calibrated())
+    with quiet():
+        path = cge.model_snapshot(str(tmp_path), base=False)
+    other = calibrated()
+    with quiet():
+        other.model_load_snapshot(path, base=False)
+    assert other.sim_solved
+    assert var_values(other.sim) == var_values(cge.sim)
+    assert other.sim.taum['BRD'].value == 0.0
+
+
+def test_cached_base_round_trip(tmp_path):
+
+    cache_dir = str(tmp_path / 'instances')
+    first, second = PyCGE(StdModelDef()), PyCGE(StdModelDef())
+    with quiet():
+        first.model_cached_base(DATA_DIR, 'pf', 'CAP', 'newton', cache_dir=cache_dir)
+    assert len(InstanceCache(cache_dir).entries()) == 1
+    with quiet():
+        second.model_cached_base(DATA_DIR, 'pf', 'CAP', 'newton', cache_dir=cache_dir)
+    assert second.base_calibrated and second.base is not first.base
+    assert var_values(second.base) == var_values(first.base)
+
+
+def test_unloadable_cache_entry_is_a_miss(tmp_path):
+
+    cache = InstanceCache(str(tmp_path))
+    key = cache_key('entry')
+    with open(cache.path(key), 'wb') as cache_file:
+        cache_file.write(b'\x80\x04\x95\x1a\x00\x00\x00\x00\x00\x00\x00\x8c\x0bnonexistent\x94\x8c\x03Foo\x94\x93\x94.') #a class that no longer exists
+    assert cache.get(key) is None
+    cache.put(key, {'value': 1})
+    assert cache.get(key) == {'value': 1}
+
+
+def test_solution_cache_round_trip(tmp_path):
+
+    directory = str(tmp_path / 'solutions')
+    first = calibrated()
+    with quiet():
+        first.model_solution_cache(directory=directory)
+    solved_sim(first)
+    assert first.solution_cache.misses == 1 and len(os.listdir(directory)) == 1
+
+    second = calibrated()
+    second.sim.pd['BRD'].value = 2.0 #a cache hit replaces the starting point too
+    with quiet():
+        second.model_solution_cache(directory=directory)
+    solved_sim(second)
+    assert second.solution_cache.hits == 1
+    assert second.sim_solved and second.sim_results.solver.termination_condition == TerminationCondition.optimal
+    fresh = var_values(solved_sim(calibrated()).sim)
+    cached = var_values(second.sim)
+    assert cached.keys() == fresh.keys()
+    for key, val in cached.items():
+        assert val == pytest.approx(fresh[key], rel=1e-12, abs=1e-12), key
+
+    third = calibrated()
+    with quiet():
+        third.model_solution_cache(directory=directory)
+    solved_sim(third, taum=0.01) #other parameters miss
+    assert third.solution_cache.hits == 0 and third.solution_cache.misses == 1
+    assert len(os.listdir(directory)) == 2
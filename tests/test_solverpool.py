@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+The 'localpool' solver manager and the queued solves of `run_scenarios` and `run_ssa`, with a stand-in solver.
+"""
+import time
+
+import pytest
+from pyomo.opt import SolverManagerFactory, TerminationCondition
+from pyomo.opt.parallel.manager import ActionManagerError
+
+from pycge import solverpool, ssa
+from tests.conftest import SLEEP, calibrated, quiet
+
+
+def test_private_pyomo_steps_are_available():
+    assert solverpool.PRIVATE_API
+
+
+def test_pool_runs_queued_solves_concurrently(fake_solver):
+
+    cge = calibrated()
+    instances = [cge.base.clone() for _ in range(3)]
+    start = time.time()
+    with SolverManagerFactory(solverpool.POOL_NAME, max_workers=3) as manager:
+        handles = {manager.queue(instance, opt=fake_solver).id: instance for instance in instances}
+        for _ in instances:
+            handle = manager.wait_any()
+            results = manager.get_results(handle)
+            assert results.solver.termination_condition == TerminationCondition.optimal
+            del handles[handle.id]
+        assert not handles
+        with pytest.raises(ActionManagerError): #nothing is queued any more
+            manager.wait_any()
+    assert time.time() - start < 2 * SLEEP #not 3 * SLEEP one after another
+
+
+def test_run_scenarios_and_ssa_queue_their_solves(fake_solver, tmp_path):
+
+    cge = calibrated()
+    scenarios = {'a': [], 'b': [('taum', 'BRD', 0.0)]}
+    start = time.time()
+    with quiet():
+        table = cge.run_scenarios(scenarios, solver=fake_solver, mgr=solverpool.POOL_NAME, workers=2)
+    assert time.time() - start < 2 * SLEEP
+    assert list(table.index) == ['a', 'b']
+    assert (table['termination_condition'] == 'optimal').all(), table['message'].tolist()
+    assert table.loc['a', 'obj'] == pytest.approx(cge.base.obj.expr())
+
+    draws = ssa.uniform_draws(2, len(cge.base.i), low=1.5, high=3.0, seed=1)
+    with quiet():
+        table = cge.run_ssa(draws, {('taum', '*'): 0.0}, path=str(tmp_path / 'draws.csv'), solver=fake_solver,
+                            mgr=solverpool.POOL_NAME, workers=2, outputs=['Xp'])
+    assert list(table.index) == [0, 1]
+    assert (table['termination_condition'] == 'optimal').all(), table['message'].tolist()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Recalibrating the elasticities and the Monte Carlo sensitivity analysis (`run_ssa`).
+"""
+import numpy as np
+import pytest
+
+from pycge import pycge, ssa
+from pycge.examples.stdcge_model_def import ELASTICITY_PARAMS
+from tests.conftest import calibrated, quiet
+
+
+def derived(instance):
+    return {(name, i): getattr(instance, name)[i].value for name in ELASTICITY_PARAMS for i in instance.i}
+
+
+def test_recalibration_does_not_depend_on_the_order_of_changes():
+    #the Armington shares are calibrated at the benchmark tariff, whatever taum has been shocked to
+
+    tariff_first, sigma_first = calibrated(), calibrated()
+    with quiet():
+        tariff_first.model_modify_sim_bulk({('taum', '*'): 0.0})
+        tariff_first.model_modify_sim_bulk({('sigma', 'BRD'): 3.0})
+        sigma_first.model_modify_sim_bulk({('sigma', 'BRD'): 3.0})
+        sigma_first.model_modify_sim_bulk({('taum', '*'): 0.0})
+    assert derived(tariff_first.sim) == derived(sigma_first.sim)
+
+    with quiet():
+        tariff_first.model_modify_sim_bulk({('sigma', 'BRD'): tariff_first.base.sigma['BRD'].value})
+    assert derived(tariff_first.sim) == pytest.approx(derived(tariff_first.base), rel=1e-14)
+
+
+def test_ssa_runs_resumes_and_refuses_other_draws(tmp_path):
+
+    cge = calibrated()
+    path = str(tmp_path / 'draws.csv')
+    draws = ssa.uniform_draws(2, len(cge.base.i), low=1.5, high=3.0, seed=1)
+    with quiet():
+        table = cge.run_ssa(draws, {('taum', '*'): 0.0}, path=path, workers=1, outputs=['Xp'])
+    assert list(table.index) == [0, 1]
+    assert (table['termination_condition'] == 'optimal').all(), table['message'].tolist()
+
+    #the worker used the Params of the vectorized pass as they are
+    params = cge.model_def.recalibrate(cge.base, **draws)
+    worker_sim = pycge._scenario_cge.sim
+    for name in ('deltam', 'gamma', 'theta'):
+        np.testing.assert_array_equal([getattr(worker_sim, name)[i].value for i in worker_sim.i], params[name][1])
+
+    with quiet():
+        again = cge.run_ssa(draws, {('taum', '*'): 0.0}, path=path, workers=1, outputs=['Xp'])
+    assert again.equals(table)
+    with pytest.raises(ValueError):
+        cge.run_ssa(ssa.uniform_draws(2, len(cge.base.i), low=1.5, high=3.0, seed=2), {('taum', '*'): 0.0},
+                    path=path, workers=1, outputs=['Xp'])
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Warm starts from the last solved instance.
+"""
+import pytest
+from pyomo.opt import TerminationCondition
+
+from pycge.pycge import IPOPT_WARMSTART_OPTIONS
+from tests.conftest import calibrated, quiet, var_values
+
+
+def test_warm_start_is_reported_against_the_cold_solve():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton')
+        cold = var_values(cge.sim)
+        cge.model_sim()
+        cge.model_modify_sim_bulk({('taum', '*'): 0.0})
+        cge.model_solve('newton', warmstart=True) #starts from the SIM just solved, i.e. at the solution
+    assert cge.sim_results.solver.termination_condition == TerminationCondition.optimal
+    report = cge.warmstart_stats['sim']
+    assert report['cold_iterations'] == cge.cold_start_stats['sim']['iterations'] > 0
+    assert report['iterations'] < report['cold_iterations']
+    assert report['iterations_saved'] == report['cold_iterations'] - report['iterations']
+    for key, val in var_values(cge.sim).items():
+        assert val == pytest.approx(cold[key], rel=1e-8, abs=1e-10), key
+
+
+def test_warm_start_keeps_fixed_values():
+
+    cge = calibrated()
+    with quiet():
+        cge.model_modify_sim('Y', 'BRD', 7.0) #fixes Y['BRD']
+        cge.sim.Y['MLK'].value = 3.0
+        options = {}
+        cge.model_warmstart(cge.sim, 'ipopt', options)
+    assert cge.sim.Y['BRD'].value == 7.0
+    assert cge.sim.Y['MLK'].value == pytest.approx(cge.base.Y['MLK'].value) #from the calibrated BASE
+    assert options == IPOPT_WARMSTART_OPTIONS #an interior point solver is also told to use the multipliers